@@ -2,14 +2,34 @@
 """CompaniesHouses.com API - Working Version"""
 
 import os
+import hmac
 import sqlite3
-import json
 from datetime import datetime
 
 # Flask imports
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
+from werkzeug.http import parse_date, parse_etags
+
+from backend.autocomplete import suggest
+from backend.bitmaps import BITMAP_CONDITION, BitmapIndex, parse_filter, snapshot_path, sql_condition
+from backend.company_json import (
+    company_blob, dumps, load_company_blob, load_search_blobs, results_body, search_row_blob
+)
+from backend.counts import COUNT_MODES, DEFAULT_COUNT_MODE, CountCache, count_matches, format_total
+from backend.db import ConnectionPool, get_data_version, get_last_import_at
+from backend.facets import FacetIndex
+from backend.fts import (
+    SEARCH_SQL, SEARCH_AFTER_SQL, build_search_match, search_params, search_after_params
+)
+from backend.instrumentation import InstrumentedConnection, Metrics, end_request, start_request, timed
+from backend.pagination import MAX_OFFSET, InvalidCursor, decode_cursor, encode_cursor
+from backend.response_cache import ResponseCache, cache_key, make_etag
+from backend.sic import sic_counts, sic_filter, sic_range
+from backend.singleflight import SingleFlight
+from backend.slow_queries import SlowQueryLog
+from backend.stats import compute_stats, load_stats, rebuild_stats, stats_built_at
 
 # Load environment variables
 load_dotenv()
@@ -19,181 +39,535 @@ app = Flask(__name__)
 CORS(app)
 
 # WORKING DATABASE PATH - EXACTLY AS TESTED
-DB_PATH = '/home/jeyan/companieshouses/database/companies.db'
+DB_PATH = os.getenv('DATABASE_PATH', '/home/jeyan/companieshouses/database/companies.db')
+
+# Optional: statements slower than SLOW_QUERY_MS go to a rotating log with
+# their query plan (summarize it with scripts/slow_query_report.py)
+slow_query_log = SlowQueryLog(
+    os.getenv('SLOW_QUERY_LOG', os.path.join(os.path.dirname(DB_PATH), 'slow_queries.log')),
+    threshold_ms=float(os.getenv('SLOW_QUERY_MS'))
+) if os.getenv('SLOW_QUERY_MS') else None
+
+# One read-only, pre-tuned connection per worker thread; its statements are
+# timed for the Server-Timing header and /metrics
+db_pool = ConnectionPool(
+    DB_PATH,
+    factory=slow_query_log.connection_factory() if slow_query_log else InstrumentedConnection
+)
+
+# Search totals per normalized query, dropped when an import bumps the data version
+count_cache = CountCache()
+
+# Facet columns for ?facets=1, reloaded when the importer rebuilds them
+facet_index = FacetIndex()
+
+# Bitmaps for ?filter=status:active AND NOT charges:true, loaded from the
+# importer's snapshot next to the database
+bitmap_index = BitmapIndex(os.getenv('BITMAP_SNAPSHOT_PATH', snapshot_path(DB_PATH)))
+
+# Browsers and the Cloudflare edge may reuse a response this long without asking;
+# after that a revalidation costs one data version lookup and a 304
+HTTP_MAX_AGE = int(os.getenv('HTTP_MAX_AGE', 3600))
+
+# Serialized responses for hot companies and queries, also dropped on a new data
+# version. Set RESPONSE_CACHE_PATH to share them between gunicorn workers.
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_ENTRIES', 2000)),
+    ttl=int(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+    shared_path=os.getenv('RESPONSE_CACHE_PATH')
+)
+
+# When a company trends, identical searches arriving together run the
+# FTS query and COUNT once and all get that body
+single_flight = SingleFlight()
+
+# Latency histograms for every route, phase and SQL statement (per worker process)
+metrics = Metrics()
 
 def get_db():
-    """Get database connection - simple version that works"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's pooled database connection (do not close it)"""
+    with timed('conn'):
+        return db_pool.connection()
 
-@app.route('/')
-def home():
-    """Home endpoint with API documentation"""
+def client_is_current(etag, last_modified, if_none_match=None, if_modified_since=None):
+    """Whether the client's copy is current (If-None-Match wins over If-Modified-Since)"""
+    if if_none_match:
+        return parse_etags(if_none_match).contains(etag)
+    since = parse_date(if_modified_since) if if_modified_since else None
+    return bool(last_modified and since and since >= last_modified.replace(microsecond=0))
+
+def conditional_body(key, build, if_none_match=None, if_modified_since=None):
+    """
+    The validator and cache pipeline shared by the Flask routes and asgi_main.
+    key is the normalized request (or a function of the connection giving it);
+    build(conn) serializes the response on a cache miss, or returns None for 404.
+    Concurrent misses on the same key share one build().
+    Returns (status, body, etag, last_modified, cache_hit); status 304 means
+    the client's copy is current and nothing was built. A body shared from
+    another request's build counts as a cache hit.
+    """
+    conn = get_db()
+    
+    # Same normalized parameters, same data version: same body
+    version = get_data_version(conn)
+    if callable(key):
+        key = key(conn)
+    etag = make_etag(version, key)
+    last_modified = get_last_import_at(conn)
+    if client_is_current(etag, last_modified, if_none_match, if_modified_since):
+        return 304, None, etag, last_modified, False
+    
+    with timed('cache'):
+        body = response_cache.get(version, key)
+    if body is not None:
+        return 200, body, etag, last_modified, True
+    
+    def build_and_cache():
+        body = build(conn)
+        if body is not None:
+            response_cache.put(version, key, body)
+        return body
+    
+    body, shared = single_flight.do((version, key), build_and_cache)
+    if body is None:
+        return 404, None, etag, last_modified, False
+    return 200, body, etag, last_modified, shared
+
+# Optional parameters that narrow /api/search, echoed in the response when given
+SEARCH_FILTERS = ('industry', 'location', 'sic', 'sic_prefix', 'filter')
+
+def parse_search(args):
+    """
+    Validate /api/search parameters from any mapping with .get().
+    Returns (params, None), or (None, (error payload, status)).
+    """
+    query = args.get('q', '').strip()
+    filters = {name: args.get(name, '').strip() for name in SEARCH_FILTERS}
+    filters = {name: value for name, value in filters.items() if value}
+    try:
+        limit = max(1, min(int(args.get('limit', 20)), 100))
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        return None, ({'error': 'limit and offset must be integers', 'example': '/api/search?q=tesco&limit=20'}, 400)
+    if offset < 0:
+        return None, ({'error': 'offset must not be negative', 'example': '/api/search?q=tesco&offset=20'}, 400)
+    page_cursor = args.get('cursor')
+    count_mode = args.get('count', DEFAULT_COUNT_MODE)
+    with_facets = args.get('facets', '').lower() in ('1', 'true', 'yes')
+    
+    # industry/location alone are enough: /api/search?industry=bread&location=leeds
+    if len(query) < 2 and (query or not ('industry' in filters or 'location' in filters)):
+        return None, ({
+            'error': 'Query must be at least 2 characters',
+            'example': '/api/search?q=tesco'
+        }, 400)
+    
+    if offset > MAX_OFFSET:
+        return None, ({
+            'error': f'offset is limited to {MAX_OFFSET}; page further with cursor=<next_cursor>',
+            'example': '/api/search?q=tesco&cursor=...'
+        }, 400)
+    
+    if count_mode not in COUNT_MODES:
+        return None, ({
+            'error': f"count must be one of: {', '.join(COUNT_MODES)}",
+            'example': '/api/search?q=tesco&count=exact'
+        }, 400)
+    
+    try:
+        sic_conditions = sic_filter(filters.get('sic'), filters.get('sic_prefix'))
+    except ValueError as e:
+        return None, ({'error': str(e), 'example': '/api/search?q=bakery&sic_prefix=C'}, 400)
+    
+    # status/type/jurisdiction/accounts/charges/region expression, answered from bitmaps
+    bitmap_filter = None
+    if 'filter' in filters:
+        try:
+            bitmap_filter = parse_filter(filters['filter'])
+        except ValueError as e:
+            return None, ({
+                'error': str(e),
+                'example': '/api/search?q=bakery&filter=status:active AND NOT charges:true'
+            }, 400)
+    
+    match = build_search_match(query, filters.get('industry'), filters.get('location'))
+    position = None
+    if match is not None and page_cursor:
+        try:
+            position = decode_cursor(result_scope(match, sic_conditions, bitmap_filter), page_cursor)
+        except InvalidCursor as e:
+            return None, ({'error': str(e), 'query': query}, 400)
+    
+    return {
+        'query': query,
+        'match': match,
+        'position': position,
+        'limit': limit,
+        'offset': offset,
+        'page_cursor': page_cursor,
+        'count_mode': count_mode,
+        'filters': filters,
+        'sic_conditions': sic_conditions,
+        'bitmap_filter': bitmap_filter,
+        'with_facets': with_facets
+    }, None
+
+def result_scope(match, sic_conditions, bitmap_filter=None):
+    """What cursors are bound to: the match, narrowed by any SIC or bitmap filter"""
+    conditions, params = sic_conditions
+    scope = f"{match}\x1f{conditions}\x1f{params}" if conditions else match
+    return f"{scope}\x1f{bitmap_filter}" if bitmap_filter else scope
+
+def search_key(params):
+    """Response cache key for parsed search parameters"""
+    return cache_key('search', params['query'], params['limit'], params['offset'],
+                     params['page_cursor'], params['count_mode'],
+                     *(f'{name}={value}' for name, value in params['filters'].items()),
+                     *(('facets',) if params['with_facets'] else ()))
+
+def search_body(conn, query, match, position, limit, offset, page_cursor, count_mode,
+                filters=None, sic_conditions=('', ()), bitmap_filter=None, with_facets=False):
+    """Serialized /api/search response"""
+    # Filters are echoed only when given, so plain name searches serialize as before
+    filters = filters or {}
+    if match is None:
+        return dumps({
+            'query': query,
+            **filters,
+            'total': 0,
+            'total_exact': True,
+            'total_display': '0',
+            'count': 0,
+            'limit': limit,
+            'offset': offset,
+            'next_cursor': None,
+            **({'facets': {}, 'facets_exact': True} if with_facets else {}),
+            'results': []
+        })
+    
+    cursor = conn.cursor()
+    conditions, condition_params = sic_conditions
+    count_key = condition_params
+    if bitmap_filter:
+        # One byte per company rowid; counts are cached by the expression instead
+        with timed('bitmaps'):
+            mask = bitmap_index.mask(conn, bitmap_filter)
+        if mask is not None:
+            conditions += BITMAP_CONDITION
+            condition_params += (mask,)
+        else:
+            # No snapshot from the importer yet: test each match's companies row
+            bitmap_sql, bitmap_params = sql_condition(bitmap_filter)
+            conditions += bitmap_sql
+            condition_params += bitmap_params
+        count_key += (bitmap_filter,)
+    
+    # Full text search on companies_fts, ranked exact > prefix > BM25.
+    # One extra row tells us whether there is a next page.
+    if position is not None:
+        cursor.execute(SEARCH_AFTER_SQL.format(filters=conditions),
+                       search_after_params(query, match, position, limit + 1, condition_params))
+    else:
+        cursor.execute(SEARCH_SQL.format(filters=conditions),
+                       search_params(query, match, limit + 1, offset, condition_params))
+    results = cursor.fetchall()
+    
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(result_scope(match, sic_conditions, bitmap_filter), results[-1])
+    
+    # Total as requested: exact, capped at COUNT_CAP, or estimated
+    total, total_kind = count_matches(conn, match, count_mode, cache=count_cache,
+                                      filters=conditions, filter_params=condition_params, filter_key=count_key)
+    
+    # Counts per status/type/region/SIC section/decade over the same matches
+    facets = {}
+    if with_facets:
+        with timed('facets'):
+            counts, exact = facet_index.count(conn, match, conditions, condition_params,
+                                              exact=count_mode == 'exact')
+        facets = {'facets': counts, 'facets_exact': exact}
+    
+    # Result entries were serialized by the importer; rows without one
+    # (not built yet) are serialized here the same way
+    blobs = load_search_blobs(conn, [row['company_number'] for row in results])
+    with timed('serialize'):
+        companies = [blobs.get(row['company_number']) or search_row_blob(row) for row in results]
+        
+        return results_body({
+            'query': query,
+            **filters,
+            'total': total,
+            'total_exact': total_kind == 'exact',
+            'total_display': format_total(total, total_kind),
+            'count': len(companies),
+            'limit': limit,
+            'offset': offset,
+            'next_cursor': next_cursor,
+            **facets
+        }, companies)
+
+def parse_sic_prefix(args):
+    """
+    Validate the /api/sic prefix (a section letter or leading code digits).
+    Returns (prefix, None), or (None, (error payload, status)).
+    """
+    prefix = args.get('prefix', '').strip().upper()
+    if prefix:
+        try:
+            sic_range(prefix)
+        except ValueError as e:
+            return None, ({'error': str(e), 'example': '/api/sic?prefix=47'}, 400)
+    return prefix, None
+
+def sic_key(prefix):
+    """SIC counts change with the data"""
+    return cache_key('sic', prefix)
+
+def sic_body(conn, prefix):
+    """Serialized /api/sic response: companies per SIC code under prefix"""
+    rows = sic_counts(conn, prefix)
+    with timed('serialize'):
+        return dumps({
+            'prefix': prefix,
+            'count': len(rows),
+            'codes': [{'sic_code': code, 'description': description, 'companies': companies}
+                      for code, description, companies in rows]
+        })
+
+def company_body(conn, company_number):
+    """Serialized /api/company response, or None if there is no such company"""
+    # Serialized by the importer: send the bytes as they are
+    body = load_company_blob(conn, company_number)
+    if body is not None:
+        return body
+    
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT * FROM companies WHERE company_number = ?",
+        (company_number,)
+    )
+    company = cursor.fetchone()
+    if company is None:
+        return None
+    with timed('serialize'):
+        return company_blob(company)
+
+def breakdown(rows, label, total, limit=None):
+    """Stats rows as [{label, count, percentage}], unknown ('') values left out"""
+    known = [(value, count) for value, count in rows if value != '']
+    return [
+        {label: value, 'count': count, 'percentage': round(count / total * 100, 2) if total else 0}
+        for value, count in known[:limit]
+    ]
+
+def stats_key(conn):
+    """Stats change with the data and with every rebuild"""
+    return cache_key('stats', stats_built_at(conn))
+
+def stats_body(conn):
+    """Serialized /api/stats response"""
+    # One read of company_stats; databases imported before it existed
+    # are aggregated live (slow) until the next import or ?refresh
+    company_stats = load_stats(conn)
+    source = 'precomputed'
+    if company_stats is None:
+        company_stats = compute_stats(conn)
+        source = 'live'
+    
+    total = company_stats['total'][0][1] if company_stats['total'] else 0
+    by_status = dict(company_stats['status'])
+    last_modified = get_last_import_at(conn)
+    built_at = stats_built_at(conn)
+    
+    with timed('serialize'):
+        return dumps({
+            'total_companies': total,
+            'active_companies': by_status.get('active', 0),
+            'dissolved_companies': sum(count for status, count in by_status.items() if 'dissolved' in status),
+            'status_breakdown': breakdown(company_stats['status'], 'status', total, limit=10),
+            'country_breakdown': breakdown(company_stats['country'], 'country', total, limit=20),
+            'company_type_breakdown': breakdown(company_stats['company_type'], 'company_type', total),
+            'incorporation_year_breakdown': sorted(
+                breakdown(company_stats['incorporation_year'], 'year', total), key=lambda row: row['year']
+            ),
+            'sic_breakdown': breakdown(company_stats['sic'], 'sic_code', total, limit=50),
+            'stats_source': source,
+            'stats_built_at': built_at,
+            # When the data changed (or the stats were built), so the body is stable for its ETag
+            'last_updated': last_modified.isoformat() if last_modified else built_at
+        })
+
+def refresh_allowed(admin_token):
+    """?refresh needs the STATS_REFRESH_TOKEN in an X-Admin-Token header"""
+    token = os.getenv('STATS_REFRESH_TOKEN')
+    return bool(token) and hmac.compare_digest(token, admin_token or '')
+
+def refresh_stats():
+    """Rebuild company_stats now (the pooled connections are read-only)"""
+    admin_conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        return rebuild_stats(admin_conn)
+    finally:
+        admin_conn.close()
+
+def autocomplete_payload(conn, query):
+    """/api/search/autocomplete response"""
+    # Companies whose normalized name starts with query, from the prefix index
+    results = suggest(conn, query)
+    
+    return {
+        'suggestions': [
+            {
+                'company_number': row['company_number'],
+                'company_name': row['company_name']
+            }
+            for row in results
+        ]
+    }
+
+def home_payload():
+    """/ response: API documentation"""
     try:
         # Test database connection
         conn = get_db()
         cursor = conn.cursor()
         cursor.execute('SELECT COUNT(*) FROM companies')
         count = cursor.fetchone()[0]
-        conn.close()
         db_status = f"{count:,} companies"
     except:
         db_status = "error"
     
-    return jsonify({
+    return {
         "status": "live",
         "message": "CompaniesHouses.com API",
         "database": db_status,
         "endpoints": {
             "search": "/api/search?q=tesco",
             "company": "/api/company/00445790",
-            "stats": "/api/stats"
+            "stats": "/api/stats",
+            "sic": "/api/sic?prefix=47"
         },
         "example_queries": {
             "search_tesco": "https://companieshouses.com/api/search?q=tesco",
             "search_london": "https://companieshouses.com/api/search?q=london&limit=50",
+            "search_bakers_leeds": "https://companieshouses.com/api/search?industry=bread&location=leeds",
+            "search_active_no_charges": "https://companieshouses.com/api/search?q=bakery&filter=status:active AND NOT charges:true",
             "get_tesco_plc": "https://companieshouses.com/api/company/00445790"
         }
-    })
+    }
+
+def health_payload():
+    """/health response"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat()
+    }
+
+def metrics_text(counters=()):
+    """/metrics body: latency histograms plus cache and single-flight counters"""
+    cache = response_cache.stats()
+    flights = single_flight.stats()
+    return metrics.render([
+        ('response_cache_hits_total', 'Responses served from the in-process cache', cache['hits']),
+        ('response_cache_shared_hits_total', 'Responses served from the shared cache file', cache['shared_hits']),
+        ('response_cache_misses_total', 'Responses that had to be built', cache['misses']),
+        ('single_flight_executions_total', 'Response builds run', flights['executions']),
+        ('single_flight_shared_total', 'Requests that waited for an identical build', flights['shared']),
+        *counters
+    ])
+
+# Flask front end
+
+@app.before_request
+def start_timer():
+    g.timer, g.timer_token = start_request()
+
+@app.after_request
+def report_timings(response):
+    """Server-Timing header and /metrics histograms for every request"""
+    timer = g.get('timer')
+    if timer is not None:
+        total = timer.elapsed()
+        response.headers['Server-Timing'] = timer.server_timing(total)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.record(timer, route, request.method, response.status_code, total)
+    return response
+
+@app.teardown_request
+def stop_timer(error=None):
+    token = g.pop('timer_token', None)
+    if token is not None:
+        end_request(token)
+
+
+def json_body(body):
+    """Response for JSON that is already serialized"""
+    return app.response_class(body, mimetype='application/json')
+
+def with_validators(response, etag, last_modified):
+    """Add ETag, Last-Modified and Cache-Control to a 200 or 304 response"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = HTTP_MAX_AGE
+    return response
+
+def serve(key, build):
+    """Flask response for conditional_body(); None when build() found nothing"""
+    status, body, etag, last_modified, cache_hit = conditional_body(
+        key, build, request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since')
+    )
+    if status == 404:
+        return None
+    if status == 304:
+        return with_validators(app.response_class(status=304), etag, last_modified)
+    response = json_body(body)
+    if cache_hit:
+        response.headers['X-Cache'] = 'HIT'
+    return with_validators(response, etag, last_modified)
+
+@app.route('/')
+def home():
+    """Home endpoint with API documentation"""
+    return jsonify(home_payload())
 
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat()
-    })
+    return jsonify(health_payload())
 
 @app.route('/api/search')
 def search():
     """Search companies by name"""
-    query = request.args.get('q', '').strip()
-    limit = min(int(request.args.get('limit', 20)), 100)
-    offset = int(request.args.get('offset', 0))
-    
-    if not query or len(query) < 2:
-        return jsonify({
-            'error': 'Query must be at least 2 characters',
-            'example': '/api/search?q=tesco'
-        }), 400
+    params, error = parse_search(request.args)
+    if error:
+        payload, status = error
+        return jsonify(payload), status
     
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Search with LIKE (case-insensitive using UPPER)
-        sql = """
-            SELECT 
-                company_number,
-                company_name,
-                company_status,
-                registered_office_postal_code,
-                date_of_creation,
-                sic_codes
-            FROM companies
-            WHERE UPPER(company_name) LIKE UPPER(?)
-            ORDER BY 
-                CASE 
-                    WHEN UPPER(company_name) = UPPER(?) THEN 0
-                    WHEN UPPER(company_name) LIKE UPPER(?) THEN 1
-                    ELSE 2
-                END,
-                company_name
-            LIMIT ? OFFSET ?
-        """
-        
-        search_pattern = f'%{query}%'
-        exact_match = query
-        starts_with = f'{query}%'
-        
-        cursor.execute(sql, (search_pattern, exact_match, starts_with, limit, offset))
-        results = cursor.fetchall()
-        
-        # Get total count
-        cursor.execute(
-            "SELECT COUNT(*) as total FROM companies WHERE UPPER(company_name) LIKE UPPER(?)",
-            (search_pattern,)
-        )
-        total = cursor.fetchone()['total']
-        
-        # Convert results to list of dicts
-        companies = []
-        for row in results:
-            company = {
-                'company_number': row['company_number'],
-                'company_name': row['company_name'],
-                'company_status': row['company_status'],
-                'postcode': row['registered_office_postal_code'],
-                'incorporation_date': row['date_of_creation']
-            }
-            
-            # Parse SIC codes if present
-            if row['sic_codes']:
-                try:
-                    company['sic_codes'] = json.loads(row['sic_codes'])
-                except:
-                    company['sic_codes'] = []
-            else:
-                company['sic_codes'] = []
-                
-            companies.append(company)
-        
-        conn.close()
-        
-        return jsonify({
-            'query': query,
-            'total': total,
-            'count': len(companies),
-            'limit': limit,
-            'offset': offset,
-            'results': companies
-        })
+        return serve(search_key(params), lambda conn: search_body(conn, **params))
         
     except Exception as e:
         return jsonify({
             'error': f'Database error: {str(e)}',
-            'query': query
+            'query': params['query']
         }), 500
 
 @app.route('/api/company/<company_number>')
 def get_company(company_number):
     """Get single company details"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT * FROM companies WHERE company_number = ?",
-            (company_number,)
-        )
-        company = cursor.fetchone()
-        
-        conn.close()
-        
-        if not company:
+        response = serve(cache_key('company', company_number),
+                         lambda conn: company_body(conn, company_number))
+        if response is None:
             return jsonify({
                 'error': 'Company not found',
                 'company_number': company_number
             }), 404
-        
-        # Convert to dict
-        result = dict(company)
-        
-        # Parse JSON fields
-        if result.get('sic_codes'):
-            try:
-                result['sic_codes'] = json.loads(result['sic_codes'])
-            except:
-                result['sic_codes'] = []
-        
-        if result.get('previous_names'):
-            try:
-                result['previous_names'] = json.loads(result['previous_names'])
-            except:
-                result['previous_names'] = []
-        
-        return jsonify(result)
+        return response
         
     except Exception as e:
         return jsonify({
@@ -203,60 +577,52 @@ def get_company(company_number):
 
 @app.route('/api/stats')
 def stats():
-    """Get database statistics"""
+    """Get database statistics (precomputed by the importer)"""
+    refresh = 'refresh' in request.args
+    if refresh and not refresh_allowed(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'refresh requires a valid X-Admin-Token'}), 403
+    
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Total companies
-        cursor.execute("SELECT COUNT(*) as total FROM companies")
-        total = cursor.fetchone()['total']
-        
-        # Companies by status
-        cursor.execute("""
-            SELECT company_status, COUNT(*) as count 
-            FROM companies 
-            WHERE company_status IS NOT NULL
-            GROUP BY company_status 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        status_breakdown = cursor.fetchall()
-        
-        # Active companies
-        cursor.execute(
-            "SELECT COUNT(*) as count FROM companies WHERE company_status = 'active'"
-        )
-        active = cursor.fetchone()['count']
-        
-        # Dissolved companies
-        cursor.execute(
-            "SELECT COUNT(*) as count FROM companies WHERE company_status LIKE '%dissolved%'"
-        )
-        dissolved = cursor.fetchone()['count']
+        if refresh:
+            refresh_stats()
+            response = json_body(stats_body(get_db()))
+            response.cache_control.no_store = True
+            return response
         
-        conn.close()
+        return serve(stats_key, stats_body)
         
+    except Exception as e:
         return jsonify({
-            'total_companies': total,
-            'active_companies': active,
-            'dissolved_companies': dissolved,
-            'status_breakdown': [
-                {
-                    'status': row['company_status'],
-                    'count': row['count'],
-                    'percentage': round(row['count'] / total * 100, 2)
-                }
-                for row in status_breakdown
-            ],
-            'last_updated': datetime.now().isoformat()
-        })
+            'error': f'Database error: {str(e)}'
+        }), 500
+
+@app.route('/api/sic')
+def sic():
+    """Companies per SIC code, under a section letter or code prefix"""
+    prefix, error = parse_sic_prefix(request.args)
+    if error:
+        payload, status = error
+        return jsonify(payload), status
+    
+    try:
+        return serve(sic_key(prefix), lambda conn: sic_body(conn, prefix))
         
     except Exception as e:
         return jsonify({
-            'error': f'Database error: {str(e)}'
+            'error': f'Database error: {str(e)}',
+            'prefix': prefix
         }), 500
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Response cache hit/miss and single-flight counters (per worker process)"""
+    return jsonify({**response_cache.stats(), 'single_flight': single_flight.stats()})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (per worker process)"""
+    return app.response_class(metrics_text(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/search/autocomplete')
 def autocomplete():
     """Quick autocomplete for company names"""
@@ -266,30 +632,7 @@ def autocomplete():
         return jsonify({'suggestions': []})
     
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Get companies that start with query
-        cursor.execute("""
-            SELECT company_number, company_name 
-            FROM companies 
-            WHERE UPPER(company_name) LIKE UPPER(?)
-            ORDER BY company_name
-            LIMIT 10
-        """, (f'{query}%',))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        suggestions = [
-            {
-                'company_number': row['company_number'],
-                'company_name': row['company_name']
-            }
-            for row in results
-        ]
-        
-        return jsonify({'suggestions': suggestions})
+        return jsonify(autocomplete_payload(get_db(), query))
         
     except Exception as e:
         return jsonify({'suggestions': [], 'error': str(e)})
@@ -306,7 +649,6 @@ if __name__ == '__main__':
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) as count FROM companies")
         count = cursor.fetchone()['count']
-        conn.close()
         print(f"✅ Database connected: {count:,} companies found")
     except Exception as e:
         print(f"❌ Database error: {e}")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+CompaniesHouses.com API - ASGI entry point
+
+Same routes and responses as app_main (the Flask app), served by FastAPI:
+
+    uvicorn asgi_main:app --host 0.0.0.0 --port 8000 --workers 4
+
+SQLite is blocking, so every query runs on a bounded thread pool
+(SQLITE_THREADS per process, each thread with its own pooled read-only
+connection) and the event loop only moves bytes. Identical requests that
+arrive while one is already being served share its result instead of
+queueing more work on the pool.
+
+To compare with the Flask deployment, point both at the same DATABASE_PATH
+and run the same load against each, e.g.
+
+    gunicorn -w 4 -b 0.0.0.0:5000 app_main:app
+    uvicorn asgi_main:app --workers 4 --port 8000
+    ab -n 20000 -c 64 'http://127.0.0.1:5000/api/search?q=tesco'
+    ab -n 20000 -c 64 'http://127.0.0.1:8000/api/search?q=tesco'
+"""
+
+import os
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from werkzeug.http import http_date
+
+import app_main
+from app_main import (
+    HTTP_MAX_AGE, autocomplete_payload, company_body, conditional_body, get_db,
+    health_payload, home_payload, metrics, metrics_text, parse_search, parse_sic_prefix,
+    refresh_allowed, refresh_stats, response_cache, search_body, search_key, sic_body, sic_key,
+    single_flight, stats_body, stats_key
+)
+from backend.instrumentation import end_request, start_request
+from backend.company_json import dumps
+from backend.response_cache import cache_key
+
+app = FastAPI(title="CompaniesHouses.com API")
+app.add_middleware(CORSMiddleware, allow_origins=['*'])
+
+# Bounded: more threads than this would only queue on SQLite's locks
+sqlite_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv('SQLITE_THREADS', 4)),
+    thread_name_prefix='sqlite'
+)
+
+# key -> future of the request being served right now
+in_flight = {}
+coalesced = 0
+
+async def run_db(function, *args):
+    """Run a blocking SQLite call on the thread pool (its timings go to this request)"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(sqlite_pool, context.run, function, *args)
+
+async def coalesce(key, function, *args):
+    """
+    run_db(function, *args), shared by every caller with the same key while
+    it runs. The work is shielded so one client disconnecting does not
+    cancel it for the others.
+    """
+    global coalesced
+    future = in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(run_db(function, *args))
+        in_flight[key] = future
+        future.add_done_callback(lambda done: in_flight.pop(key, None) if in_flight.get(key) is done else None)
+    else:
+        coalesced += 1
+    return await asyncio.shield(future)
+
+def json_response(payload, status_code=200, headers=None):
+    """JSON serialized exactly as the Flask app does it"""
+    return Response(dumps(payload), status_code=status_code, media_type='application/json', headers=headers)
+
+def validators(etag, last_modified):
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': f'public, max-age={HTTP_MAX_AGE}'
+    }
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+async def serve(request, key, build):
+    """ASGI response for conditional_body(); None when build() found nothing"""
+    if_none_match = request.headers.get('if-none-match')
+    if_modified_since = request.headers.get('if-modified-since')
+    status, body, etag, last_modified, cache_hit = await coalesce(
+        (key, if_none_match, if_modified_since),
+        conditional_body, key, build, if_none_match, if_modified_since
+    )
+    if status == 404:
+        return None
+    headers = validators(etag, last_modified)
+    if status == 304:
+        return Response(status_code=304, headers=headers)
+    if cache_hit:
+        headers['X-Cache'] = 'HIT'
+    return Response(body, media_type='application/json', headers=headers)
+
+@app.middleware('http')
+async def report_timings(request: Request, call_next):
+    """Server-Timing header and /metrics histograms for every request"""
+    timer, token = start_request()
+    try:
+        response = await call_next(request)
+        total = timer.elapsed()
+        response.headers['Server-Timing'] = timer.server_timing(total)
+        route = request.scope.get('route')
+        metrics.record(timer, route.path if route else 'unmatched', request.method, response.status_code, total)
+        return response
+    finally:
+        end_request(token)
+
+@app.get('/')
+async def home():
+    """Home endpoint with API documentation"""
+    return json_response(await run_db(home_payload))
+
+@app.get('/health')
+async def health():
+    """Health check endpoint"""
+    return json_response(health_payload())
+
+@app.get('/api/search')
+async def search(request: Request):
+    """Search companies by name"""
+    params, error = parse_search(request.query_params)
+    if error:
+        payload, status = error
+        return json_response(payload, status_code=status)
+    
+    try:
+        return await serve(request, search_key(params), lambda conn: search_body(conn, **params))
+    
+    except Exception as e:
+        return json_response({
+            'error': f'Database error: {str(e)}',
+            'query': params['query']
+        }, status_code=500)
+
+@app.get('/api/company/{company_number}')
+async def get_company(request: Request, company_number: str):
+    """Get single company details"""
+    try:
+        response = await serve(request, cache_key('company', company_number),
+                               lambda conn: company_body(conn, company_number))
+        if response is None:
+            return json_response({
+                'error': 'Company not found',
+                'company_number': company_number
+            }, status_code=404)
+        return response
+    
+    except Exception as e:
+        return json_response({
+            'error': f'Database error: {str(e)}',
+            'company_number': company_number
+        }, status_code=500)
+
+@app.get('/api/stats')
+async def stats(request: Request):
+    """Get database statistics (precomputed by the importer)"""
+    refresh = 'refresh' in request.query_params
+    if refresh and not refresh_allowed(request.headers.get('x-admin-token')):
+        return json_response({'error': 'refresh requires a valid X-Admin-Token'}, status_code=403)
+    
+    try:
+        if refresh:
+            await run_db(refresh_stats)
+            body = await run_db(lambda: stats_body(get_db()))
+            return Response(body, media_type='application/json', headers={'Cache-Control': 'no-store'})
+        
+        return await serve(request, stats_key, stats_body)
+    
+    except Exception as e:
+        return json_response({
+            'error': f'Database error: {str(e)}'
+        }, status_code=500)
+
+@app.get('/api/sic')
+async def sic(request: Request):
+    """Companies per SIC code, under a section letter or code prefix"""
+    prefix, error = parse_sic_prefix(request.query_params)
+    if error:
+        payload, status = error
+        return json_response(payload, status_code=status)
+    
+    try:
+        return await serve(request, sic_key(prefix), lambda conn: sic_body(conn, prefix))
+    
+    except Exception as e:
+        return json_response({
+            'error': f'Database error: {str(e)}',
+            'prefix': prefix
+        }, status_code=500)
+
+@app.get('/api/cache/stats')
+async def cache_stats():
+    """Response cache hit/miss and coalescing counters (per worker process)"""
+    return json_response({**response_cache.stats(), 'single_flight': single_flight.stats(), 'coalesced': coalesced})
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (per worker process)"""
+    text = metrics_text([('asgi_coalesced_requests_total', 'Requests that shared an in-flight response', coalesced)])
+    return Response(text, media_type='text/plain; version=0.0.4')
+
+@app.get('/api/search/autocomplete')
+async def autocomplete(q: str = ''):
+    """Quick autocomplete for company names"""
+    query = q.strip()
+    
+    if not query or len(query) < 2:
+        return json_response({'suggestions': []})
+    
+    try:
+        return json_response(await coalesce(('autocomplete', query), lambda: autocomplete_payload(get_db(), query)))
+    
+    except Exception as e:
+        return json_response({'suggestions': [], 'error': str(e)})
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    print("="*50)
+    print("🚀 CompaniesHouses.com API (ASGI)")
+    print(f"📁 Database: {app_main.DB_PATH}")
+    print("="*50)
+    
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,272 @@
+"""Prefix index behind /api/search/autocomplete"""
+
+import re
+import sqlite3
+import time
+import unicodedata
+
+from backend.fts import tokenize
+
+MIN_PREFIX = 2
+SUGGESTION_LIMIT = 10
+
+# Prefixes matching more names than this get a precomputed top-10 in
+# autocomplete_top; anything rarer is answered by a short range scan
+HEAVY_PREFIX_ROWS = 200
+
+# Incremental refresh is only worth it for a small share of changed names
+FULL_REBUILD_FRACTION = 0.1
+
+INSERT_BATCH = 10000
+
+NON_ALNUM_RE = re.compile(r'[^0-9A-Z]+')
+
+# Active companies first, then the most searched for, then alphabetical
+SUGGEST_ORDER = "is_active DESC, popularity DESC, name_key, company_number"
+
+TOP_SQL = """
+    SELECT company_number, company_name
+    FROM autocomplete_top
+    WHERE prefix = ?
+    ORDER BY position
+    LIMIT ?
+"""
+
+RANGE_SQL = f"""
+    SELECT company_number, company_name
+    FROM autocomplete_names
+    WHERE name_key >= ? AND name_key < ?
+    ORDER BY {SUGGEST_ORDER}
+    LIMIT ?
+"""
+
+# Until the importer (or scripts/build_autocomplete.py) has built the tables:
+# names whose first tokens are the query, the last one as a prefix
+FTS_PREFIX_SQL = """
+    SELECT c.company_number, c.company_name
+    FROM companies_fts
+    JOIN companies c ON c.rowid = companies_fts.rowid
+    WHERE companies_fts MATCH ?
+    ORDER BY c.company_status = 'active' DESC, c.company_name, c.company_number
+    LIMIT ?
+"""
+
+def create_autocomplete_tables(cursor):
+    """Create the autocomplete tables (idempotent)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS autocomplete_names (
+        company_number TEXT PRIMARY KEY,
+        name_key TEXT NOT NULL,
+        company_name TEXT NOT NULL,
+        is_active INTEGER NOT NULL,
+        popularity INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+    # Covering: range scans never touch the table itself
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_autocomplete_key
+    ON autocomplete_names(name_key, is_active, popularity, company_name)
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS autocomplete_top (
+        prefix TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        company_number TEXT NOT NULL,
+        company_name TEXT NOT NULL,
+        PRIMARY KEY (prefix, position)
+    ) WITHOUT ROWID
+    """)
+
+def normalize_name(name):
+    """Uppercase, strip accents and collapse punctuation: 'Café-Bar Ltd.' -> 'CAFE BAR LTD'"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return NON_ALNUM_RE.sub(' ', stripped.upper()).strip()
+
+def _prefix_end(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def suggest(conn, query, limit=SUGGESTION_LIMIT):
+    """Suggestions for names starting with query, best first"""
+    key = normalize_name(query)
+    if len(key) < MIN_PREFIX:
+        return []
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(TOP_SQL, (key, limit))
+    except sqlite3.OperationalError:
+        # Database created before the autocomplete tables existed
+        return _fts_suggest(cursor, query, limit)
+    rows = cursor.fetchall()
+    if not rows:
+        # Not a heavy prefix, so at most HEAVY_PREFIX_ROWS names to rank
+        cursor.execute(RANGE_SQL, (key, _prefix_end(key), limit))
+        rows = cursor.fetchall()
+    return rows
+
+def _fts_suggest(cursor, query, limit):
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    cursor.execute(FTS_PREFIX_SQL, (f'company_name : ^"{" ".join(tokens)}" *', limit))
+    return cursor.fetchall()
+
+def _company_rows(cursor, where='', params=()):
+    cursor.execute(f"""
+        SELECT companies.company_number, companies.company_name,
+               companies.company_status, companies.search_popularity
+        FROM companies {where}
+    """, params)
+    for number, name, status, popularity in cursor:
+        yield (number, normalize_name(name), name, 1 if status == 'active' else 0, popularity or 0)
+
+def _store_top(cursor, prefix):
+    cursor.execute("DELETE FROM autocomplete_top WHERE prefix = ?", (prefix,))
+    cursor.execute(f"""
+        INSERT INTO autocomplete_top (prefix, position, company_number, company_name)
+        SELECT ?, ROW_NUMBER() OVER (ORDER BY {SUGGEST_ORDER}), company_number, company_name
+        FROM (
+            SELECT * FROM autocomplete_names
+            WHERE name_key >= ? AND name_key < ?
+            ORDER BY {SUGGEST_ORDER}
+            LIMIT ?
+        )
+    """, (prefix, prefix, _prefix_end(prefix), SUGGESTION_LIMIT))
+
+def _heavy_prefixes(cursor):
+    """
+    Every prefix shared by more than HEAVY_PREFIX_ROWS names, found in one
+    pass over the keys in index order: names sharing a prefix are
+    contiguous, so a prefix's count is where its run ends minus where it began.
+    """
+    heavy = []
+    run_starts = []
+    previous = ''
+    position = 0
+
+    def close_runs(depth):
+        for length in range(len(run_starts), depth, -1):
+            if length >= MIN_PREFIX and position - run_starts[length - 1] > HEAVY_PREFIX_ROWS:
+                heavy.append(previous[:length])
+        del run_starts[depth:]
+
+    cursor.execute("SELECT name_key FROM autocomplete_names ORDER BY name_key")
+    for (key,) in cursor:
+        common = 0
+        limit = min(len(previous), len(key))
+        while common < limit and previous[common] == key[common]:
+            common += 1
+        close_runs(common)
+        run_starts.extend([position] * (len(key) - common))
+        previous = key
+        position += 1
+    close_runs(0)
+    return heavy
+
+def rebuild_autocomplete(conn):
+    """Rebuild both autocomplete tables from companies"""
+    start = time.time()
+    cursor = conn.cursor()
+    create_autocomplete_tables(cursor)
+    cursor.execute("DELETE FROM autocomplete_names")
+    cursor.execute("DELETE FROM autocomplete_top")
+
+    reader = conn.cursor()
+    batch = []
+    for row in _company_rows(reader):
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH:
+            cursor.executemany("INSERT INTO autocomplete_names VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        cursor.executemany("INSERT INTO autocomplete_names VALUES (?, ?, ?, ?, ?)", batch)
+
+    heavy = _heavy_prefixes(reader)
+    for prefix in heavy:
+        _store_top(cursor, prefix)
+    conn.commit()
+
+    return {'mode': 'full', 'heavy_prefixes': len(heavy), 'seconds': round(time.time() - start, 1)}
+
+def refresh_autocomplete(conn):
+    """
+    Bring the autocomplete tables up to date after an import, touching only
+    names whose company was added, renamed, removed or changed status.
+    Falls back to a full rebuild when the tables are empty or much changed.
+    """
+    start = time.time()
+    cursor = conn.cursor()
+    create_autocomplete_tables(cursor)
+
+    cursor.execute("SELECT COUNT(*) FROM autocomplete_names")
+    indexed = cursor.fetchone()[0]
+    if indexed == 0:
+        return rebuild_autocomplete(conn)
+
+    reader = conn.cursor()
+    changed = list(_company_rows(reader, """
+        LEFT JOIN autocomplete_names a USING (company_number)
+        WHERE a.company_number IS NULL
+           OR a.company_name IS NOT companies.company_name
+           OR a.is_active != (COALESCE(companies.company_status, '') = 'active')
+           OR a.popularity != COALESCE(companies.search_popularity, 0)
+    """))
+    cursor.execute("""
+        SELECT company_number, name_key FROM autocomplete_names
+        WHERE company_number NOT IN (SELECT company_number FROM companies)
+    """)
+    removed = cursor.fetchall()
+
+    if len(changed) + len(removed) > indexed * FULL_REBUILD_FRACTION:
+        return rebuild_autocomplete(conn)
+
+    # Old keys matter too: a renamed company leaves its old prefixes
+    affected_keys = {key for _, key in removed}
+    numbers = [row[0] for row in changed]
+    for i in range(0, len(numbers), 500):
+        chunk = numbers[i:i + 500]
+        cursor.execute(
+            f"SELECT name_key FROM autocomplete_names WHERE company_number IN ({','.join('?' * len(chunk))})",
+            chunk
+        )
+        affected_keys.update(key for (key,) in cursor.fetchall())
+    affected_keys.update(row[1] for row in changed)
+
+    cursor.executemany("DELETE FROM autocomplete_names WHERE company_number = ?",
+                       [(number,) for number, _ in removed])
+    cursor.executemany("INSERT OR REPLACE INTO autocomplete_names VALUES (?, ?, ?, ?, ?)", changed)
+
+    # A prefix can only be heavy if its parent is, so stop at the first light one
+    prefixes = {key[:length] for key in affected_keys for length in range(MIN_PREFIX, len(key) + 1)}
+    light = set()
+    for prefix in sorted(prefixes, key=len):
+        if prefix[:-1] in light:
+            light.add(prefix)
+            continue
+        cursor.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM autocomplete_names WHERE name_key >= ? AND name_key < ? LIMIT ?
+            )
+        """, (prefix, _prefix_end(prefix), HEAVY_PREFIX_ROWS + 1))
+        if cursor.fetchone()[0] > HEAVY_PREFIX_ROWS:
+            _store_top(cursor, prefix)
+        else:
+            light.add(prefix)
+
+    # Light prefixes keep no stored top list: drop theirs in one statement
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS light_prefixes (prefix TEXT PRIMARY KEY)")
+    cursor.execute("DELETE FROM light_prefixes")
+    cursor.executemany("INSERT INTO light_prefixes (prefix) VALUES (?)", [(prefix,) for prefix in light])
+    cursor.execute("DELETE FROM autocomplete_top WHERE prefix IN (SELECT prefix FROM light_prefixes)")
+    cursor.execute("DROP TABLE light_prefixes")
+    conn.commit()
+
+    return {
+        'mode': 'incremental',
+        'changed': len(changed),
+        'removed': len(removed),
+        'prefixes_checked': len(prefixes),
+        'seconds': round(time.time() - start, 1),
+    }
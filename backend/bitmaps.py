@@ -0,0 +1,495 @@
+"""
+Bitmap filters for search: company_status, company_type, jurisdiction,
+accounts_category, has_charges and registered_office_region.
+
+Every value of those columns has a roaring-style bitmap of the company
+rowids that hold it: rowids are split into chunks of 65,536 and each
+chunk is a sorted array('H') of its low 16 bits while it is sparse, or an
+int with one bit per rowid once it is dense. An expression such as
+
+    company_status:active AND NOT has_charges:true
+
+is combined chunk by chunk (int &, |, & ~ for dense chunks) into a mask
+with one byte per rowid, bound to the search as a blob: SQLite checks
+each full-text match with substr(mask, rowid + 1, 1) instead of reading
+its companies row.
+
+The importer writes the bitmaps to a snapshot file next to the database
+and API processes load it; they never build or write bitmaps themselves.
+Until a snapshot matching the database exists, sql_condition() applies
+the same expression to each match's companies row instead.
+"""
+
+import os
+import re
+import sys
+import json
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from itertools import groupby
+
+from backend.db import get_import_metadata, set_import_metadata
+
+BITMAP_FIELDS = (
+    'company_status', 'company_type', 'jurisdiction',
+    'accounts_category', 'has_charges', 'registered_office_region',
+)
+
+FIELD_ALIASES = {
+    'status': 'company_status',
+    'type': 'company_type',
+    'accounts': 'accounts_category',
+    'charges': 'has_charges',
+    'region': 'registered_office_region',
+}
+
+BITMAPS_SOURCE_SQL = f"SELECT rowid, {', '.join(BITMAP_FIELDS)} FROM companies ORDER BY rowid"
+
+# Chunks with more rowids than this are stored as bits (8KB) rather than an array
+ARRAY_MAX = 4096
+CHUNK_BYTES = 65536 // 8
+
+# Longest filter accepted (also bounds how deeply parentheses can nest)
+MAX_FILTER_LENGTH = 500
+
+# Masks kept per process (one byte per company rowid each: ~6MB for 5.6M companies)
+MAX_MASKS = 16
+
+# Appended to the search's WHERE, with a mask (BitmapIndex.mask) as its parameter
+BITMAP_CONDITION = " AND substr(?, companies_fts.rowid + 1, 1) = x'01'"
+
+# Column values normalized like normalize_value(), for sql_condition().
+# Runs of inner whitespace are not collapsed as they are in the bitmaps.
+_SQL_VALUES = {field: f"lower(trim(c.{field}))" for field in BITMAP_FIELDS}
+_SQL_VALUES['has_charges'] = (
+    "CASE lower(trim(c.has_charges)) WHEN 'true' THEN '1' WHEN 'yes' THEN '1' "
+    "WHEN 'false' THEN '0' WHEN 'no' THEN '0' ELSE lower(trim(c.has_charges)) END"
+)
+
+# Byte i of a bits container, spread to 8 bytes of 0/1
+_SPREAD = [bytes((byte >> bit) & 1 for byte in range(256)) for bit in range(8)]
+
+SNAPSHOT_MAGIC = b'CHBITMAP1\n'
+
+def normalize_value(field, value):
+    """The form values are indexed and looked up in: lower case, single spaces"""
+    if field == 'has_charges':
+        text = str(value).strip().lower()
+        return {'true': '1', 'yes': '1', 'false': '0', 'no': '0'}.get(text, text)
+    return ' '.join(str(value).split()).lower()
+
+def snapshot_path(db_path):
+    """Where the bitmaps of db_path are snapshotted (companies.db -> companies.bitmaps)"""
+    return os.path.splitext(db_path)[0] + '.bitmaps'
+
+# Containers: sorted array('H') of low 16 bits, or an int bitset
+
+def _bits(container):
+    if isinstance(container, int):
+        return container
+    data = bytearray(CHUNK_BYTES)
+    for low in container:
+        data[low >> 3] |= 1 << (low & 7)
+    return int.from_bytes(data, 'little')
+
+def _container(lows):
+    """Container for sorted low 16 bits"""
+    return _bits(lows) if len(lows) > ARRAY_MAX else array('H', lows)
+
+def _and(a, b):
+    if isinstance(a, int):
+        if isinstance(b, int):
+            return a & b
+        a, b = b, a
+    if isinstance(b, int):
+        data = b.to_bytes(CHUNK_BYTES, 'little')
+        return array('H', [low for low in a if data[low >> 3] >> (low & 7) & 1])
+    return array('H', sorted(set(a).intersection(b)))
+
+def _or(a, b):
+    if isinstance(a, int) or isinstance(b, int):
+        return _bits(a) | _bits(b)
+    return _container(sorted(set(a).union(b)))
+
+def _andnot(a, b):
+    if isinstance(a, int):
+        return a & ~_bits(b)
+    if isinstance(b, int):
+        data = b.to_bytes(CHUNK_BYTES, 'little')
+        return array('H', [low for low in a if not data[low >> 3] >> (low & 7) & 1])
+    return array('H', sorted(set(a).difference(b)))
+
+class Bitmap:
+    """A set of rowids as {rowid >> 16: container}; empty containers are dropped"""
+
+    __slots__ = ('containers',)
+
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+
+    def __and__(self, other):
+        small, large = sorted((self.containers, other.containers), key=len)
+        containers = {}
+        for high, container in small.items():
+            if high in large:
+                result = _and(container, large[high])
+                if result:
+                    containers[high] = result
+        return Bitmap(containers)
+
+    def __or__(self, other):
+        containers = dict(self.containers)
+        for high, container in other.containers.items():
+            containers[high] = _or(containers[high], container) if high in containers else container
+        return Bitmap(containers)
+
+    def __sub__(self, other):
+        containers = {}
+        for high, container in self.containers.items():
+            if high in other.containers:
+                container = _andnot(container, other.containers[high])
+            if container:
+                containers[high] = container
+        return Bitmap(containers)
+
+    def __len__(self):
+        return sum(c.bit_count() if isinstance(c, int) else len(c) for c in self.containers.values())
+
+    def mask(self, size):
+        """size bytes, byte i 1 if rowid i is in the bitmap and 0 if not"""
+        mask = bytearray(size)
+        for high, container in self.containers.items():
+            base = high << 16
+            if isinstance(container, int):
+                data = container.to_bytes(CHUNK_BYTES, 'little')
+                chunk = bytearray(65536)
+                for bit, table in enumerate(_SPREAD):
+                    chunk[bit::8] = data.translate(table)
+                mask[base:base + 65536] = chunk
+            else:
+                for low in container:
+                    mask[base + low] = 1
+        return bytes(mask)
+
+    def to_bytes(self):
+        parts = [struct.pack('<I', len(self.containers))]
+        for high, container in sorted(self.containers.items()):
+            if isinstance(container, int):
+                parts.append(struct.pack('<IBI', high, 1, CHUNK_BYTES))
+                parts.append(container.to_bytes(CHUNK_BYTES, 'little'))
+            else:
+                if sys.byteorder == 'big':
+                    container = array('H', container)
+                    container.byteswap()
+                parts.append(struct.pack('<IBI', high, 0, len(container)))
+                parts.append(container.tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """(Bitmap, offset after it) read from data at offset"""
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        containers = {}
+        for _ in range(count):
+            high, kind, size = struct.unpack_from('<IBI', data, offset)
+            offset += 9
+            if kind == 1:
+                containers[high] = int.from_bytes(data[offset:offset + size], 'little')
+                offset += size
+            else:
+                container = array('H')
+                container.frombytes(data[offset:offset + 2 * size])
+                if sys.byteorder == 'big':
+                    container.byteswap()
+                containers[high] = container
+                offset += 2 * size
+        return cls(containers), offset
+
+def build_bitmaps(conn):
+    """
+    (universe, {field: {value: Bitmap}}) from companies in one scan;
+    universe holds every company rowid
+    """
+    universe = {}
+    bitmaps = {field: defaultdict(dict) for field in BITMAP_FIELDS}
+    cursor = conn.cursor()
+    cursor.execute(BITMAPS_SOURCE_SQL)
+    for high, rows in groupby(cursor, key=lambda row: row[0] >> 16):
+        chunk = [defaultdict(list) for _ in BITMAP_FIELDS]
+        lows = []
+        for row in rows:
+            low = row[0] & 0xFFFF
+            lows.append(low)
+            for values, value in zip(chunk, row[1:]):
+                if value is not None:
+                    values[value].append(low)
+        universe[high] = _container(lows)
+        for field, values in zip(BITMAP_FIELDS, chunk):
+            for value, value_lows in values.items():
+                # 'Active' and 'active' share one bitmap
+                containers = bitmaps[field][normalize_value(field, value)]
+                container = _container(value_lows)
+                containers[high] = _or(containers[high], container) if high in containers else container
+    return Bitmap(universe), {
+        field: {value: Bitmap(containers) for value, containers in values.items()}
+        for field, values in bitmaps.items()
+    }
+
+def write_snapshot(path, built_at, universe, bitmaps):
+    """Write the bitmaps to path (atomically: readers see the old file or the new one)"""
+    header = {
+        'built_at': built_at,
+        'fields': {field: list(values) for field, values in bitmaps.items()},
+    }
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(json.dumps(header).encode('utf-8') + b'\n')
+        f.write(universe.to_bytes())
+        for field, values in bitmaps.items():
+            for bitmap in values.values():
+                f.write(bitmap.to_bytes())
+    os.replace(temp_path, path)
+
+def read_snapshot(path):
+    """(built_at, universe, bitmaps) from a snapshot, or None if it is missing or unreadable"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(SNAPSHOT_MAGIC):
+            return None
+        end = data.index(b'\n', len(SNAPSHOT_MAGIC))
+        header = json.loads(data[len(SNAPSHOT_MAGIC):end])
+        view = memoryview(data)
+        universe, offset = Bitmap.from_bytes(view, end + 1)
+        bitmaps = {}
+        for field, values in header['fields'].items():
+            bitmaps[field] = {}
+            for value in values:
+                bitmaps[field][value], offset = Bitmap.from_bytes(view, offset)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    return header['built_at'], universe, bitmaps
+
+def rebuild_bitmaps(conn, path):
+    """Build the bitmaps from companies and snapshot them to path (importer side)"""
+    start = time.time()
+    universe, bitmaps = build_bitmaps(conn)
+    built_at = datetime.now(timezone.utc).isoformat()
+    write_snapshot(path, built_at, universe, bitmaps)
+    set_import_metadata(conn, 'bitmaps_built_at', built_at)
+    conn.commit()
+    return {
+        'rows': len(universe),
+        'values': sum(len(values) for values in bitmaps.values()),
+        'bytes': os.path.getsize(path),
+        'seconds': round(time.time() - start, 1),
+    }
+
+# Filter expressions: field:value terms with AND, OR, NOT and parentheses.
+# Adjacent terms are ANDed; NOT binds tightest, then AND, then OR.
+
+TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<open>\() | (?P<close>\)) |
+        (?P<field>[A-Za-z_]+):(?:"(?P<quoted>[^"]*)"|(?P<bare>[^\s()"]+)) |
+        (?P<word>[^\s()"]+)
+    )\s*
+''', re.VERBOSE)
+
+def _tokens(text):
+    position = 0
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f'filter: unexpected {text[position:position + 20]!r}')
+        position = match.end()
+        if match.group('open'):
+            yield ('(',)
+        elif match.group('close'):
+            yield (')',)
+        elif match.group('field'):
+            name = match.group('field').lower()
+            field = FIELD_ALIASES.get(name, name)
+            if field not in BITMAP_FIELDS:
+                raise ValueError(f"filter: unknown field {name!r}; use one of {', '.join(BITMAP_FIELDS)}")
+            value = match.group('quoted') if match.group('quoted') is not None else match.group('bare')
+            yield ('term', field, normalize_value(field, value))
+        elif match.group('word').upper() in ('AND', 'OR', 'NOT'):
+            yield (match.group('word').upper(),)
+        else:
+            raise ValueError(f"filter: expected field:value, got {match.group('word')!r}")
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = list(_tokens(text))
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self):
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f'filter: unexpected {self.peek()!r}')
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == 'OR':
+            self.take()
+            node = ('OR', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() in ('AND', 'NOT', 'term', '('):
+            if self.peek() == 'AND':
+                self.take()
+            node = ('AND', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.take()
+            return ('NOT', self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind = self.peek()
+        if kind == 'term':
+            return self.take()
+        if kind == '(':
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise ValueError('filter: missing )')
+            self.take()
+            return node
+        raise ValueError('filter: expected field:value or (' if kind is None else f'filter: unexpected {kind!r}')
+
+def _render(node):
+    if node[0] == 'term':
+        return f'{node[1]}:"{node[2]}"'
+    if node[0] == 'NOT':
+        return f'NOT {_render(node[1])}'
+    return f'({_render(node[1])} {node[0]} {_render(node[2])})'
+
+def parse_filter(text):
+    """
+    Canonical form of a filter expression (fields in full, values
+    normalized, fully parenthesized), which masks and cursors are keyed
+    by. Raises ValueError for an invalid one.
+    """
+    if len(text) > MAX_FILTER_LENGTH:
+        raise ValueError(f'filter is limited to {MAX_FILTER_LENGTH} characters')
+    return _render(_Parser(text).parse())
+
+def evaluate(node, universe, bitmaps):
+    """Bitmap of the rowids a parsed filter matches"""
+    kind = node[0]
+    if kind == 'term':
+        bitmap = bitmaps.get(node[1], {}).get(node[2])
+        return Bitmap() if bitmap is None else bitmap
+    if kind == 'NOT':
+        return universe - evaluate(node[1], universe, bitmaps)
+    if kind == 'OR':
+        return evaluate(node[1], universe, bitmaps) | evaluate(node[2], universe, bitmaps)
+    # a AND NOT b is a - b, without complementing b against every company
+    left, right = node[1], node[2]
+    if left[0] == 'NOT' and right[0] != 'NOT':
+        left, right = right, left
+    if right[0] == 'NOT':
+        return evaluate(left, universe, bitmaps) - evaluate(right[1], universe, bitmaps)
+    return evaluate(left, universe, bitmaps) & evaluate(right, universe, bitmaps)
+
+def _sql(node, params):
+    kind = node[0]
+    if kind == 'term':
+        params.append(node[2])
+        # NULL matches no value, so NOT field:value includes it (as universe - bitmap does)
+        return f'IFNULL({_SQL_VALUES[node[1]]} = ?, 0)'
+    if kind == 'NOT':
+        return f'NOT {_sql(node[1], params)}'
+    return f'({_sql(node[1], params)} {kind} {_sql(node[2], params)})'
+
+def sql_condition(expression):
+    """
+    (SQL, params) testing a parse_filter() expression on each match's
+    companies row (aliased c): what the search uses in place of
+    BITMAP_CONDITION while there is no snapshot to build masks from
+    """
+    params = []
+    sql = _sql(_Parser(expression).parse(), params)
+    return f' AND {sql}', tuple(params)
+
+class BitmapIndex:
+    """
+    The bitmaps of one database, loaded from the importer's snapshot on
+    first use and reloaded when it rebuilds them, plus the masks of recent
+    filters. Shared by a process's threads.
+    """
+
+    def __init__(self, path, max_masks=MAX_MASKS):
+        self.path = path
+        self.max_masks = max_masks
+        self._lock = threading.Lock()
+        self._loaded_key = None
+        self._bitmaps = None
+        self._masks = OrderedDict()
+
+    def bitmaps(self, conn):
+        """
+        (universe, {field: {value: Bitmap}}) for conn's data, or None while
+        the snapshot is missing or from another build (bitmaps_built_at)
+        """
+        built_at = get_import_metadata(conn, 'bitmaps_built_at')
+        if built_at is None:
+            return None
+        try:
+            modified = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            # Held while reading, so one thread loads a new snapshot; a
+            # mismatched one is not read again until the file changes
+            if (built_at, modified) != self._loaded_key:
+                snapshot = read_snapshot(self.path)
+                valid = snapshot is not None and snapshot[0] == built_at
+                self._loaded_key, self._bitmaps = (built_at, modified), snapshot[1:] if valid else None
+                self._masks.clear()
+            return self._bitmaps
+
+    def mask(self, conn, expression):
+        """
+        The BITMAP_CONDITION parameter for a parse_filter() expression on
+        conn's data, or None if there is no valid snapshot (see sql_condition)
+        """
+        loaded = self.bitmaps(conn)
+        if loaded is None:
+            return None
+        universe, bitmaps = loaded
+        with self._lock:
+            mask = self._masks.get(expression)
+            if mask is not None:
+                self._masks.move_to_end(expression)
+                return mask
+        size = (max(universe.containers, default=-1) + 1) << 16
+        mask = evaluate(_Parser(expression).parse(), universe, bitmaps).mask(size)
+        with self._lock:
+            if self._bitmaps is not loaded:
+                # Reloaded meanwhile; don't keep a mask of the old data
+                return mask
+            self._masks[expression] = mask
+            while len(self._masks) > self.max_masks:
+                self._masks.popitem(last=False)
+        return mask
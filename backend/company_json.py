@@ -0,0 +1,124 @@
+"""Ready-to-send JSON for each company, built by the importer and streamed by the API"""
+
+import json
+import sqlite3
+import time
+
+INSERT_BATCH = 10000
+
+# Whole page of search results in one query instead of one per row
+BLOB_LOOKUP_BATCH = 500
+
+# Same output as Flask's jsonify outside debug mode
+def dumps(obj):
+    """Serialize obj to compact JSON bytes"""
+    return json.dumps(obj, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+def _json_list(value):
+    if not value:
+        return []
+    try:
+        return json.loads(value)
+    except ValueError:
+        return []
+
+def search_row_blob(row):
+    """The /api/search result entry for a companies row, as JSON bytes"""
+    return dumps({
+        'company_number': row['company_number'],
+        'company_name': row['company_name'],
+        'company_status': row['company_status'],
+        'postcode': row['registered_office_postal_code'],
+        'incorporation_date': row['date_of_creation'],
+        'sic_codes': _json_list(row['sic_codes'])
+    })
+
+def company_blob(row):
+    """The /api/company body for a full companies row, as JSON bytes"""
+    result = dict(row)
+    if result.get('sic_codes'):
+        result['sic_codes'] = _json_list(result['sic_codes'])
+    if result.get('previous_names'):
+        result['previous_names'] = _json_list(result['previous_names'])
+    return dumps(result)
+
+def results_body(envelope, blobs):
+    """envelope serialized with a 'results' array spliced in from pre-serialized rows"""
+    head = dumps(envelope)
+    return head[:-1] + b',"results":[' + b','.join(blobs) + b']}'
+
+def create_company_json_table(cursor):
+    """Create the pre-serialized JSON table (idempotent)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS company_json (
+        company_number TEXT PRIMARY KEY,
+        source_updated TEXT,
+        detail BLOB NOT NULL,
+        search_row BLOB NOT NULL
+    ) WITHOUT ROWID
+    """)
+
+def load_company_blob(conn, company_number):
+    """Pre-serialized /api/company body, or None (not built, or no such company)"""
+    try:
+        row = conn.execute("SELECT detail FROM company_json WHERE company_number = ?",
+                           (company_number,)).fetchone()
+    except sqlite3.OperationalError:
+        # Database created before company_json existed
+        return None
+    return bytes(row[0]) if row else None
+
+def load_search_blobs(conn, company_numbers):
+    """{company_number: search row JSON bytes} for the numbers that have one"""
+    blobs = {}
+    try:
+        for i in range(0, len(company_numbers), BLOB_LOOKUP_BATCH):
+            chunk = company_numbers[i:i + BLOB_LOOKUP_BATCH]
+            rows = conn.execute(
+                f"SELECT company_number, search_row FROM company_json "
+                f"WHERE company_number IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            blobs.update((number, bytes(blob)) for number, blob in rows)
+    except sqlite3.OperationalError:
+        return {}
+    return blobs
+
+def refresh_company_json(conn):
+    """
+    Serialize every company whose row changed since its JSON was built
+    (companies.last_updated moves on every write) and drop JSON for
+    companies that are gone. On an empty table this is a full build.
+    """
+    start = time.time()
+    cursor = conn.cursor()
+    create_company_json_table(cursor)
+
+    reader = conn.cursor()
+    reader.row_factory = sqlite3.Row
+    reader.execute("""
+        SELECT c.* FROM companies c
+        LEFT JOIN company_json j USING (company_number)
+        WHERE j.company_number IS NULL OR j.source_updated IS NOT c.last_updated
+    """)
+
+    built = 0
+    batch = []
+    for row in reader:
+        batch.append((row['company_number'], row['last_updated'], company_blob(row), search_row_blob(row)))
+        if len(batch) >= INSERT_BATCH:
+            cursor.executemany("INSERT OR REPLACE INTO company_json VALUES (?, ?, ?, ?)", batch)
+            built += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany("INSERT OR REPLACE INTO company_json VALUES (?, ?, ?, ?)", batch)
+        built += len(batch)
+
+    cursor.execute("""
+        DELETE FROM company_json
+        WHERE company_number NOT IN (SELECT company_number FROM companies)
+    """)
+    removed = cursor.rowcount
+    conn.commit()
+
+    return {'built': built, 'removed': removed, 'seconds': round(time.time() - start, 1)}
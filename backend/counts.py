@@ -0,0 +1,138 @@
+"""Total-count strategies for search results"""
+
+import re
+import threading
+from collections import OrderedDict
+
+from backend.db import get_data_version
+
+COUNT_MODES = ('exact', 'capped', 'estimate')
+DEFAULT_COUNT_MODE = 'capped'
+COUNT_CAP = 10000
+
+# {source} is companies_fts alone, or joined to companies (as c) when
+# {filters} has conditions on it (see backend.sic.sic_filter; bitmap
+# filters only need companies_fts.rowid)
+EXACT_COUNT_SQL = "SELECT COUNT(*) FROM {source} WHERE companies_fts MATCH ?{filters}"
+
+# Stops counting after cap + 1 index hits instead of walking the whole match set
+CAPPED_COUNT_SQL = """
+    SELECT COUNT(*) FROM (
+        SELECT 1 FROM {source} WHERE companies_fts MATCH ?{filters} LIMIT ?
+    )
+"""
+
+# rowid of the cap-th match; FTS5 returns full-text matches in rowid order
+NTH_MATCH_SQL = "SELECT companies_fts.rowid FROM {source} WHERE companies_fts MATCH ?{filters} LIMIT 1 OFFSET ?"
+
+FILTERED_SOURCE = "companies_fts JOIN companies c ON c.rowid = companies_fts.rowid"
+
+# First and last company rowid. Two subqueries: SQLite only answers a lone
+# MIN() or MAX() from the end of the b-tree, MIN(rowid), MAX(rowid) together
+# read the whole table
+ROWID_RANGE_SQL = "SELECT (SELECT MIN(rowid) FROM companies), (SELECT MAX(rowid) FROM companies)"
+
+def filter_source(filters):
+    """companies_fts alone, unless filters has conditions on companies (as c)"""
+    return FILTERED_SOURCE if re.search(r'\bc\.', filters) else 'companies_fts'
+
+def _count_sql(template, filters):
+    return template.format(source=filter_source(filters), filters=filters)
+
+class CountCache:
+    """
+    Small LRU of (mode, cap, match) -> (total, kind).
+    Entries belong to one data version; the first lookup that sees a newer
+    version (i.e. after an import) empties the cache.
+    """
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                return None
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, version, key, value):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+def _estimate(cursor, match, cap, filters='', filter_params=()):
+    """
+    Extrapolate from how far into the rowid range the cap-th match sits.
+    Company rowids follow import order, which is unrelated to name tokens,
+    so matches are spread roughly evenly across the range.
+    """
+    cursor.execute(_count_sql(NTH_MATCH_SQL, filters), (match, *filter_params, cap - 1))
+    row = cursor.fetchone()
+    if row is None:
+        # Fewer than cap matches - counting them is cheap and exact
+        cursor.execute(_count_sql(EXACT_COUNT_SQL, filters), (match, *filter_params))
+        return cursor.fetchone()[0], 'exact'
+
+    cursor.execute(ROWID_RANGE_SQL)
+    first, last = cursor.fetchone()
+    covered = row[0] - first + 1
+    return max(cap, int(cap * (last - first + 1) / covered)), 'estimate'
+
+def count_matches(conn, match, mode=DEFAULT_COUNT_MODE, cap=COUNT_CAP, cache=None, filters='', filter_params=(),
+                  filter_key=None):
+    """
+    Count FTS matches for a MATCH expression, narrowed by filters (SQL
+    conditions on companies as c) bound to filter_params. filter_key stands
+    in for filter_params in the cache key when they are large (bitmap masks).
+    Returns (total, kind) where kind says how far to trust total:
+    'exact', 'capped' (at least total) or 'estimate'.
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"count must be one of {', '.join(COUNT_MODES)}")
+
+    key = (mode, cap, match.lower(), filters, tuple(filter_params if filter_key is None else filter_key))
+    version = None
+    if cache is not None:
+        version = get_data_version(conn)
+        cached = cache.get(version, key)
+        if cached is not None:
+            return cached
+
+    cursor = conn.cursor()
+    if mode == 'exact':
+        cursor.execute(_count_sql(EXACT_COUNT_SQL, filters), (match, *filter_params))
+        result = (cursor.fetchone()[0], 'exact')
+    elif mode == 'capped':
+        cursor.execute(_count_sql(CAPPED_COUNT_SQL, filters), (match, *filter_params, cap + 1))
+        total = cursor.fetchone()[0]
+        result = (cap, 'capped') if total > cap else (total, 'exact')
+    else:
+        result = _estimate(cursor, match, cap, filters, filter_params)
+
+    if cache is not None:
+        cache.put(version, key, result)
+    return result
+
+def format_total(total, kind):
+    """Human readable total, e.g. '1,234', '10,000+' or '~48,000'"""
+    if kind == 'capped':
+        return f"{total:,}+"
+    if kind == 'estimate':
+        return f"~{total:,}"
+    return f"{total:,}"
@@ -0,0 +1,122 @@
+"""SQLite connection pooling and data-version stamps shared by the API and importers"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+# Same cache/mmap sizing create_schema.py uses for the import connection
+READ_PRAGMAS = (
+    "PRAGMA cache_size=-64000",      # 64MB page cache per connection
+    "PRAGMA mmap_size=268435456",    # 256MB memory map
+    "PRAGMA temp_store=MEMORY",      # Sorts for ORDER BY stay off the SD card
+    "PRAGMA query_only=1",
+)
+
+class ConnectionPool:
+    """
+    One read-only connection per worker thread, opened and tuned once and
+    reused for every request that thread serves.
+
+    Each checkout compares the database file's (device, inode) with the one
+    the connection was opened on, so swapping in a freshly imported
+    companies.db (mv new.db companies.db) recycles connections on their next
+    use instead of serving the unlinked file forever.
+
+    Works best under gunicorn sync/gthread workers; the Flask dev server
+    starts a thread per request, so there each request still connects afresh.
+    """
+
+    def __init__(self, db_path, pragmas=READ_PRAGMAS, factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.factory = factory
+        self._local = threading.local()
+
+    def _file_id(self):
+        stat = os.stat(self.db_path)
+        return (stat.st_dev, stat.st_ino)
+
+    def _connect(self):
+        conn = sqlite3.connect(f'file:{quote(self.db_path)}?mode=ro', uri=True, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self):
+        """Get this thread's connection, reconnecting if the file was replaced"""
+        file_id = self._file_id()
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is not None and self._local.file_id != file_id:
+            self._discard(conn)
+            conn = None
+
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.file_id = file_id
+
+        return conn
+
+    def _discard(self, conn):
+        self._local.conn = None
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """Close this thread's connection (e.g. before a worker exits)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._discard(conn)
+
+
+IMPORT_METADATA_DDL = """
+    CREATE TABLE IF NOT EXISTS import_metadata (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+"""
+
+def get_import_metadata(conn, key, default=None):
+    """Read one import_metadata value (default if unset or the table is missing)"""
+    try:
+        row = conn.execute("SELECT value FROM import_metadata WHERE key = ?", (key,)).fetchone()
+    except sqlite3.OperationalError:
+        # Database created before import_metadata existed
+        return default
+    return row[0] if row else default
+
+def set_import_metadata(conn, key, value):
+    """Write (or with value=None, delete) one import_metadata value; caller commits"""
+    conn.execute(IMPORT_METADATA_DDL)
+    if value is None:
+        conn.execute("DELETE FROM import_metadata WHERE key = ?", (key,))
+    else:
+        conn.execute("INSERT OR REPLACE INTO import_metadata (key, value) VALUES (?, ?)", (key, str(value)))
+
+def get_data_version(conn):
+    """Stamp of the last import that changed the data (0 if never stamped)"""
+    return int(get_import_metadata(conn, 'data_version', 0))
+
+def get_last_import_at(conn):
+    """When the data last changed (a UTC datetime), or None if never stamped"""
+    value = get_import_metadata(conn, 'last_import_at')
+    return datetime.fromisoformat(value) if value else None
+
+def bump_data_version(conn):
+    """
+    Give the data a new version stamp so API-side caches drop their entries.
+    The stamp is a millisecond timestamp rather than a counter so a database
+    rebuilt from scratch never reuses the stamp of the file it replaces.
+    """
+    version = max(int(time.time() * 1000), get_data_version(conn) + 1)
+    set_import_metadata(conn, 'data_version', version)
+    set_import_metadata(conn, 'last_import_at', datetime.now(timezone.utc).isoformat())
+    conn.commit()
+    return version
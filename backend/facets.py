@@ -0,0 +1,247 @@
+"""
+Facet counts for search results (status, type, region, SIC section, decade).
+
+The importer stores one column per facet in company_facets: a blob with a
+small integer code for every company rowid, plus the labels the codes
+stand for. Each API process loads the blobs once per build and counts a
+match set by indexing them with its rowids - one pass over the matches,
+no GROUP BY per facet. Until the columns are built the matched rows are
+read from companies instead, at most FACET_SAMPLE of them as usual.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+
+from backend.counts import ROWID_RANGE_SQL, filter_source
+from backend.db import get_import_metadata, set_import_metadata
+from backend.sic import SIC_SECTIONS
+
+# Matches counted one by one; past this the counts are scaled up from the
+# first FACET_SAMPLE matches (count=exact always counts them all)
+FACET_SAMPLE = 20000
+
+# Values returned per facet, most common first
+FACET_LIMIT = 10
+
+# Code 0 means "no company at this rowid" (deleted, or imported after the build)
+MISSING = 0
+
+# Labels past this many (free-text counties) are counted as unknown
+MAX_LABELS = 65535
+
+FACETS_SOURCE_SQL = """
+    SELECT rowid, company_status, company_type, registered_office_region, sic_codes, date_of_creation
+    FROM companies
+"""
+
+# rowids of the matches, optionally narrowed like the search (see backend.counts.filter_source)
+MATCH_ROWIDS_SQL = "SELECT companies_fts.rowid FROM {source} WHERE companies_fts MATCH ?{filters} LIMIT ?"
+
+_DIVISION_SECTIONS = {
+    f'{division:02d}': section
+    for section, (first, last) in SIC_SECTIONS.items()
+    for division in range(int(first), int(last) + 1)
+}
+
+def _sic_sections(sic_codes):
+    """Section letters of all the company's SIC codes, each once, as one sorted string ('CG')"""
+    if not sic_codes:
+        return ''
+    try:
+        codes = json.loads(sic_codes)
+    except ValueError:
+        return ''
+    if not isinstance(codes, list):
+        return ''
+    sections = {_DIVISION_SECTIONS.get(code[:2], '') for code in codes if isinstance(code, str)}
+    return ''.join(sorted(sections))
+
+def _decade(date_of_creation):
+    year = (date_of_creation or '')[:4]
+    return f'{year[:3]}0s' if year.isdigit() else ''
+
+# facet -> label for a FACETS_SOURCE_SQL row ('' = unknown, not counted)
+FACETS = {
+    'company_status': lambda row: row[1] or '',
+    'company_type': lambda row: row[2] or '',
+    'registered_office_region': lambda row: (row[3] or '').strip().upper(),
+    'sic_section': lambda row: _sic_sections(row[4]),
+    'incorporation_decade': lambda row: _decade(row[5]),
+}
+
+# Facets listed in their natural order rather than by count
+ORDERED_FACETS = ('incorporation_decade',)
+
+# Facets whose label holds several one-letter values: a company counts once
+# under each (like the sic_prefix= filter, which matches any of its codes)
+MULTI_VALUED_FACETS = ('sic_section',)
+
+def create_facets_table(cursor):
+    """Create the facet column table (idempotent)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS company_facets (
+        facet TEXT PRIMARY KEY,
+        first_rowid INTEGER NOT NULL,
+        typecode TEXT NOT NULL,
+        labels TEXT NOT NULL,
+        codes BLOB NOT NULL
+    )
+    """)
+
+def rebuild_facets(conn):
+    """Recompute every facet column from companies in one scan"""
+    start = time.time()
+    cursor = conn.cursor()
+    create_facets_table(cursor)
+
+    cursor.execute(ROWID_RANGE_SQL)
+    first, last = cursor.fetchone()
+    first = first or 1
+    size = (last - first + 1) if last else 0
+
+    names = list(FACETS)
+    labelers = [FACETS[name] for name in names]
+    labels = [{'': MISSING + 1} for _ in names]
+    codes = [array('H', bytes(2 * size)) for _ in names]
+
+    reader = conn.cursor()
+    reader.execute(FACETS_SOURCE_SQL)
+    rows = 0
+    for row in reader:
+        offset = row[0] - first
+        for labeler, known, column in zip(labelers, labels, codes):
+            label = labeler(row)
+            code = known.get(label)
+            if code is None:
+                if len(known) < MAX_LABELS - 1:
+                    code = known[label] = len(known) + 1
+                else:
+                    code = known['']
+            column[offset] = code
+        rows += 1
+
+    cursor.execute("DELETE FROM company_facets")
+    for name, known, column in zip(names, labels, codes):
+        # One byte per company unless a facet has more than 255 labels
+        typecode = 'B' if len(known) < 255 else 'H'
+        if typecode == 'B':
+            column = array('B', column)
+        ordered = [None] * (len(known) + 1)
+        for label, code in known.items():
+            ordered[code] = label
+        cursor.execute(
+            "INSERT INTO company_facets (facet, first_rowid, typecode, labels, codes) VALUES (?, ?, ?, ?, ?)",
+            (name, first, typecode, json.dumps(ordered), column.tobytes())
+        )
+    set_import_metadata(conn, 'facets_built_at', datetime.now(timezone.utc).isoformat())
+    conn.commit()
+
+    return {'rows': rows, 'seconds': round(time.time() - start, 1)}
+
+class FacetIndex:
+    """
+    The company_facets columns of one database, loaded on first use and
+    reloaded when the importer rebuilds them. Shared by a process's threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._columns = None
+
+    def columns(self, conn):
+        """{facet: (first_rowid, labels, codes)}, or None if never built"""
+        built_at = get_import_metadata(conn, 'facets_built_at')
+        if built_at is None:
+            return None
+        with self._lock:
+            if built_at == self._built_at:
+                return self._columns
+        try:
+            rows = conn.execute("SELECT facet, first_rowid, typecode, labels, codes FROM company_facets").fetchall()
+        except sqlite3.OperationalError:
+            return None
+        columns = {
+            facet: (first_rowid, json.loads(labels), memoryview(codes).cast(typecode))
+            for facet, first_rowid, typecode, labels, codes in rows
+        }
+        with self._lock:
+            self._built_at, self._columns = built_at, columns
+        return columns
+
+    def count(self, conn, match, filters='', filter_params=(), exact=False):
+        """
+        Facet counts for the companies matching match (narrowed by filters).
+        Returns ({facet: [{'value', 'count'}]}, exact). Before the facet
+        columns are built the same counts come from the matched rows.
+        """
+        limit = -1 if exact else FACET_SAMPLE + 1
+        cursor = conn.cursor()
+        cursor.execute(
+            MATCH_ROWIDS_SQL.format(source=filter_source(filters), filters=filters),
+            (match, *filter_params, limit)
+        )
+        rowids = [row[0] for row in cursor.fetchall()]
+
+        scale = 1
+        complete = exact or len(rowids) <= FACET_SAMPLE
+        if not complete:
+            # Matches come back in rowid order, spread evenly over the
+            # range (as for estimated totals): scale by the share covered
+            rowids = rowids[:FACET_SAMPLE]
+            cursor.execute(ROWID_RANGE_SQL)
+            first, last = cursor.fetchone()
+            scale = (last - first + 1) / (rowids[-1] - first + 1)
+
+        columns = self.columns(conn)
+        if columns is None:
+            counted = _count_rows(cursor, rowids)
+        else:
+            counted = _count_columns(columns, rowids)
+
+        facets = {}
+        for facet, counts in counted.items():
+            if facet in MULTI_VALUED_FACETS:
+                split = Counter()
+                for label, count in counts.items():
+                    for value in label:
+                        split[value] += count
+                counts = split
+            values = [(label, round(count * scale)) for label, count in counts.items() if label]
+            if facet in ORDERED_FACETS:
+                values.sort()
+            else:
+                values.sort(key=lambda value: (-value[1], value[0]))
+                values = values[:FACET_LIMIT]
+            facets[facet] = [{'value': label, 'count': count} for label, count in values]
+        return facets, complete
+
+def _count_columns(columns, rowids):
+    """{facet: Counter(label)} for rowids, looked up in the company_facets columns"""
+    counted = {}
+    offsets = {}
+    for facet, (first_rowid, labels, codes) in columns.items():
+        # Every column of a build covers the same rowids
+        key = (first_rowid, len(codes))
+        if key not in offsets:
+            offsets[key] = [rowid - first_rowid for rowid in rowids if 0 <= rowid - first_rowid < len(codes)]
+        counts = Counter(map(codes.__getitem__, offsets[key]))
+        counted[facet] = Counter({labels[code]: count for code, count in counts.items()
+                                  if code != MISSING and labels[code]})
+    return counted
+
+def _count_rows(cursor, rowids, batch=500):
+    """{facet: Counter(label)} for rowids, read from companies (facet columns not built)"""
+    counted = {facet: Counter() for facet in FACETS}
+    for i in range(0, len(rowids), batch):
+        part = rowids[i:i + batch]
+        cursor.execute(f"{FACETS_SOURCE_SQL} WHERE rowid IN ({','.join('?' * len(part))})", part)
+        for row in cursor:
+            for facet, labeler in FACETS.items():
+                counted[facet][labeler(row)] += 1
+    return counted
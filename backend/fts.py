@@ -0,0 +1,242 @@
+"""FTS5 search helpers for the companies_fts index"""
+
+import re
+
+# unicode61 splits on anything that is not a letter or digit
+TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+# bm25() weights in companies_fts column order:
+# company_number, company_name, previous_names, registered_office_address, sic_code_descriptions
+BM25_WEIGHTS = '0.0, 10.0, 2.0, 1.0, 1.0'
+
+# Same tiers as the old LIKE ranking (exact name, then name prefix, then the
+# rest), with BM25 deciding the order inside each tier. company_number breaks
+# the remaining ties so every row has a unique position for cursors.
+# {filters} takes extra conditions on c (see backend.sic.sic_filter) and
+# bitmap filters (backend.bitmaps.BITMAP_CONDITION), or ''.
+RANKED_MATCHES_SQL = f"""
+    SELECT 
+        c.company_number,
+        c.company_name,
+        c.company_status,
+        c.registered_office_postal_code,
+        c.date_of_creation,
+        c.sic_codes,
+        CASE 
+            WHEN UPPER(c.company_name) = UPPER(?) THEN 0
+            WHEN UPPER(c.company_name) LIKE UPPER(?) THEN 1
+            ELSE 2
+        END AS tier,
+        bm25(companies_fts, {BM25_WEIGHTS}) AS score
+    FROM companies_fts
+    JOIN companies c ON c.rowid = companies_fts.rowid
+    WHERE companies_fts MATCH ?{{filters}}
+"""
+
+RANK_ORDER = "tier, score, company_name, company_number"
+
+# Page by OFFSET (bounded by pagination.MAX_OFFSET)
+SEARCH_SQL = f"""
+    {RANKED_MATCHES_SQL}
+    ORDER BY tier, score, c.company_name, c.company_number
+    LIMIT ? OFFSET ?
+"""
+
+# Page by keyset: only rows ranked after the cursor position are kept, so the
+# sort holds one page of rows however deep the caller is
+SEARCH_AFTER_SQL = f"""
+    SELECT * FROM ({RANKED_MATCHES_SQL})
+    WHERE ({RANK_ORDER}) > (?, ?, ?, ?)
+    ORDER BY {RANK_ORDER}
+    LIMIT ?
+"""
+
+def tokenize(query):
+    """Split a user query into the tokens FTS5 will see"""
+    return TOKEN_RE.findall(query)
+
+def build_match_query(query, column='company_name'):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    Every token is quoted so user input can never be parsed as FTS syntax,
+    and the last token is a prefix match to keep search-as-you-type working.
+    Returns None when the query has no searchable tokens.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return f"{column} : ({' '.join(terms)})"
+
+def build_search_match(query, industry=None, location=None):
+    """
+    MATCH expression for a name query narrowed by industry (SIC code
+    descriptions) and location (registered office address), e.g. bread
+    companies in Leeds: build_search_match('', 'bread', 'leeds').
+    Any of the three may be empty; returns None when a given one has no
+    searchable tokens or none is given.
+    """
+    parts = []
+    for text, column in ((query, 'company_name'), (industry, 'sic_code_descriptions'),
+                         (location, 'registered_office_address')):
+        if not text:
+            continue
+        match = build_match_query(text, column)
+        if match is None:
+            return None
+        parts.append(match)
+    return ' AND '.join(parts) or None
+
+def search_params(query, match, limit, offset, filter_params=()):
+    """Bind parameters for SEARCH_SQL"""
+    return (query, f'{query}%', match) + tuple(filter_params) + (limit, offset)
+
+def search_after_params(query, match, position, limit, filter_params=()):
+    """Bind parameters for SEARCH_AFTER_SQL; position comes from decode_cursor"""
+    return (query, f'{query}%', match) + tuple(filter_params) + tuple(position) + (limit,)
+
+# companies_fts is an external-content index over companies_fts_source.
+# FTS5 never reads that view on writes: the triggers below must hand it the
+# exact values the view shows, or 'delete' removes the wrong tokens and the
+# index drifts. Both are generated from this one list of
+# (fts column, expression over a companies row named {row}).
+# The CSV has four SicText columns. Each code is looked up by position:
+# FTS5 cannot read a content view that uses json_each ('rebuild' fails).
+# The ORDER BY pins the token order whatever plan ANALYZE picks.
+MAX_SIC_CODES = 4
+SIC_DESCRIPTIONS = (
+    "COALESCE((SELECT group_concat(description, ' ') FROM ("
+    "SELECT description FROM sic_codes WHERE code IN ("
+    + ', '.join(f"json_extract(CASE WHEN json_valid({{row}}.sic_codes) THEN {{row}}.sic_codes END, '$[{i}]')"
+                for i in range(MAX_SIC_CODES))
+    + ") ORDER BY code)), '')"
+)
+
+FTS_COLUMNS = (
+    ('company_number', "{row}.company_number"),
+    ('company_name', "{row}.company_name"),
+    ('previous_names', "COALESCE({row}.previous_names, '')"),
+    ('registered_office_address',
+     "COALESCE({row}.registered_office_address_line_1, '') || ' ' || "
+     "COALESCE({row}.registered_office_locality, '') || ' ' || "
+     "COALESCE({row}.registered_office_postal_code, '')"),
+    # Descriptions of the company's codes from the sic_codes dictionary; a
+    # description changing there means the index needs a 'rebuild'
+    ('sic_code_descriptions', SIC_DESCRIPTIONS),
+)
+
+# companies columns the expressions above read; updates touching none of
+# them (status, accounts, popularity...) leave the index alone
+FTS_SOURCE_COLUMNS = (
+    'company_number', 'company_name', 'previous_names', 'registered_office_address_line_1',
+    'registered_office_locality', 'registered_office_postal_code', 'sic_codes',
+)
+
+# FTS5 reads external content by column name, but the address and SIC
+# columns only exist as derived values - they come from the view
+# companies_fts_source, whose rowid lines up with companies.rowid so
+# 'rebuild' and rowid joins work
+FTS_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5(
+        company_number UNINDEXED,
+        company_name,
+        previous_names,
+        registered_office_address,
+        sic_code_descriptions,
+        content=companies_fts_source,
+        content_rowid=company_rowid,
+        tokenize='porter unicode61'
+    )
+"""
+
+# Older databases declared the index with content=companies, which has no
+# address or SIC description columns ('rebuild' fails with "SQL logic
+# error"), or as a plain table holding its own copy, which rejects the
+# triggers' 'delete' command. Either way it is not over the view.
+CONTENT_VIEW_RE = re.compile(r"""content\s*=\s*['"]?companies_fts_source\b""", re.IGNORECASE)
+
+def _fts_values(row):
+    return ',\n            '.join(expression.format(row=row) for _, expression in FTS_COLUMNS)
+
+def fts_schema():
+    """{(type, name): sql} for the content view and the sync triggers"""
+    columns = ', '.join(name for name, _ in FTS_COLUMNS)
+    changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in FTS_SOURCE_COLUMNS)
+    view_columns = ',\n        '.join(f"{expression.format(row='companies')} AS {name}" for name, expression in FTS_COLUMNS)
+    return {
+        ('view', 'companies_fts_source'): f"""CREATE VIEW companies_fts_source AS
+    SELECT
+        companies.rowid AS company_rowid,
+        {view_columns}
+    FROM companies""",
+        ('trigger', 'companies_ai'): f"""CREATE TRIGGER companies_ai AFTER INSERT ON companies BEGIN
+        INSERT INTO companies_fts(rowid, {columns}) VALUES (
+            new.rowid,
+            {_fts_values('new')}
+        );
+    END""",
+        ('trigger', 'companies_ad'): f"""CREATE TRIGGER companies_ad AFTER DELETE ON companies BEGIN
+        INSERT INTO companies_fts(companies_fts, rowid, {columns}) VALUES (
+            'delete',
+            old.rowid,
+            {_fts_values('old')}
+        );
+    END""",
+        ('trigger', 'companies_au'): f"""CREATE TRIGGER companies_au AFTER UPDATE OF {', '.join(FTS_SOURCE_COLUMNS)} ON companies
+    WHEN old.rowid IS NOT new.rowid OR {changed} BEGIN
+        INSERT INTO companies_fts(companies_fts, rowid, {columns}) VALUES (
+            'delete',
+            old.rowid,
+            {_fts_values('old')}
+        );
+        INSERT INTO companies_fts(rowid, {columns}) VALUES (
+            new.rowid,
+            {_fts_values('new')}
+        );
+    END""",
+    }
+
+def legacy_fts_table(cursor):
+    """True if companies_fts exists but is not declared with content=companies_fts_source"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'companies_fts'")
+    row = cursor.fetchone()
+    return row is not None and CONTENT_VIEW_RE.search(row[0]) is None
+
+def stale_fts_schema(cursor):
+    """
+    The view/triggers that are missing or differ from fts_schema(), led by
+    ('table', 'companies_fts') if the index has the legacy declaration
+    """
+    stale = [('table', 'companies_fts')] if legacy_fts_table(cursor) else []
+    for (object_type, name), sql in fts_schema().items():
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = ? AND name = ?", (object_type, name))
+        row = cursor.fetchone()
+        if row is None or row[0] != sql:
+            stale.append((object_type, name))
+    return stale
+
+def sync_fts_schema(cursor):
+    """
+    Recreate the content view and sync triggers where they differ from
+    fts_schema() (older databases had UPDATE/DELETE triggers that FTS5
+    external content does not support). Cheap when nothing changed.
+    A legacy content=companies index is dropped and recreated empty.
+    Returns the (type, name) pairs recreated; see fts_reindex_needed().
+    """
+    schema = dict(fts_schema())
+    schema[('table', 'companies_fts')] = FTS_TABLE_SQL
+    stale = stale_fts_schema(cursor)
+    for object_type, name in stale:
+        cursor.execute(f'DROP {object_type.upper()} IF EXISTS {name}')
+        cursor.execute(schema[(object_type, name)])
+    return stale
+
+def fts_reindex_needed(updated):
+    """
+    Whether sync_fts_schema() changed what the index holds: a new view means
+    its documents no longer match what the triggers 'delete', and a
+    recreated table is empty. Either way it needs a 'rebuild'.
+    """
+    return ('view', 'companies_fts_source') in updated or ('table', 'companies_fts') in updated
@@ -0,0 +1,231 @@
+"""Per-request timings (Server-Timing) and latency histograms (/metrics)"""
+
+import re
+import hashlib
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from time import perf_counter
+
+# Seconds; the <50ms search target sits between 0.025 and 0.05
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Server-Timing lists at most this many statements one by one
+MAX_TIMED_QUERIES = 20
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+@lru_cache(maxsize=1024)
+def query_name(sql):
+    """Short stable label for a statement: verb, main table and a hash of the text"""
+    text = ' '.join(sql.split())
+    verb = text.split(' ', 1)[0].lower()
+    match = re.search(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+([A-Za-z_]\w*)', text, re.IGNORECASE)
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:6]
+    return '_'.join(part for part in (verb, match.group(1) if match else None, digest) if part)
+
+class QueryTiming:
+    __slots__ = ('name', 'sql', 'parameters', 'seconds', 'rows')
+
+    def __init__(self, sql, parameters, seconds):
+        self.name = query_name(sql)
+        self.sql = sql
+        self.parameters = parameters
+        self.seconds = seconds
+        self.rows = 0
+
+class RequestTimer:
+    """Timings collected while one request is served"""
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.phases = {}
+        self.queries = []
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def query(self, timing):
+        self.queries.append(timing)
+
+    def elapsed(self):
+        return perf_counter() - self.start
+
+    def server_timing(self, total):
+        """Server-Timing header value (durations in milliseconds)"""
+        entries = [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in self.phases.items()]
+        if self.queries:
+            entries.append(f'sql;dur={sum(q.seconds for q in self.queries) * 1000:.2f};'
+                           f'desc="{len(self.queries)} statements"')
+            for i, q in enumerate(self.queries[:MAX_TIMED_QUERIES], 1):
+                entries.append(f'q{i};dur={q.seconds * 1000:.2f};desc="{q.name} {q.rows} rows"')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+def start_request():
+    """Begin timing a request in this context. Returns (timer, token for end_request)"""
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+def end_request(token):
+    _current.reset(token)
+
+def current_timer():
+    return _current.get()
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to phase of the current request, if any"""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(phase, perf_counter() - start)
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement's execute + fetches and counts its rows,
+    reporting them to the current request. Subclasses can act on a statement
+    in _after(), called after execute and each fetch.
+    """
+
+    _timing = None
+
+    def execute(self, sql, parameters=()):
+        timer = _current.get()
+        start = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._timing = QueryTiming(sql, parameters, perf_counter() - start)
+            if timer is not None:
+                timer.query(self._timing)
+            self._after(done=False)
+
+    def _after(self, done):
+        """Hook: done is True once the statement has returned all its rows"""
+
+    def _fetched(self, start, rows, done):
+        if self._timing is not None:
+            self._timing.seconds += perf_counter() - start
+            self._timing.rows += rows
+            self._after(done)
+
+    def fetchone(self):
+        start = perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), len(rows) < (self.arraysize if size is None else size))
+        return rows
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        if self._timing is not None:
+            self._timing.seconds += perf_counter() - start
+            self._timing.rows += 1
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (and conn.execute) are instrumented"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label values"""
+
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label_values, value):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, count, total) in sorted(self._series.items()):
+            labels = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(self.labels, label_values))
+            prefix = labels + ',' if labels else ''
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+        return lines
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+    """Latency histograms for requests, request phases and SQL statements (per process)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Histogram('http_request_duration_seconds', 'Time to serve a request',
+                                  ('route', 'method', 'status'))
+        self.phases = Histogram('http_request_phase_seconds', 'Time per request phase',
+                                ('route', 'phase'))
+        self.queries = Histogram('sqlite_query_duration_seconds', 'Statement execute + fetch time',
+                                 ('query',))
+        self.query_rows = {}
+
+    def record(self, timer, route, method, status, total):
+        """Fold one finished request into the histograms"""
+        with self._lock:
+            self.requests.observe((route, method, str(status)), total)
+            for phase, seconds in timer.phases.items():
+                self.phases.observe((route, phase), seconds)
+            for q in timer.queries:
+                self.queries.observe((q.name,), q.seconds)
+                self.query_rows[q.name] = self.query_rows.get(q.name, 0) + q.rows
+
+    def render(self, counters=()):
+        """
+        Prometheus text exposition. counters: extra (name, help, value)
+        samples such as cache hit totals.
+        """
+        with self._lock:
+            lines = self.requests.render() + self.phases.render() + self.queries.render()
+            lines += ['# HELP sqlite_query_rows_total Rows fetched per statement',
+                      '# TYPE sqlite_query_rows_total counter']
+            lines += [f'sqlite_query_rows_total{{query="{name}"}} {rows}'
+                      for name, rows in sorted(self.query_rows.items())]
+        for name, help_text, value in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
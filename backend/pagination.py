@@ -0,0 +1,40 @@
+"""Opaque keyset cursors for paging through ranked search results"""
+
+import base64
+import hashlib
+import json
+
+# Deepest OFFSET still honoured for callers that have not moved to cursors;
+# past this SQLite would build and discard too many rows per page
+MAX_OFFSET = 1000
+
+class InvalidCursor(ValueError):
+    """Cursor could not be decoded or belongs to a different query"""
+
+def _query_tag(match):
+    return hashlib.sha1(match.lower().encode('utf-8')).hexdigest()[:8]
+
+def encode_cursor(match, row):
+    """Cursor pointing just after row (a search row with tier and score)"""
+    position = [
+        _query_tag(match),
+        row['tier'],
+        row['score'],
+        row['company_name'],
+        row['company_number'],
+    ]
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(match, cursor):
+    """Return the (tier, score, company_name, company_number) a cursor points after"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        tag, tier, score, name, number = json.loads(raw)
+        position = (int(tier), float(score), str(name), str(number))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+    if tag != _query_tag(match):
+        raise InvalidCursor('Cursor belongs to a different query')
+    return position
@@ -0,0 +1,157 @@
+"""Cache of serialized API responses, emptied whenever an import bumps the data version"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 3600            # seconds; the data version is what really invalidates
+DISK_PRUNE_EVERY = 500        # puts between trims of the shared cache file
+
+SHARED_CACHE_DDL = """
+    CREATE TABLE IF NOT EXISTS response_cache (
+        key TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        body BLOB NOT NULL
+    )
+"""
+
+def cache_key(*parts):
+    """Stable text key from normalized request parameters"""
+    return '\x1f'.join('' if part is None else str(part) for part in parts)
+
+def make_etag(version, key):
+    """
+    Strong ETag for the response to key under a data version: the same
+    parameters on the same data always serialize to the same bytes.
+    """
+    return hashlib.sha1(f'{version}\x1f{key}'.encode('utf-8')).hexdigest()[:32]
+
+class ResponseCache:
+    """
+    LRU + TTL cache of response bodies (JSON bytes) keyed by normalized
+    request parameters, in front of SQLite for hot companies and queries.
+
+    Like CountCache, entries belong to one data version: the first lookup
+    that sees a newer version empties the cache. With shared_path, entries
+    also go to a small SQLite file that every gunicorn worker on the host
+    reads, so a company fetched by one worker is warm in all of them.
+    """
+
+    def __init__(self, max_entries=2000, ttl=DEFAULT_TTL, shared_path=None, shared_max_entries=50000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_path = shared_path
+        self.shared_max_entries = shared_max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _shared(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.shared_path, timeout=1)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # A cache: losing it is harmless
+            conn.execute(SHARED_CACHE_DDL)
+            self._local.conn = conn
+        return conn
+
+    def _shared_get(self, version, key):
+        try:
+            row = self._shared().execute(
+                "SELECT body FROM response_cache WHERE key = ? AND version = ? AND expires_at > ?",
+                (key, version, time.time())
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return bytes(row[0]) if row else None
+
+    def _shared_put(self, version, key, body, expires_at):
+        try:
+            conn = self._shared()
+            conn.execute("INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?)",
+                         (key, version, expires_at, body))
+            self._puts += 1
+            if self._puts % DISK_PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM response_cache WHERE version != ? OR expires_at <= ?",
+                             (version, time.time()))
+                conn.execute("""
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.shared_max_entries,))
+            conn.commit()
+        except sqlite3.Error:
+            # Busy or unwritable: the in-process cache still works
+            pass
+
+    def get(self, version, key):
+        """Cached body for key under this data version, or None"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+        body = self._shared_get(version, key) if self.shared_path else None
+        with self._lock:
+            if body is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            if version == self._version:
+                self._store(key, body, time.time() + self.ttl)
+        return body
+
+    def _store(self, key, body, expires_at):
+        self._entries[key] = (expires_at, body)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, version, key, body):
+        """Remember body (bytes) for key under this data version"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            if version != self._version:
+                return
+            self._store(key, body, expires_at)
+        if self.shared_path:
+            self._shared_put(version, key, body, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'data_version': self._version,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+                'shared_path': self.shared_path,
+                'pid': os.getpid(),
+            }
@@ -1,19 +1,26 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-import sqlite3
 import os
+import sys
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.counts import COUNT_MODES, DEFAULT_COUNT_MODE, CountCache, count_matches, format_total
+from backend.db import ConnectionPool
+from backend.stats import compute_stats, load_stats
+
 app = Flask(__name__)
 CORS(app)
 
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
 
+db_pool = ConnectionPool(DATABASE_PATH)
+count_cache = CountCache()
+
 def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's pooled database connection (do not close it)"""
+    return db_pool.connection()
 
 @app.route('/api/search', methods=['GET'])
 def search_companies():
@@ -21,6 +28,7 @@ def search_companies():
     query = request.args.get('q', '').strip()
     limit = min(int(request.args.get('limit', 20)), 100)
     offset = int(request.args.get('offset', 0))
+    count_mode = request.args.get('count', DEFAULT_COUNT_MODE)
     
     if not query:
         return jsonify({'error': 'Query parameter q is required'}), 400
@@ -28,6 +36,9 @@ def search_companies():
     if len(query) < 2:
         return jsonify({'error': 'Query must be at least 2 characters'}), 400
     
+    if count_mode not in COUNT_MODES:
+        return jsonify({'error': f"count must be one of: {', '.join(COUNT_MODES)}"}), 400
+    
     conn = get_db()
     cursor = conn.cursor()
     
@@ -52,19 +63,14 @@ def search_companies():
     results = cursor.fetchall()
     search_time = (datetime.now() - start_time).total_seconds() * 1000
     
-    # Get total count
-    cursor.execute("""
-        SELECT COUNT(*) as total 
-        FROM companies_fts 
-        WHERE companies_fts MATCH ?
-    """, (f'"{query}"*',))
-    total = cursor.fetchone()['total']
-    
-    conn.close()
+    # Get total count (exact, capped or estimated; memoized per query)
+    total, total_kind = count_matches(conn, f'"{query}"*', count_mode, cache=count_cache)
     
     return jsonify({
         'query': query,
         'total': total,
+        'total_exact': total_kind == 'exact',
+        'total_display': format_total(total, total_kind),
         'limit': limit,
         'offset': offset,
         'search_time_ms': round(search_time, 2),
@@ -83,7 +89,6 @@ def get_company(company_number):
     """, (company_number,))
     
     company = cursor.fetchone()
-    conn.close()
     
     if not company:
         return jsonify({'error': 'Company not found'}), 404
@@ -94,25 +99,17 @@ def get_company(company_number):
 def get_stats():
     """Get database statistics"""
     conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) as total FROM companies")
-    total = cursor.fetchone()['total']
-    
-    cursor.execute("""
-        SELECT company_status, COUNT(*) as count 
-        FROM companies 
-        GROUP BY company_status 
-        ORDER BY count DESC 
-        LIMIT 5
-    """)
-    status_breakdown = cursor.fetchall()
     
-    conn.close()
+    # Precomputed by the importer (aggregated live on older databases)
+    stats = load_stats(conn) or compute_stats(conn)
+    total = stats['total'][0][1] if stats['total'] else 0
     
     return jsonify({
         'total_companies': total,
-        'status_breakdown': [dict(row) for row in status_breakdown],
+        'status_breakdown': [
+            {'company_status': status or None, 'count': count}
+            for status, count in stats['status'][:5]
+        ],
         'last_updated': datetime.now().isoformat()
     })
 
@@ -0,0 +1,197 @@
+"""SIC codes: the sic_codes dictionary and the company_sic filter table, filled by the importer"""
+
+import sqlite3
+import time
+
+from backend.db import get_import_metadata
+
+def parse_sic_text(text):
+    """
+    (code, description) from a SicText value such as
+    '62012 - Business and domestic software development'.
+    description is None for values without one ('None Supplied').
+    Returns None for an empty value.
+    """
+    if not text or not text.strip():
+        return None
+    parts = text.strip().split(' - ', 1)
+    code = parts[0].strip()
+    if not code:
+        return None
+    description = parts[1].strip() if len(parts) > 1 else ''
+    return code, description or None
+
+def load_sic_codes(cursor):
+    """{code: description} as stored"""
+    cursor.execute("SELECT code, description FROM sic_codes")
+    return dict(cursor.fetchall())
+
+def store_sic_codes(cursor, codes, known):
+    """
+    Add codes ({code: description}) missing from sic_codes and update
+    descriptions that changed; known is load_sic_codes() and is kept in step.
+    Returns True if companies already indexed hold one of the codes (an
+    existing description changed, or a code in use got its first one):
+    companies_fts has the old text for them and needs a rebuild.
+    """
+    changed = {code: description for code, description in codes.items() if known.get(code) != description}
+    if not changed:
+        return False
+    added = [code for code in changed if code not in known]
+    reworded = len(added) < len(changed)
+    if added and not reworded:
+        cursor.execute(f"SELECT 1 FROM company_sic WHERE sic_code IN ({','.join('?' * len(added))}) LIMIT 1",
+                       added)
+        reworded = cursor.fetchone() is not None
+    cursor.executemany("""
+        INSERT INTO sic_codes (code, description) VALUES (?, ?)
+        ON CONFLICT(code) DO UPDATE SET description = excluded.description
+    """, list(changed.items()))
+    known.update(changed)
+    return reworded
+
+# SIC 2007 sections by their first and last two-digit division
+SIC_SECTIONS = {
+    'A': ('01', '03'), 'B': ('05', '09'), 'C': ('10', '33'), 'D': ('35', '35'),
+    'E': ('36', '39'), 'F': ('41', '43'), 'G': ('45', '47'), 'H': ('49', '53'),
+    'I': ('55', '56'), 'J': ('58', '63'), 'K': ('64', '66'), 'L': ('68', '68'),
+    'M': ('69', '75'), 'N': ('77', '82'), 'O': ('84', '84'), 'P': ('85', '85'),
+    'Q': ('86', '88'), 'R': ('90', '93'), 'S': ('94', '96'), 'T': ('97', '98'),
+    'U': ('99', '99'),
+}
+
+def _sic_rows(row, source=''):
+    """
+    SELECT of (company_number, position, sic_code) for each code in
+    {row}.sic_codes; source names the table row comes from, if not a trigger.
+    """
+    return f"""SELECT {row}.company_number, sic.key + 1, sic.value
+        FROM {source + ', ' if source else ''}json_each(CASE WHEN json_valid({row}.sic_codes) THEN {row}.sic_codes END) AS sic
+        WHERE sic.type = 'text' AND typeof(sic.key) = 'integer'"""
+
+# companies.sic_codes is a JSON array; company_sic holds one row per code so
+# filters and per-code counts are index range scans. The triggers keep it in
+# step with every write to companies (bulk imports rebuild it instead).
+COMPANY_SIC_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS company_sic (
+        company_number TEXT NOT NULL,
+        sic_code TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (company_number, position)
+    ) WITHOUT ROWID
+    """,
+    # Covers sic=, sic_prefix= and COUNT(*) per code without touching the table
+    "CREATE INDEX IF NOT EXISTS idx_company_sic_code ON company_sic(sic_code, company_number)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS company_sic_ai AFTER INSERT ON companies BEGIN
+        INSERT INTO company_sic (company_number, position, sic_code)
+        {_sic_rows('new')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS company_sic_au AFTER UPDATE OF company_number, sic_codes ON companies
+    WHEN old.company_number IS NOT new.company_number OR old.sic_codes IS NOT new.sic_codes BEGIN
+        DELETE FROM company_sic WHERE company_number = old.company_number;
+        INSERT INTO company_sic (company_number, position, sic_code)
+        {_sic_rows('new')};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS company_sic_ad AFTER DELETE ON companies BEGIN
+        DELETE FROM company_sic WHERE company_number = old.company_number;
+    END
+    """,
+)
+
+def create_company_sic_table(cursor):
+    """Create company_sic, its index and the triggers that maintain it (idempotent)"""
+    for ddl in COMPANY_SIC_DDL:
+        cursor.execute(ddl)
+
+def rebuild_company_sic(conn):
+    """Refill company_sic from companies.sic_codes in one pass"""
+    start = time.time()
+    cursor = conn.cursor()
+    create_company_sic_table(cursor)
+    # Sorted insert into the table, index built once afterwards
+    cursor.execute("DROP INDEX IF EXISTS idx_company_sic_code")
+    cursor.execute("DELETE FROM company_sic")
+    cursor.execute(f"""
+        INSERT INTO company_sic (company_number, position, sic_code)
+        {_sic_rows('companies', 'companies')}
+        ORDER BY 1, 2
+    """)
+    rows = cursor.rowcount
+    create_company_sic_table(cursor)
+    conn.commit()
+    return {'rows': rows, 'seconds': round(time.time() - start, 1)}
+
+def sic_range(prefix):
+    """
+    [low, high) range of sic_code for a section letter ('G') or a code
+    prefix ('47', '471'). ':' sorts just after '9', so 'p:' bounds every
+    code starting with p. Raises ValueError for anything else.
+    """
+    prefix = prefix.strip().upper()
+    if prefix in SIC_SECTIONS:
+        first, last = SIC_SECTIONS[prefix]
+        return first, last + ':'
+    if prefix.isdigit() and 1 <= len(prefix) <= 5:
+        return prefix, prefix + ':'
+    raise ValueError('sic_prefix must be a SIC section letter (A-U) or up to 5 leading digits of a code')
+
+def sic_filter(sic='', sic_prefix=''):
+    """
+    SQL condition on a companies row aliased c, and its parameters, for
+    the sic= (exact code) and sic_prefix= search filters. ('', ()) when
+    neither is given. Raises ValueError for an invalid sic_prefix.
+    """
+    conditions, params = [], []
+    if sic:
+        conditions.append("c.company_number IN (SELECT company_number FROM company_sic WHERE sic_code = ?)")
+        params.append(sic.strip())
+    if sic_prefix:
+        conditions.append("c.company_number IN (SELECT company_number FROM company_sic WHERE sic_code >= ? AND sic_code < ?)")
+        params.extend(sic_range(sic_prefix))
+    return ''.join(f' AND {condition}' for condition in conditions), tuple(params)
+
+# Per-code counts rebuild_stats() stored at the last import; the primary
+# key makes a prefix a range scan
+SIC_STATS_SQL = """
+    SELECT company_stats.value, sic_codes.description, company_stats.count
+    FROM company_stats
+    LEFT JOIN sic_codes ON sic_codes.code = company_stats.value
+    WHERE company_stats.dimension = 'sic'{where}
+    ORDER BY company_stats.count DESC, company_stats.value
+"""
+
+def sic_counts(conn, prefix=''):
+    """
+    [(code, description, companies)] for every code under prefix (all codes
+    if empty), most companies first. Read from the 'sic' rows of
+    company_stats; counted from company_sic if those were never built.
+    """
+    params = sic_range(prefix) if prefix else ()
+    cursor = conn.cursor()
+    if get_import_metadata(conn, 'stats_built_at'):
+        try:
+            where = ' AND company_stats.value >= ? AND company_stats.value < ?' if prefix else ''
+            cursor.execute(SIC_STATS_SQL.format(where=where), params)
+            return cursor.fetchall()
+        except sqlite3.OperationalError:
+            # Database created before company_stats existed
+            pass
+
+    where = 'WHERE sic_code >= ? AND sic_code < ?' if prefix else ''
+    cursor.execute(f"""
+        SELECT counts.sic_code, sic_codes.description, counts.companies
+        FROM (
+            SELECT sic_code, COUNT(*) AS companies FROM company_sic
+            {where}
+            GROUP BY sic_code
+        ) AS counts
+        LEFT JOIN sic_codes ON sic_codes.code = counts.sic_code
+        ORDER BY counts.companies DESC, counts.sic_code
+    """, params)
+    return cursor.fetchall()
@@ -0,0 +1,147 @@
+"""Slow-query log: statements over a threshold, with their EXPLAIN QUERY PLAN, to a rotating file"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from backend.instrumentation import InstrumentedConnection, InstrumentedCursor
+
+# Plans that read these tables row by row get flagged: on companies that is
+# 5.6M rows (UPPER() LIKE, LIKE '%dissolved%', an unindexed WHERE)
+FLAGGED_TABLES = ('companies',)
+
+MAX_PARAMETER_LENGTH = 200
+PLAN_CACHE_SIZE = 500
+
+def explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN as indented lines, or None if the statement can't be explained"""
+    try:
+        rows = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    except sqlite3.Error:
+        return None
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+def full_scans(sql, plan):
+    """Flagged tables (or their aliases in sql) that the plan scans"""
+    names = {}
+    for table in FLAGGED_TABLES:
+        names[table] = table
+        for alias in re.findall(rf'\b{table}\s+(?:AS\s+)?(\w+)', sql, re.IGNORECASE):
+            if alias.upper() not in ('WHERE', 'JOIN', 'ON', 'LEFT', 'INNER', 'GROUP', 'ORDER', 'LIMIT', 'USING'):
+                names[alias] = table
+    scanned = set()
+    for line in plan or ():
+        match = re.match(r'\s*SCAN (\w+)', line)
+        if match and match.group(1) in names:
+            scanned.add(names[match.group(1)])
+    return sorted(scanned)
+
+def _parameter(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f'<{len(value)} bytes>'
+    if isinstance(value, str) and len(value) > MAX_PARAMETER_LENGTH:
+        return value[:MAX_PARAMETER_LENGTH] + '…'
+    return value
+
+class SlowQueryLog:
+    """
+    Writes one JSON line per statement slower than threshold_ms: the SQL,
+    its parameters, its query plan and which flagged tables it scans.
+    The file rotates at max_bytes; the newest backups rotated files are kept.
+    """
+
+    def __init__(self, path, threshold_ms=100, max_bytes=10 * 1024 * 1024, backups=5):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._logger = logging.getLogger(f'slow_queries.{path}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+        self._plans = {}
+        self._lock = threading.Lock()
+        self.logged = 0
+
+    def plan(self, conn, sql, parameters):
+        """Query plan for sql, explained once per statement text"""
+        with self._lock:
+            if sql in self._plans:
+                return self._plans[sql]
+        plan = explain(conn, sql, parameters)
+        with self._lock:
+            if len(self._plans) >= PLAN_CACHE_SIZE:
+                self._plans.clear()
+            self._plans[sql] = plan
+        return plan
+
+    def record(self, conn, timing, complete):
+        plan = self.plan(conn, timing.sql, timing.parameters)
+        parameters = timing.parameters
+        if isinstance(parameters, dict):
+            parameters = {key: _parameter(value) for key, value in parameters.items()}
+        else:
+            parameters = [_parameter(value) for value in parameters]
+        scans = full_scans(timing.sql, plan)
+        self._logger.info(json.dumps({
+            'at': datetime.now(timezone.utc).isoformat(),
+            'ms': round(timing.seconds * 1000, 2),
+            'complete': complete,
+            'rows': timing.rows,
+            'query': timing.name,
+            'sql': ' '.join(timing.sql.split()),
+            'parameters': parameters,
+            'plan': plan,
+            'full_scan': bool(scans),
+            'scans': scans,
+        }, ensure_ascii=False, default=str))
+        self.logged += 1
+
+    def connection_factory(self):
+        """sqlite3 connection class for ConnectionPool(factory=...) that logs to this file"""
+        log = self
+
+        class SlowQueryCursor(InstrumentedCursor):
+            _logged = None
+
+            def _after(self, done):
+                timing = self._timing
+                if timing.seconds >= log.threshold and self._logged is not timing:
+                    # Once per statement, as soon as it is over the threshold
+                    self._logged = timing
+                    log.record(self.connection, timing, done)
+
+        class SlowQueryConnection(InstrumentedConnection):
+            def cursor(self, factory=SlowQueryCursor):
+                return super().cursor(factory)
+
+        return SlowQueryConnection
+
+def read_entries(path):
+    """Entries from the log and its rotated backups, oldest file first"""
+    paths = [path]
+    index = 1
+    while os.path.exists(f'{path}.{index}'):
+        paths.append(f'{path}.{index}')
+        index += 1
+    for log_path in reversed(paths):
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
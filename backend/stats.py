@@ -0,0 +1,82 @@
+"""Precomputed company statistics behind /api/stats, rebuilt by the importer"""
+
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from backend.db import get_import_metadata, set_import_metadata
+
+# dimension -> query yielding (value, count); one pass over companies each
+STATS_QUERIES = {
+    'total': "SELECT '', COUNT(*) FROM companies",
+    'status': "SELECT COALESCE(company_status, ''), COUNT(*) FROM companies GROUP BY 1",
+    'country': "SELECT COALESCE(registered_office_country, ''), COUNT(*) FROM companies GROUP BY 1",
+    'company_type': "SELECT COALESCE(company_type, ''), COUNT(*) FROM companies GROUP BY 1",
+    'incorporation_year': "SELECT COALESCE(substr(date_of_creation, 1, 4), ''), COUNT(*) FROM companies GROUP BY 1",
+    # The codes company_sic holds, so /api/sic can be served from here
+    'sic': """
+        SELECT sic.value, COUNT(*)
+        FROM companies, json_each(companies.sic_codes) AS sic
+        WHERE json_valid(companies.sic_codes) AND sic.type = 'text' AND typeof(sic.key) = 'integer'
+        GROUP BY 1
+    """,
+}
+
+def create_stats_table(cursor):
+    """Create the statistics table (idempotent)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS company_stats (
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (dimension, value)
+    ) WITHOUT ROWID
+    """)
+
+def compute_stats(conn):
+    """Aggregate companies now: {dimension: [(value, count), ...] largest first}"""
+    cursor = conn.cursor()
+    stats = {}
+    for dimension, sql in STATS_QUERIES.items():
+        cursor.execute(sql)
+        stats[dimension] = sorted(((value, count) for value, count in cursor.fetchall()),
+                                  key=lambda row: (-row[1], row[0]))
+    return stats
+
+def rebuild_stats(conn):
+    """Recompute company_stats from companies"""
+    start = time.time()
+    stats = compute_stats(conn)
+
+    cursor = conn.cursor()
+    create_stats_table(cursor)
+    cursor.execute("DELETE FROM company_stats")
+    cursor.executemany(
+        "INSERT INTO company_stats (dimension, value, count) VALUES (?, ?, ?)",
+        [(dimension, value, count) for dimension, rows in stats.items() for value, count in rows]
+    )
+    set_import_metadata(conn, 'stats_built_at', datetime.now(timezone.utc).isoformat())
+    conn.commit()
+
+    return {'rows': sum(len(rows) for rows in stats.values()), 'seconds': round(time.time() - start, 1)}
+
+def load_stats(conn):
+    """The stored statistics in compute_stats() form, or None if never built"""
+    try:
+        rows = conn.execute(
+            "SELECT dimension, value, count FROM company_stats ORDER BY dimension, count DESC, value"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Database created before company_stats existed
+        return None
+    if not rows:
+        return None
+
+    stats = {dimension: [] for dimension in STATS_QUERIES}
+    for dimension, value, count in rows:
+        stats.setdefault(dimension, []).append((value, count))
+    return stats
+
+def stats_built_at(conn):
+    """When company_stats was last rebuilt (ISO string), or None"""
+    return get_import_metadata(conn, 'stats_built_at')
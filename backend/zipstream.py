@@ -0,0 +1,163 @@
+"""Read the CSV out of the bulk data zip as a stream, even while the zip is still downloading"""
+
+import io
+import struct
+import time
+import zipfile
+import zlib
+
+ZIP_MAGIC = b'PK\x03\x04'
+
+# signature, version, flags, method, mod time, mod date, crc, compressed, uncompressed, name len, extra len
+LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+DESCRIPTOR_MAGIC = b'PK\x07\x08'
+
+READ_SIZE = 1024 * 1024      # compressed bytes per read
+INFLATE_SIZE = 4 * 1024 * 1024   # most inflated bytes held at once
+
+def _read_exact(fileobj, size):
+    data = b''
+    while len(data) < size:
+        block = fileobj.read(size - len(data))
+        if not block:
+            raise zipfile.BadZipFile('zip ends inside a header')
+        data += block
+    return data
+
+class GrowingFile(io.RawIOBase):
+    """
+    A file that is still being written: reads wait for more data instead of
+    returning EOF until done (a threading.Event) is set by the writer.
+    """
+
+    def __init__(self, path, done, poll=0.5):
+        self._file = open(path, 'rb')
+        self._done = done
+        self.poll = poll
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._file.tell()
+
+    def readinto(self, buffer):
+        while True:
+            read = self._file.readinto(buffer)
+            if read:
+                return read
+            if self._done.is_set():
+                # The last write may have landed between the read and the check
+                return self._file.readinto(buffer)
+            time.sleep(self.poll)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+class ZipMemberStream(io.RawIOBase):
+    """
+    The first member of a zip, inflated on the fly from a file object read
+    strictly front to back. Unlike zipfile this never looks at the central
+    directory at the end of the archive, so it works on a partial download.
+    The member's CRC32 is checked when its end is reached.
+    """
+
+    def __init__(self, fileobj):
+        self._raw = fileobj
+        self.header = _read_exact(fileobj, LOCAL_HEADER.size)
+        (magic, _, self._flags, method, _, _, crc,
+         _, size, name_length, extra_length) = LOCAL_HEADER.unpack(self.header)
+        if magic != ZIP_MAGIC:
+            raise zipfile.BadZipFile('not a zip file')
+        if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise zipfile.BadZipFile(f'unsupported compression method {method}')
+        if method == zipfile.ZIP_STORED and (self._flags & 0x08 or size == 0xFFFFFFFF):
+            raise zipfile.BadZipFile('stored member without a usable size cannot be streamed')
+
+        raw_name = _read_exact(fileobj, name_length)
+        self.name = raw_name.decode('utf-8' if self._flags & 0x800 else 'cp437')
+        _read_exact(fileobj, extra_length)
+
+        # With flag bit 3 the CRC comes in a data descriptor after the data
+        self._expected_crc = None if self._flags & 0x08 else crc
+        self._inflater = zlib.decompressobj(-zlib.MAX_WBITS) if method == zipfile.ZIP_DEFLATED else None
+        self._stored_left = size
+        self._crc = 0
+        self._position = 0
+        self._pending = b''
+        self._pending_at = 0
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        """Bytes of the member returned so far"""
+        return self._position
+
+    def _inflate(self):
+        if self._inflater is None:
+            data = self._raw.read(min(READ_SIZE, self._stored_left))
+            if not data:
+                raise zipfile.BadZipFile(f'{self.name} is truncated')
+            self._stored_left -= len(data)
+            if self._stored_left == 0:
+                self._finish(b'')
+            return data
+
+        data = self._inflater.unconsumed_tail or self._raw.read(READ_SIZE)
+        if not data:
+            raise zipfile.BadZipFile(f'{self.name} is truncated')
+        out = self._inflater.decompress(data, INFLATE_SIZE)
+        if self._inflater.eof:
+            self._finish(self._inflater.unused_data)
+        return out
+
+    def _finish(self, trailing):
+        if self._expected_crc is None:
+            descriptor = trailing + self._raw.read(max(0, 16 - len(trailing)))
+            if descriptor.startswith(DESCRIPTOR_MAGIC):
+                descriptor = descriptor[4:]
+            if len(descriptor) < 4:
+                raise zipfile.BadZipFile(f'{self.name} has no data descriptor')
+            self._expected_crc = struct.unpack('<I', descriptor[:4])[0]
+        self._eof = True
+
+    def readinto(self, buffer):
+        while self._pending_at >= len(self._pending):
+            if self._eof:
+                if self._crc != self._expected_crc:
+                    raise zipfile.BadZipFile(f'CRC mismatch in {self.name}')
+                return 0
+            self._pending = self._inflate()
+            self._pending_at = 0
+            self._crc = zlib.crc32(self._pending, self._crc)
+
+        size = min(len(buffer), len(self._pending) - self._pending_at)
+        buffer[:size] = self._pending[self._pending_at:self._pending_at + size]
+        self._pending_at += size
+        self._position += size
+        return size
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+def open_source(path, follow=None, buffer_size=READ_SIZE):
+    """
+    Open a bulk data file for reading as bytes: a plain CSV, or a zip whose
+    first member is the CSV. With follow (an Event the downloader sets when
+    it finishes) the file is a zip that may still be growing.
+    Returns (stream, member): member is the ZipMemberStream (.name, .header) or None for a CSV.
+    """
+    raw = GrowingFile(path, follow) if follow is not None else open(path, 'rb', buffering=0)
+    probe = io.BufferedReader(raw, buffer_size)
+    if probe.peek(len(ZIP_MAGIC))[:len(ZIP_MAGIC)] != ZIP_MAGIC:
+        if follow is not None:
+            # The download stopped before (or instead of) sending a zip
+            probe.close()
+            raise zipfile.BadZipFile('download is not a zip file')
+        return probe, None
+    member = ZipMemberStream(probe)
+    return io.BufferedReader(member, buffer_size), member
@@ -0,0 +1,12 @@
+"""
+Benchmarks for the importer and the API, on synthetic Companies House data.
+
+    python -m benchmarks.generate_data --size 1m            # benchmarks/data/companies_1m.csv
+    python -m benchmarks.bench_import --size 1m --workers 4
+    gunicorn -w 4 -b 127.0.0.1:5000 app_main:app            # DATABASE_PATH=benchmarks/data/bench_1m.db
+    python -m benchmarks.bench_api --url http://127.0.0.1:5000
+    python -m benchmarks.compare results/before.json results/after.json
+
+Every run writes a JSON file to benchmarks/results/ stamped with the git
+commit, so numbers from two commits on the same machine can be compared.
+"""
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Latency percentiles for every API route against a running server, e.g.
+
+    DATABASE_PATH=benchmarks/data/bench_1m.db gunicorn -w 4 -b 127.0.0.1:5000 app_main:app
+    python -m benchmarks.bench_api --url http://127.0.0.1:5000
+
+or let it start the server on a database itself:
+
+    python -m benchmarks.bench_api --server gunicorn --db benchmarks/data/bench_1m.db
+    python -m benchmarks.bench_api --server uvicorn --db benchmarks/data/bench_1m.db
+
+Each route gets the same number of requests from a pool of client threads.
+Search, company and autocomplete requests cycle through many distinct
+URLs, so early requests miss the server's response cache and later ones
+hit it; latencies are also reported split by the X-Cache header.
+"""
+
+import os
+import sys
+import time
+import random
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import REPO_DIR, environment, percentiles, write_results
+from benchmarks.generate_data import COMMON_WORDS
+
+# Distinct URLs per route: enough that the first pass is mostly cache misses
+SEARCH_QUERIES = 200
+COMPANY_NUMBERS = 300
+
+SERVERS = {
+    'gunicorn': ['gunicorn', '-w', '{workers}', '--threads', '4', '-b', '127.0.0.1:{port}', 'app_main:app'],
+    'uvicorn': ['uvicorn', 'asgi_main:app', '--workers', '{workers}', '--port', '{port}', '--log-level', 'warning'],
+    'flask': [sys.executable, '-c', 'from app_main import app; app.run(port={port}, threaded=True)'],
+}
+
+_local = threading.local()
+
+def session():
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+def search_queries(rng):
+    """Single common tokens, two-word combinations, prefixes and count modes"""
+    words = [word.lower() for word in COMMON_WORDS]
+    queries = [f'/api/search?q={word}' for word in words[:40]]
+    while len(queries) < SEARCH_QUERIES:
+        first, second = rng.sample(words, 2)
+        kind = rng.random()
+        if kind < 0.5:
+            queries.append(f'/api/search?q={quote(first + " " + second)}')
+        elif kind < 0.7:
+            queries.append(f'/api/search?q={first[:rng.randint(2, 4)]}')
+        elif kind < 0.85:
+            queries.append(f'/api/search?q={first}&count=exact&limit=50')
+        else:
+            queries.append(f'/api/search?q={first}&offset={rng.randint(1, 10) * 20}')
+    return list(dict.fromkeys(queries))
+
+def discover(base_url, rng):
+    """Company numbers and next-page cursors from real search results"""
+    numbers, cursors = [], []
+    for word in COMMON_WORDS[:60]:
+        response = session().get(f'{base_url}/api/search', params={'q': word.lower(), 'limit': 20})
+        if response.status_code != 200:
+            continue
+        data = response.json()
+        numbers.extend(company['company_number'] for company in data['results'])
+        if data.get('next_cursor'):
+            cursors.append(f"/api/search?q={word.lower()}&cursor={quote(data['next_cursor'])}")
+    numbers = list(dict.fromkeys(numbers))
+    rng.shuffle(numbers)
+    return numbers[:COMPANY_NUMBERS], cursors
+
+def route_urls(base_url, seed):
+    rng = random.Random(seed)
+    numbers, cursors = discover(base_url, rng)
+    prefixes = sorted({word.lower()[:length] for word in COMMON_WORDS for length in (2, 3, 4)})
+    return {
+        'home': ['/'],
+        'health': ['/health'],
+        'search': search_queries(rng),
+        'search_cursor': cursors or ['/api/search?q=services'],
+        'company': [f'/api/company/{number}' for number in numbers] or ['/api/company/00000000'],
+        'company_missing': ['/api/company/NOTFOUND'],
+        'stats': ['/api/stats'],
+        'autocomplete': [f'/api/search/autocomplete?q={prefix}' for prefix in prefixes],
+        'cache_stats': ['/api/cache/stats'],
+    }
+
+def timed_get(base_url, path):
+    start = time.perf_counter()
+    try:
+        response = session().get(base_url + path, timeout=30)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code, response.headers.get('X-Cache') == 'HIT'
+    except requests.RequestException:
+        return time.perf_counter() - start, None, False
+
+def bench_route(base_url, paths, count, concurrency):
+    """count requests over paths (in order, repeating) from concurrency threads"""
+    order = [paths[i % len(paths)] for i in range(count)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        samples = list(pool.map(lambda path: timed_get(base_url, path), order))
+    wall = time.perf_counter() - start
+
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [elapsed for elapsed, status, _ in samples if status and status < 500]
+    return {
+        'requests': count,
+        'distinct_urls': len(paths),
+        'requests_per_second': round(count / wall, 1),
+        'latency_ms': percentiles(ok),
+        'cache_hit_ms': percentiles([elapsed for elapsed, status, hit in samples if status and hit]),
+        'cache_miss_ms': percentiles([elapsed for elapsed, status, hit in samples if status and status < 500 and not hit]),
+        'statuses': statuses,
+        'errors': sum(1 for _, status, _ in samples if status is None or status >= 500),
+    }
+
+def wait_for(base_url, seconds=30):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+def start_server(kind, db_path, port, workers):
+    command = [part.format(port=port, workers=workers) for part in SERVERS[kind]]
+    env = dict(os.environ, DATABASE_PATH=os.path.abspath(db_path))
+    print(f"🚀 {' '.join(command)}")
+    return subprocess.Popen(command, cwd=REPO_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def main(url, requests_per_route, concurrency, routes=None, server=None, db_path=None,
+         port=5055, workers=4, seed=1, output=None):
+    process = None
+    if server:
+        url = f'http://127.0.0.1:{port}'
+        process = start_server(server, db_path, port, workers)
+    try:
+        if not wait_for(url):
+            print(f"❌ No server answering at {url}/health")
+            return None
+
+        urls = route_urls(url, seed)
+        results = {
+            'benchmark': 'api',
+            'environment': environment(),
+            'config': {
+                'url': url, 'server': server, 'workers': workers if server else None,
+                'database': db_path, 'requests_per_route': requests_per_route,
+                'concurrency': concurrency, 'seed': seed,
+            },
+            'routes': {},
+        }
+
+        print(f"\n{'route':<16} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  errors")
+        for name, paths in urls.items():
+            if routes and name not in routes:
+                continue
+            result = bench_route(url, paths, requests_per_route, concurrency)
+            results['routes'][name] = result
+            latency = result['latency_ms'] or {}
+            print(f"{name:<16} {result['requests_per_second']:>8} {latency.get('p50', '-'):>8} "
+                  f"{latency.get('p95', '-'):>8} {latency.get('p99', '-'):>8} {latency.get('max', '-'):>8}  "
+                  f"{result['errors']}")
+
+        write_results('api', results, output)
+        return results
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Latency percentiles for every API route')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Server to benchmark')
+    parser.add_argument('--server', choices=SERVERS, help='Start this server on --db instead of using --url')
+    parser.add_argument('--db', default=os.path.join(REPO_DIR, 'benchmarks', 'data', 'bench_10k.db'),
+                        help='Database for --server')
+    parser.add_argument('--port', type=int, default=5055, help='Port for --server')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes for --server')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per route')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads')
+    parser.add_argument('--routes', help='Comma separated subset, e.g. search,company')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Results file (default benchmarks/results/api-<commit>-<time>.json)')
+
+    args = parser.parse_args()
+
+    main(args.url, args.requests, args.concurrency, args.routes.split(',') if args.routes else None,
+         args.server, args.db, args.port, args.workers, args.seed, args.output)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Import throughput of scripts/import_companies_final.py on a generated
+dataset: a full import per configuration (serial, parallel parsing, bulk
+mode) into a fresh database, then optionally a --diff import of the next
+month's file on top of it. The last database built is kept for bench_api.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    DATA_DIR, SIZES, add_repo_to_path, dataset_path, environment, write_results
+)
+from benchmarks.generate_data import generate
+
+add_repo_to_path()
+
+import create_schema
+import import_companies_final
+from fix_schema import fix_status_constraint
+
+def database_path(size):
+    return os.path.join(DATA_DIR, f'bench_{size}.db')
+
+def remove_database(db_path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+def fresh_database(db_path):
+    """Empty database with the production schema (status CHECK dropped, as fix_schema did)"""
+    remove_database(db_path)
+    create_schema.DATABASE_PATH = db_path
+    create_schema.create_schema()
+    conn = sqlite3.connect(db_path)
+    fix_status_constraint(conn)
+    conn.close()
+
+def database_size(db_path):
+    return sum(os.path.getsize(db_path + suffix) for suffix in ('', '-wal') if os.path.exists(db_path + suffix))
+
+def run_import(db_path, csv_path, **options):
+    """One import_companies() run, timed end to end"""
+    import_companies_final.DATABASE_PATH = db_path
+    start = time.time()
+    summary = import_companies_final.import_companies(csv_path, **options)
+    seconds = time.time() - start
+    return {
+        'options': options,
+        'seconds': round(seconds, 2),
+        'rows_per_second': round(summary['rows_processed'] / seconds) if seconds else None,
+        'load_rows_per_second': (round(summary['rows_processed'] / summary['phases']['load'])
+                                 if summary['phases'].get('load') else None),
+        'phases': {phase: round(value, 2) for phase, value in summary['phases'].items()},
+        'rows_processed': summary['rows_processed'],
+        'rows_inserted': summary['rows_inserted'],
+        'rows_skipped': summary['rows_skipped'],
+        'changes': summary['changes'],
+        'database_bytes': database_size(db_path),
+    }
+
+def main(size, workers, bulk, diff, seed=1, output=None):
+    csv_path = dataset_path(size)
+    if not os.path.exists(csv_path):
+        print(f"📝 Generating {size} dataset...")
+        generate(csv_path, SIZES[size], seed)
+    db_path = database_path(size)
+
+    configurations = [{'workers': count} for count in workers]
+    if bulk:
+        configurations.append({'workers': max(workers), 'bulk': True})
+
+    runs = {}
+    for options in configurations:
+        name = f"{'bulk' if options.get('bulk') else 'full'}-w{options['workers']}"
+        print(f"\n{'=' * 50}\n⏱️  {name}\n{'=' * 50}")
+        fresh_database(db_path)
+        runs[name] = run_import(db_path, csv_path, **options)
+
+    if diff:
+        next_month = csv_path.replace('.csv', '_month1.csv')
+        if not os.path.exists(next_month):
+            print("📝 Generating next month's dataset...")
+            generate(next_month, SIZES[size], seed, month=1)
+        name = f"diff-w{max(workers)}"
+        print(f"\n{'=' * 50}\n⏱️  {name}\n{'=' * 50}")
+        runs[name] = run_import(db_path, next_month, workers=max(workers), diff=True)
+
+    results = {
+        'benchmark': 'import',
+        'environment': environment(),
+        'dataset': {'size': size, 'rows': SIZES[size], 'csv_bytes': os.path.getsize(csv_path), 'seed': seed},
+        'runs': runs,
+    }
+
+    print(f"\n📊 Import throughput ({size}):")
+    for name, run in runs.items():
+        print(f"  {name}: {run['rows_per_second']:,} rows/s overall, {run['seconds']:.0f}s")
+    write_results('import', results, output)
+    print(f"🗄️  Database kept for bench_api: {db_path}")
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark import_companies_final on synthetic data')
+    parser.add_argument('--size', choices=SIZES, default='10k')
+    parser.add_argument('--workers', default='1', help='Comma separated worker counts to compare, e.g. 1,4')
+    parser.add_argument('--bulk', action='store_true', help='Also time a --bulk import')
+    parser.add_argument('--diff', action='store_true', help="Then time a --diff import of next month's file")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Results file (default benchmarks/results/import-<commit>-<time>.json)')
+
+    args = parser.parse_args()
+
+    main(args.size, [int(count) for count in args.workers.split(',')], args.bulk, args.diff, args.seed, args.output)
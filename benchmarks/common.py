@@ -0,0 +1,78 @@
+"""Shared helpers: paths, environment stamp, percentiles and result files"""
+
+import os
+import sys
+import json
+import sqlite3
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_DIR, 'benchmarks', 'data')
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+
+# Dataset sizes by name; 5.6m is the full register
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '5.6m': 5_600_000,
+}
+
+def dataset_path(size):
+    return os.path.join(DATA_DIR, f'companies_{size}.csv')
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    """Where and on what the numbers were measured"""
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+    }
+
+def percentiles(samples):
+    """Latency summary in milliseconds for a list of seconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50': at(0.50),
+        'p90': at(0.90),
+        'p95': at(0.95),
+        'p99': at(0.99),
+        'max': round(ordered[-1] * 1000, 2),
+    }
+
+def write_results(kind, results, path=None):
+    """Save results as JSON (benchmarks/results/<kind>-<commit>-<time>.json by default)"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(RESULTS_DIR, f"{kind}-{results['environment']['commit'] or 'nogit'}-{stamp}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results: {path}")
+    return path
+
+def add_repo_to_path():
+    """Make backend/ and the scripts importable"""
+    for path in (REPO_DIR, os.path.join(REPO_DIR, 'scripts')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Compare two benchmark result files, e.g. from before and after a commit"""
+
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def change(before, after):
+    if not before or after is None:
+        return ''
+    return f'{(after - before) / before * 100:+.1f}%'
+
+def compare_api(before, after):
+    print(f"{'route':<16} {'p50 before':>11} {'p50 after':>10} {'':>8} {'p95 before':>11} {'p95 after':>10} {'':>8}")
+    for route, new in after['routes'].items():
+        old = before['routes'].get(route)
+        if not old or not old['latency_ms'] or not new['latency_ms']:
+            continue
+        o, n = old['latency_ms'], new['latency_ms']
+        print(f"{route:<16} {o['p50']:>11} {n['p50']:>10} {change(o['p50'], n['p50']):>8} "
+              f"{o['p95']:>11} {n['p95']:>10} {change(o['p95'], n['p95']):>8}")
+
+def compare_import(before, after):
+    print(f"{'run':<12} {'rows/s before':>14} {'rows/s after':>13} {'':>8}")
+    for run, new in after['runs'].items():
+        old = before['runs'].get(run)
+        if not old:
+            continue
+        print(f"{run:<12} {old['rows_per_second']:>14,} {new['rows_per_second']:>13,} "
+              f"{change(old['rows_per_second'], new['rows_per_second']):>8}")
+
+def main(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    if before['benchmark'] != after['benchmark']:
+        print(f"❌ Cannot compare a {before['benchmark']} run with a {after['benchmark']} run")
+        return 1
+
+    print(f"📊 {before['environment']['commit']} → {after['environment']['commit']}")
+    if before['environment']['host'] != after['environment']['host']:
+        print("⚠️  Measured on different hosts")
+    if after['benchmark'] == 'api':
+        compare_api(before, after)
+    else:
+        compare_import(before, after)
+    return 0
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('before')
+    parser.add_argument('after')
+
+    args = parser.parse_args()
+
+    sys.exit(main(args.before, args.after))
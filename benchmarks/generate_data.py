@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic BasicCompanyData CSV in the real column layout
+(space-prefixed headers and all) for benchmarking.
+
+Names draw on a Zipf-weighted vocabulary so common tokens (LTD, SERVICES,
+LONDON) match hundreds of thousands of rows while the long tail stays rare,
+like the real register. The same seed always gives the same file;
+--month N gives that file N monthly updates later (changed, dissolved and
+new companies) for diff import benchmarks.
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import zipfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import DATA_DIR, SIZES, dataset_path
+
+# The real header, including the leading spaces on some names
+HEADER = [
+    'CompanyName', ' CompanyNumber', 'RegAddress.CareOf', 'RegAddress.POBox',
+    'RegAddress.AddressLine1', ' RegAddress.AddressLine2', 'RegAddress.PostTown',
+    'RegAddress.County', 'RegAddress.Country', 'RegAddress.PostCode',
+    'CompanyCategory', 'CompanyStatus', 'CountryOfOrigin', 'DissolutionDate',
+    'IncorporationDate', 'Accounts.AccountRefDay', 'Accounts.AccountRefMonth',
+    'Accounts.NextDueDate', 'Accounts.LastMadeUpDate', 'Accounts.AccountCategory',
+    'Returns.NextDueDate', 'Returns.LastMadeUpDate', 'Mortgages.NumMortCharges',
+    'Mortgages.NumMortOutstanding', 'Mortgages.NumMortPartSatisfied',
+    'Mortgages.NumMortSatisfied', 'SICCode.SicText_1', 'SICCode.SicText_2',
+    'SICCode.SicText_3', 'SICCode.SicText_4', 'LimitedPartnerships.NumGenPartners',
+    'LimitedPartnerships.NumLimPartners', 'URI',
+]
+for i in range(1, 11):
+    HEADER += [f'PreviousName_{i}.CONDATE', f' PreviousName_{i}.CompanyName']
+HEADER += ['ConfStmtNextDueDate', ' ConfStmtLastMadeUpDate']
+COLUMN = {name: index for index, name in enumerate(HEADER)}
+
+# Most frequent name tokens first; the synthetic long tail follows them
+COMMON_WORDS = [
+    'SERVICES', 'UK', 'HOLDINGS', 'PROPERTY', 'CONSULTING', 'GROUP', 'SOLUTIONS',
+    'LONDON', 'MANAGEMENT', 'INTERNATIONAL', 'TRADING', 'PROPERTIES', 'DEVELOPMENTS',
+    'INVESTMENTS', 'CONSULTANCY', 'GLOBAL', 'TECHNOLOGIES', 'BUILDING', 'CONSTRUCTION',
+    'MEDIA', 'DESIGN', 'ENTERPRISES', 'CARE', 'HOME', 'BRITISH', 'ESTATES', 'LOGISTICS',
+    'RETAIL', 'HEALTH', 'GREEN', 'ENGLAND', 'CAPITAL', 'ASSOCIATES', 'PARTNERS',
+    'VENTURES', 'SYSTEMS', 'DIGITAL', 'ENERGY', 'FOODS', 'MOTORS', 'TRANSPORT',
+    'CLEANING', 'ELECTRICAL', 'HOMES', 'LIVING', 'NORTH', 'SOUTH', 'EAST', 'WEST',
+    'ROYAL', 'CROWN', 'BRIDGE', 'STONE', 'OAK', 'MILL', 'PARK', 'HOUSE', 'CAFE',
+    'BAKERY', 'KITCHEN', 'FITNESS', 'BEAUTY', 'HAIR', 'STUDIO', 'TECH', 'SOFTWARE',
+    'DATA', 'ENGINEERING', 'SECURITY', 'TRAVEL', 'EVENTS', 'FASHION', 'MARKETING',
+    'RECRUITMENT', 'EDUCATION', 'TRAINING', 'LEGAL', 'FINANCIAL', 'ACCOUNTANCY',
+    'PLUMBING', 'ROOFING', 'LANDSCAPES', 'AUTOS', 'LEEDS', 'MANCHESTER', 'BRISTOL',
+    'BIRMINGHAM', 'GLASGOW', 'EDINBURGH', 'CARDIFF', 'BELFAST', 'YORK', 'KENT',
+    'TESCO', 'SMITH', 'JONES', 'TAYLOR', 'BROWN', 'WILLIAMS', 'WILSON', 'KHAN', 'PATEL',
+]
+SYLLABLES = ['AR', 'BEL', 'COR', 'DA', 'EL', 'FEN', 'GRA', 'HAL', 'IN', 'JOR', 'KEL',
+             'LAN', 'MOR', 'NOR', 'OX', 'PEN', 'QUIN', 'ROS', 'SAL', 'TOR', 'VAN',
+             'WEL', 'ZEN', 'ISH', 'TON', 'LEY', 'FORD', 'WICK', 'DALE', 'MERE']
+LONG_TAIL_WORDS = 60_000
+
+SUFFIXES = [('LTD', 62), ('LIMITED', 30), ('LLP', 2), ('PLC', 0.2), ('CIC', 1), ('', 4.8)]
+
+CATEGORIES = [
+    ('Private Limited Company', 88),
+    ('PRI/LTD BY GUAR/NSC (Private, limited by guarantee, no share capital)', 3),
+    ('Limited Liability Partnership', 2),
+    ('Community Interest Company', 1),
+    ('Limited Partnership', 1),
+    ("PRI/LBG/NSC (Private, Limited by guarantee, no share capital, use of 'Limited' exemption)", 1),
+    ('Public Limited Company', 0.2),
+    ('Registered Society', 0.5),
+    ('Charitable Incorporated Organisation', 0.8),
+    ('Overseas Entity', 0.5),
+]
+
+STATUSES = [
+    ('Active', 91),
+    ('Active - Proposal to Strike off', 5),
+    ('Liquidation', 2),
+    ('In Administration', 0.5),
+    ('Voluntary Arrangement', 0.3),
+    ('Live but Receiver Manager on at least one charge', 0.1),
+    ('RECEIVER MANAGER / ADMINISTRATIVE RECEIVER', 0.1),
+]
+
+SIC_CODES = [
+    ('68209', 'Other letting and operating of own or leased real estate', 9),
+    ('70229', 'Management consultancy activities other than financial management', 7),
+    ('62020', 'Information technology consultancy activities', 6),
+    ('99999', 'Dormant Company', 5),
+    ('82990', 'Other business support service activities n.e.c.', 5),
+    ('96090', 'Other service activities n.e.c.', 4),
+    ('41100', 'Development of building projects', 4),
+    ('47910', 'Retail sale via mail order houses or via Internet', 4),
+    ('68100', 'Buying and selling of own real estate', 3),
+    ('43999', 'Other specialised construction activities n.e.c.', 3),
+    ('56101', 'Licensed restaurants', 2),
+    ('56102', 'Unlicensed restaurants and cafes', 2),
+    ('64209', 'Activities of other holding companies n.e.c.', 2),
+    ('74909', 'Other professional, scientific and technical activities n.e.c.', 2),
+    ('86900', 'Other human health activities', 2),
+    ('49410', 'Freight transport by road', 2),
+    ('73110', 'Advertising agencies', 1),
+    ('10710', 'Manufacture of bread; manufacture of fresh pastry goods and cakes', 1),
+    ('47110', 'Retail sale in non-specialised stores with food, beverages or tobacco predominating', 1),
+    ('62012', 'Business and domestic software development', 2),
+    ('69201', 'Accounting and auditing activities', 1),
+    ('85590', 'Other education n.e.c.', 1),
+    ('93130', 'Fitness facilities', 1),
+    ('96020', 'Hairdressing and other beauty treatment', 1),
+    ('43210', 'Electrical installation', 1),
+    ('43220', 'Plumbing, heat and air-conditioning installation', 1),
+    ('45112', 'Sale of used cars and light motor vehicles', 1),
+    ('55100', 'Hotels and similar accommodation', 1),
+    ('81210', 'General cleaning of buildings', 1),
+    ('88100', 'Social work activities without accommodation for the elderly and disabled', 1),
+]
+
+# (post town, county, country, postcode area, weight)
+TOWNS = [
+    ('LONDON', '', 'ENGLAND', 'EC', 14), ('LONDON', '', 'ENGLAND', 'W', 6),
+    ('LONDON', '', 'ENGLAND', 'N', 4), ('MANCHESTER', '', 'ENGLAND', 'M', 5),
+    ('BIRMINGHAM', 'WEST MIDLANDS', 'ENGLAND', 'B', 5), ('LEEDS', 'WEST YORKSHIRE', 'ENGLAND', 'LS', 3),
+    ('BRISTOL', '', 'ENGLAND', 'BS', 3), ('LIVERPOOL', 'MERSEYSIDE', 'ENGLAND', 'L', 2),
+    ('SHEFFIELD', 'SOUTH YORKSHIRE', 'ENGLAND', 'S', 2), ('NOTTINGHAM', '', 'ENGLAND', 'NG', 2),
+    ('READING', 'BERKSHIRE', 'ENGLAND', 'RG', 2), ('CAMBRIDGE', 'CAMBRIDGESHIRE', 'ENGLAND', 'CB', 1),
+    ('GLASGOW', '', 'SCOTLAND', 'G', 3), ('EDINBURGH', '', 'SCOTLAND', 'EH', 2),
+    ('CARDIFF', '', 'WALES', 'CF', 2), ('BELFAST', '', 'NORTHERN IRELAND', 'BT', 2),
+    ('YORK', 'NORTH YORKSHIRE', 'ENGLAND', 'YO', 1), ('NORWICH', 'NORFOLK', 'ENGLAND', 'NR', 1),
+]
+STREETS = ['HIGH STREET', 'STATION ROAD', 'CHURCH LANE', 'MAIN STREET', 'PARK ROAD',
+           'VICTORIA ROAD', 'GREEN LANE', 'MANOR ROAD', 'CITY ROAD', 'KINGS ROAD']
+
+# Monthly change rates for --month
+CHANGE_RATE = 0.02
+DISSOLVE_RATE = 0.008
+NEW_RATE = 0.012
+
+def weighted(items):
+    """(values, cumulative weights) for random.choices"""
+    values, total, cumulative = [], 0, []
+    for *value, weight in items:
+        values.append(value[0] if len(value) == 1 else tuple(value))
+        total += weight
+        cumulative.append(total)
+    return values, cumulative
+
+def build_vocabulary(rng):
+    """COMMON_WORDS then a synthetic long tail, Zipf weighted by rank"""
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < len(COMMON_WORDS) + LONG_TAIL_WORDS:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return weighted((word, 1 / (rank ** 1.07)) for rank, word in enumerate(words, 1))
+
+def date(rng, first_year, last_year):
+    return f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(first_year, last_year)}'
+
+def company_number(index):
+    """Mostly England & Wales numbers, with Scottish, NI and LLP prefixes mixed in"""
+    hundred, bucket = divmod(index, 100)
+    if bucket < 8:
+        return f'SC{hundred * 8 + bucket:06d}'
+    if bucket < 10:
+        return f'NI{hundred * 2 + bucket - 8:06d}'
+    if bucket < 12:
+        return f'OC{hundred * 2 + bucket - 10:06d}'
+    return f'{index:08d}'
+
+class Generator:
+    """Deterministic rows: row i depends only on the seed and i"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        rng = random.Random(seed)
+        self.words, self.word_weights = build_vocabulary(rng)
+        self.suffixes, self.suffix_weights = weighted(SUFFIXES)
+        self.categories, self.category_weights = weighted(CATEGORIES)
+        self.statuses, self.status_weights = weighted(STATUSES)
+        self.sics, self.sic_weights = weighted(SIC_CODES)
+        self.towns, self.town_weights = weighted(TOWNS)
+
+    def name(self, rng):
+        words = rng.choices(self.words, cum_weights=self.word_weights, k=rng.choice((1, 2, 2, 2, 3, 3, 4)))
+        suffix = rng.choices(self.suffixes, cum_weights=self.suffix_weights)[0]
+        return ' '.join(words + [suffix]).strip()
+
+    def row(self, index, rng):
+        row = [''] * len(HEADER)
+        number = company_number(index)
+        category = rng.choices(self.categories, cum_weights=self.category_weights)[0]
+        town, county, country, area = rng.choices(self.towns, cum_weights=self.town_weights)[0]
+
+        row[COLUMN['CompanyName']] = self.name(rng)
+        row[COLUMN[' CompanyNumber']] = number
+        if rng.random() < 0.03:
+            row[COLUMN['RegAddress.CareOf']] = f'{rng.choice(COMMON_WORDS)} ACCOUNTANTS'
+        row[COLUMN['RegAddress.AddressLine1']] = f'{rng.randint(1, 300)} {rng.choice(STREETS)}'
+        if rng.random() < 0.4:
+            row[COLUMN[' RegAddress.AddressLine2']] = f'UNIT {rng.randint(1, 40)}'
+        row[COLUMN['RegAddress.PostTown']] = town
+        row[COLUMN['RegAddress.County']] = county
+        row[COLUMN['RegAddress.Country']] = rng.choice((country, country, country, 'UNITED KINGDOM'))
+        row[COLUMN['RegAddress.PostCode']] = (
+            f'{area}{rng.randint(1, 20)} {rng.randint(1, 9)}{rng.choice("ABDEFGHJLNPQRSTUWXYZ")}'
+            f'{rng.choice("ABDEFGHJLNPQRSTUWXYZ")}'
+        )
+        row[COLUMN['CompanyCategory']] = category
+        row[COLUMN['CompanyStatus']] = rng.choices(self.statuses, cum_weights=self.status_weights)[0]
+        row[COLUMN['CountryOfOrigin']] = 'United Kingdom'
+        row[COLUMN['IncorporationDate']] = date(rng, 1900 if rng.random() < 0.05 else 1990, 2025)
+        row[COLUMN['Accounts.AccountRefDay']] = str(rng.choice((28, 30, 31, 31, 31)))
+        row[COLUMN['Accounts.AccountRefMonth']] = str(rng.randint(1, 12))
+        row[COLUMN['Accounts.NextDueDate']] = date(rng, 2025, 2026)
+        if rng.random() < 0.85:
+            row[COLUMN['Accounts.LastMadeUpDate']] = date(rng, 2022, 2025)
+        row[COLUMN['Accounts.AccountCategory']] = rng.choice(
+            ('MICRO ENTITY', 'MICRO ENTITY', 'TOTAL EXEMPTION FULL', 'DORMANT', 'FULL', 'NO ACCOUNTS FILED')
+        )
+        charges = rng.choice((0, 0, 0, 0, 0, 1, 1, 2, 5))
+        row[COLUMN['Mortgages.NumMortCharges']] = str(charges)
+        row[COLUMN['Mortgages.NumMortOutstanding']] = str(charges and rng.randint(0, charges))
+        row[COLUMN['Mortgages.NumMortPartSatisfied']] = '0'
+        row[COLUMN['Mortgages.NumMortSatisfied']] = '0'
+
+        sic_count = rng.choice((1, 1, 1, 1, 2, 2, 3, 4))
+        sics = {code: text for code, text in rng.choices(self.sics, cum_weights=self.sic_weights, k=sic_count)}
+        if rng.random() < 0.01:
+            sics = {'None Supplied': None}
+        for i, (code, text) in enumerate(sics.items(), 1):
+            row[COLUMN[f'SICCode.SicText_{i}']] = f'{code} - {text}' if text else code
+
+        if category == 'Limited Partnership':
+            row[COLUMN['LimitedPartnerships.NumGenPartners']] = str(rng.randint(1, 3))
+            row[COLUMN['LimitedPartnerships.NumLimPartners']] = str(rng.randint(1, 10))
+        row[COLUMN['URI']] = f'http://business.data.gov.uk/id/company/{number}'
+
+        for i in range(1, 11):
+            if rng.random() > (0.15 if i == 1 else 0.3):
+                break
+            row[COLUMN[f'PreviousName_{i}.CONDATE']] = date(rng, 1995, 2024)
+            row[COLUMN[f' PreviousName_{i}.CompanyName']] = self.name(rng)
+
+        row[COLUMN['ConfStmtNextDueDate']] = date(rng, 2025, 2026)
+        row[COLUMN[' ConfStmtLastMadeUpDate']] = date(rng, 2023, 2025)
+        return row
+
+    def rows(self, count, month=0):
+        """count companies as of month updates after the base file"""
+        drift = random.Random(f'{self.seed}-month-{month}')
+        for index in range(1, count + 1):
+            rng = random.Random(self.seed * 1_000_003 + index)
+            row = self.row(index, rng)
+            if month:
+                roll = drift.random()
+                if roll < DISSOLVE_RATE * month:
+                    continue
+                if roll < (DISSOLVE_RATE + CHANGE_RATE) * month:
+                    row[COLUMN['CompanyStatus']] = drift.choice(('Active - Proposal to Strike off', 'Liquidation'))
+                    row[COLUMN['Accounts.LastMadeUpDate']] = date(drift, 2025, 2025)
+            yield row
+
+        # Newly incorporated companies get numbers after the base range
+        for index in range(count + 1, count + 1 + int(count * NEW_RATE * month)):
+            yield self.row(index, random.Random(self.seed * 1_000_003 + index))
+
+def generate(path, rows, seed=1, month=0, make_zip=False):
+    """Write the CSV (and optionally a zip of it, like the download). Returns the path written."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    start = time.time()
+    generator = Generator(seed)
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(HEADER)
+        written = 0
+        for row in generator.rows(rows, month):
+            writer.writerow(row)
+            written += 1
+            if written % 250_000 == 0:
+                print(f"  {written:,} rows ({written / (time.time() - start):,.0f}/s)")
+
+    size = os.path.getsize(path)
+    print(f"✅ {written:,} rows, {size / 1024 / 1024:,.0f} MB in {time.time() - start:.0f}s: {path}")
+
+    if make_zip:
+        zip_path = os.path.splitext(path)[0] + '.zip'
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, os.path.basename(path))
+        print(f"📦 {zip_path}")
+        return zip_path
+    return path
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate a synthetic BasicCompanyData CSV')
+    parser.add_argument('--size', choices=SIZES, default='10k', help='Number of companies')
+    parser.add_argument('--rows', type=int, help='Exact number of companies (overrides --size)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--month', type=int, default=0,
+                        help='The same register N monthly updates later, for diff import benchmarks')
+    parser.add_argument('--zip', action='store_true', help='Also write a zip like the bulk download')
+    parser.add_argument('--out', help=f'Output CSV (default {DATA_DIR}/companies_<size>.csv)')
+
+    args = parser.parse_args()
+
+    out = args.out or dataset_path(args.size if not args.rows else str(args.rows))
+    if args.month and not args.out:
+        out = out.replace('.csv', f'_month{args.month}.csv')
+    generate(out, args.rows or SIZES[args.size], args.seed, args.month, args.zip)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Build or refresh the autocomplete prefix index
+Run after imports that did not refresh it (the importer normally does)
+"""
+
+import os
+import sys
+import sqlite3
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.autocomplete import rebuild_autocomplete, refresh_autocomplete
+
+DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Build the autocomplete prefix index')
+    parser.add_argument('--full', action='store_true', help='Rebuild from scratch instead of refreshing changed names')
+    parser.add_argument('--db', default=DATABASE_PATH, help='Database path')
+    
+    args = parser.parse_args()
+    
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    
+    print(f"📂 Database: {args.db}")
+    result = rebuild_autocomplete(conn) if args.full else refresh_autocomplete(conn)
+    print(f"✅ Autocomplete {result['mode']} build done in {result['seconds']}s")
+    for key, value in result.items():
+        if key not in ('mode', 'seconds'):
+            print(f"  {key}: {value:,}")
+    
+    conn.close()
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 import sqlite3
 import os
-from collections import Counter
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.stats import load_stats, rebuild_stats, stats_built_at
 
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
 
@@ -10,21 +14,26 @@ cursor = conn.cursor()
 
 print("📊 Database Statistics\n")
 
+# Read what the importer precomputed; build it once for older databases
+stats = load_stats(conn)
+if stats is None or '--rebuild' in sys.argv:
+    print("Building statistics table...")
+    rebuild_stats(conn)
+    stats = load_stats(conn)
+print(f"(statistics built {stats_built_at(conn)})\n")
+
 # Total companies
-cursor.execute("SELECT COUNT(*) FROM companies")
-total = cursor.fetchone()[0]
+total = stats['total'][0][1] if stats['total'] else 0
 print(f"Total companies: {total:,}")
 
 # By status
 print("\nCompanies by status:")
-cursor.execute("SELECT company_status, COUNT(*) as cnt FROM companies GROUP BY company_status ORDER BY cnt DESC LIMIT 10")
-for status, count in cursor.fetchall():
+for status, count in stats['status'][:10]:
     print(f"  {status or 'NULL'}: {count:,}")
 
 # By country
 print("\nCompanies by country:")
-cursor.execute("SELECT registered_office_country, COUNT(*) as cnt FROM companies GROUP BY registered_office_country ORDER BY cnt DESC LIMIT 5")
-for country, count in cursor.fetchall():
+for country, count in stats['country'][:5]:
     print(f"  {country or 'NULL'}: {count:,}")
 
 # Sample companies
@@ -12,8 +12,38 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from backend.autocomplete import create_autocomplete_tables
+from backend.company_json import create_company_json_table
+from backend.facets import create_facets_table
+from backend.fts import FTS_TABLE_SQL, fts_reindex_needed, sync_fts_schema
+from backend.sic import create_company_sic_table
+from backend.stats import create_stats_table
+
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
 
+def create_fts(cursor):
+    """Create the FTS5 search index and the triggers that keep it in sync"""
+    print("Creating FTS5 table...")
+    cursor.execute(FTS_TABLE_SQL)
+    
+    # The view, plus triggers that feed the index the same values with
+    # FTS5's 'delete' command (replaces older UPDATE/DELETE triggers). An
+    # index declared over companies by an older version is recreated here
+    updated = sync_fts_schema(cursor)
+    for object_type, name in updated:
+        print(f"  {object_type} {name} updated")
+    
+    # Documents indexed through an older view no longer match what the
+    # triggers would 'delete', and a recreated index is empty - reindex
+    # from the view
+    if fts_reindex_needed(updated):
+        cursor.execute("SELECT 1 FROM companies LIMIT 1")
+        if cursor.fetchone():
+            print("  Rebuilding FTS5 index for the new content view...")
+            cursor.execute("INSERT INTO companies_fts(companies_fts) VALUES('rebuild')")
+            return True
+    return False
+
 def create_schema():
     """Create optimized SQLite schema for Companies House data"""
     
@@ -166,6 +196,14 @@ def create_schema():
     )
     """)
     
+    # Import bookkeeping (data version stamp read by the API caches)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS import_metadata (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+    
     # Create indexes for performance
     print("Creating indexes...")
     
@@ -186,57 +224,19 @@ def create_schema():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_filing_date ON filings(date DESC)")
     
     # Create Full Text Search table
-    print("Creating FTS5 table...")
-    cursor.execute("""
-    CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5(
-        company_number UNINDEXED,
-        company_name,
-        previous_names,
-        registered_office_address,
-        sic_code_descriptions,
-        content=companies,
-        tokenize='porter unicode61'
-    )
-    """)
+    create_fts(cursor)
     
-    # Create triggers to keep FTS in sync
-    cursor.execute("""
-    CREATE TRIGGER IF NOT EXISTS companies_ai AFTER INSERT ON companies BEGIN
-        INSERT INTO companies_fts(
-            company_number, 
-            company_name, 
-            previous_names,
-            registered_office_address,
-            sic_code_descriptions
-        ) VALUES (
-            new.company_number,
-            new.company_name,
-            new.previous_names,
-            new.registered_office_address_line_1 || ' ' || 
-            new.registered_office_locality || ' ' || 
-            new.registered_office_postal_code,
-            ''
-        );
-    END
-    """)
+    # Autocomplete prefix index (filled by the importer)
+    create_autocomplete_tables(cursor)
     
-    cursor.execute("""
-    CREATE TRIGGER IF NOT EXISTS companies_au AFTER UPDATE ON companies BEGIN
-        UPDATE companies_fts SET
-            company_name = new.company_name,
-            previous_names = new.previous_names,
-            registered_office_address = new.registered_office_address_line_1 || ' ' || 
-                new.registered_office_locality || ' ' || 
-                new.registered_office_postal_code
-        WHERE company_number = new.company_number;
-    END
-    """)
+    # Statistics behind /api/stats (filled by the importer)
+    create_stats_table(cursor)
     
-    cursor.execute("""
-    CREATE TRIGGER IF NOT EXISTS companies_ad AFTER DELETE ON companies BEGIN
-        DELETE FROM companies_fts WHERE company_number = old.company_number;
-    END
-    """)
+    # Pre-serialized API responses per company (filled by the importer)
+    create_company_json_table(cursor)
+    
+    # Facet columns behind /api/search?facets=1 (filled by the importer)
+    create_facets_table(cursor)
     
     # Create materialized view for popular companies
     cursor.execute("""
@@ -275,6 +275,9 @@ def create_schema():
     
     cursor.executemany("INSERT OR IGNORE INTO sic_codes VALUES (?, ?, ?)", common_sic_codes)
     
+    # One row per company and SIC code, for SIC filters and counts
+    create_company_sic_table(cursor)
+    
     conn.commit()
     
     # Analyze database for query planner
@@ -6,9 +6,13 @@ Handles the free BasicCompanyDataAsOneFile.zip
 
 import os
 import sys
+import json
 import requests
+import urllib3
 import zipfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from tqdm import tqdm
 
@@ -16,6 +20,12 @@ from tqdm import tqdm
 BULK_DATA_URL = "http://download.companieshouse.gov.uk/BasicCompanyDataAsOneFile-{date}.zip"
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'bulk_data')
 
+MIN_CHUNK = 64 * 1024         # Read size bounds, adapted to the link speed
+MAX_CHUNK = 8 * 1024 * 1024
+CHUNK_SECONDS = 0.25          # Target time per read
+MAX_RETRIES = 5               # Reconnects in a row without progress before giving up
+TIMEOUT = 30
+
 def get_latest_data_url():
     """
     Companies House updates bulk data on the 1st of each month
@@ -44,18 +54,228 @@ def get_latest_data_url():
         print(f"Not found. Checking {prev_date}...")
         return prev_url, prev_date
 
-def download_with_progress(url, filepath):
-    """Download file with progress bar"""
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
+class DownloadError(Exception):
+    """The download could not be completed or failed verification"""
+
+def next_chunk_size(chunk_size, nbytes, seconds):
+    """Aim for about CHUNK_SECONDS per read: big reads on a fast link, small ones on a slow one"""
+    if seconds <= 0:
+        return MAX_CHUNK
+    return int(min(MAX_CHUNK, max(MIN_CHUNK, nbytes / seconds * CHUNK_SECONDS)))
+
+def probe_download(session, url):
+    """(final url, size, whether the server honours Range requests)"""
+    response = session.head(url, allow_redirects=True, timeout=TIMEOUT)
+    response.raise_for_status()
+    size = int(response.headers.get('content-length', 0))
+    ranges = response.headers.get('accept-ranges', '').lower() == 'bytes'
+    return response.url, size, ranges
+
+def fetch_range(session, url, fd, start, end, on_progress):
+    """
+    Write bytes [start, end) of url into fd at the same offsets, reconnecting
+    with a Range request from wherever a dropped connection stopped.
+    on_progress(position, nbytes) is called after every write.
+    """
+    position = start
+    failures = 0
+    chunk_size = MIN_CHUNK
     
+    while position < end:
+        headers = {'Range': f"bytes={position}-{end - 1}"}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code != 206:
+                    raise DownloadError(f"server ignored the Range request (HTTP {response.status_code})")
+                
+                while position < end:
+                    began = time.time()
+                    data = response.raw.read(chunk_size)
+                    if not data:
+                        break
+                    os.pwrite(fd, data, position)
+                    position += len(data)
+                    failures = 0
+                    on_progress(position, len(data))
+                    chunk_size = next_chunk_size(chunk_size, len(data), time.time() - began)
+            
+            if position < end:
+                raise requests.ConnectionError(f"connection closed at byte {position:,}")
+        
+        except (requests.ConnectionError, requests.Timeout, urllib3.exceptions.HTTPError) as e:
+            failures += 1
+            if failures > MAX_RETRIES:
+                raise DownloadError(f"giving up at byte {position:,} after {MAX_RETRIES} retries: {e}")
+            time.sleep(min(2 ** failures, 30))
+    
+    return position
+
+def load_ranges(ranges_path, url, size):
+    """Ranges still to fetch from an interrupted segmented download, or None"""
+    try:
+        with open(ranges_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('size') != size or os.path.basename(state.get('url', '')) != os.path.basename(url):
+        return None
+    return [list(r) for r in state['ranges']]
+
+def download_segments(session, url, filepath, size, segments, pbar):
+    """
+    Fetch the file as `segments` byte ranges in parallel threads. Progress is
+    kept in filepath.ranges so an interrupted run resumes every segment.
+    """
+    ranges_path = filepath + '.ranges'
+    ranges = load_ranges(ranges_path, url, size)
+    if ranges is None:
+        step = -(-size // segments)
+        ranges = [[start, min(start + step, size)] for start in range(0, size, step)]
+    pbar.update(size - sum(end - start for start, end in ranges))
+    
+    lock = threading.Lock()
+    last_saved = [time.time()]
+    
+    with open(filepath, 'r+b' if os.path.exists(filepath) else 'w+b') as file:
+        file.truncate(size)
+        fd = file.fileno()
+        
+        def save():
+            # Data first, so the saved ranges never claim bytes still in the page cache
+            os.fsync(fd)
+            with open(ranges_path + '.tmp', 'w') as f:
+                json.dump({'url': url, 'size': size, 'ranges': ranges}, f)
+            os.replace(ranges_path + '.tmp', ranges_path)
+        
+        def run(segment):
+            def on_progress(position, nbytes):
+                with lock:
+                    segment[0] = position
+                    pbar.update(nbytes)
+                    if time.time() - last_saved[0] > 5:
+                        save()
+                        last_saved[0] = time.time()
+            fetch_range(session, url, fd, segment[0], segment[1], on_progress)
+        
+        with ThreadPoolExecutor(max_workers=segments) as pool:
+            jobs = [pool.submit(run, segment) for segment in ranges if segment[0] < segment[1]]
+            try:
+                for job in jobs:
+                    job.result()
+            finally:
+                with lock:
+                    save()
+    os.remove(ranges_path)
+
+def download_with_progress(url, filepath, progress=True, segments=1):
+    """
+    Download url to filepath with a progress bar, resuming a partial file.
+    Sequential by default, appending in order (so a pipeline import can read
+    behind it); segments > 1 fetches byte ranges in parallel instead.
+    Returns the size the server announced (0 if it did not say).
+    """
+    session = requests.Session()
+    url, total_size, accepts_ranges = probe_download(session, url)
     print(f"Downloading {total_size / (1024*1024*1024):.2f} GB...")
     
-    with open(filepath, 'wb') as file:
-        with tqdm(total=total_size, unit='B', unit_scale=True, desc='Downloading') as pbar:
-            for chunk in response.iter_content(chunk_size=8192):
-                file.write(chunk)
-                pbar.update(len(chunk))
+    segmented = os.path.exists(filepath + '.ranges') or segments > 1
+    if not accepts_ranges or not total_size:
+        if segmented or os.path.exists(filepath):
+            print("⚠️  Server does not support resuming - downloading from the start")
+        segmented = False
+        open(filepath, 'wb').close()
+    
+    with tqdm(total=total_size, unit='B', unit_scale=True, desc='Downloading', disable=not progress) as pbar:
+        if segmented:
+            download_segments(session, url, filepath, total_size, max(segments, 1), pbar)
+            return total_size
+        
+        with open(filepath, 'r+b' if os.path.exists(filepath) else 'w+b') as file:
+            start = file.seek(0, os.SEEK_END)
+            pbar.update(start)
+            if start > total_size:
+                raise DownloadError(f"partial file is larger than the download ({start:,} bytes) - delete {filepath}")
+            if accepts_ranges and total_size:
+                fetch_range(session, url, file.fileno(), start, total_size, lambda position, nbytes: pbar.update(nbytes))
+            else:
+                with session.get(url, stream=True, timeout=TIMEOUT) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=MAX_CHUNK):
+                        file.write(chunk)
+                        pbar.update(len(chunk))
+    
+    return total_size
+
+def verify_download(zip_path, expected_size):
+    """Check the size the server announced and the CRC of every zip member"""
+    actual_size = os.path.getsize(zip_path)
+    if expected_size and actual_size != expected_size:
+        raise DownloadError(f"size mismatch: expected {expected_size:,} bytes, got {actual_size:,}")
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            bad_member = archive.testzip()
+    except zipfile.BadZipFile as e:
+        raise DownloadError(f"not a valid zip: {e}")
+    if bad_member:
+        raise DownloadError(f"CRC check failed for {bad_member}")
+
+def download_and_import(url, zip_path, workers=1, bulk=False, diff=False, resume=False):
+    """
+    Pipeline mode: import the CSV straight out of the zip while the zip is
+    still downloading. Nothing but the zip is written to disk, and the import
+    finishes shortly after the download instead of after download + extract.
+    The download is sequential (the importer reads right behind it); the
+    member CRC is checked by the streaming reader as the import reaches its end.
+    """
+    from import_companies_final import import_companies
+    
+    if os.path.exists(zip_path):
+        print(f"✅ Zip file already exists, importing from it: {zip_path}")
+        import_companies(zip_path, resume, workers, bulk, diff)
+        return zip_path
+    
+    part_path = zip_path + '.part'
+    open(part_path, 'ab').close()  # A partial download is resumed, not restarted
+    done = threading.Event()
+    failures = []
+    expected_size = []
+    
+    def download():
+        try:
+            expected_size.append(download_with_progress(url, part_path, progress=False))
+        except Exception as e:
+            failures.append(e)
+        finally:
+            done.set()
+    
+    downloader = threading.Thread(target=download, name='download', daemon=True)
+    downloader.start()
+    try:
+        import_companies(part_path, resume, workers, bulk, diff, follow=done)
+    except zipfile.BadZipFile:
+        # The zip stops where the download did; that error is the one to report
+        downloader.join()
+        if not failures:
+            raise
+    downloader.join()
+    
+    if failures:
+        # The import saw a truncated zip, so it did not finish or publish a data version
+        print(f"❌ Download failed: {failures[0]}")
+        print("Rerun with --pipeline --resume to continue the download and the import from their checkpoints")
+        return None
+    
+    try:
+        verify_download(part_path, expected_size[0])
+    except DownloadError as e:
+        os.remove(part_path)
+        print(f"❌ Downloaded zip failed verification: {e}")
+        return None
+    
+    # Complete: keep it under its final name like a normal download
+    os.replace(part_path, zip_path)
+    print(f"✅ Zip saved: {zip_path}")
+    return zip_path
 
 def extract_with_progress(zip_path, extract_to):
     """Extract zip file with progress"""
@@ -75,7 +295,7 @@ def extract_with_progress(zip_path, extract_to):
         return os.path.join(extract_to, csv_files[0])
     return None
 
-def main():
+def main(url=None, segments=1):
     """Download and extract Companies House bulk data"""
     
     # Create data directory
@@ -91,7 +311,10 @@ def main():
             return os.path.join(DATA_DIR, existing_files[0])
     
     # Get download URL
-    url, date_str = get_latest_data_url()
+    if url:
+        date_str = datetime.now().strftime("%Y-%m-01")
+    else:
+        url, date_str = get_latest_data_url()
     print(f"\n📥 Downloading Companies House data from {date_str}")
     print(f"URL: {url}")
     
@@ -99,13 +322,32 @@ def main():
     zip_filename = f"BasicCompanyData-{date_str}.zip"
     zip_path = os.path.join(DATA_DIR, zip_filename)
     
+    # Only a verified download gets the final name, so an existing zip is complete
     if os.path.exists(zip_path):
         print(f"✅ Zip file already exists: {zip_path}")
     else:
+        part_path = zip_path + '.part'
+        if os.path.exists(part_path):
+            print(f"↩️  Resuming partial download ({os.path.getsize(part_path) / (1024*1024):.0f} MB so far)")
         start_time = time.time()
-        download_with_progress(url, zip_path)
+        try:
+            expected_size = download_with_progress(url, part_path, segments=segments)
+        except (DownloadError, requests.RequestException) as e:
+            print(f"❌ Download failed: {e}")
+            print("Run again to resume from where it stopped")
+            return None
         download_time = time.time() - start_time
         print(f"✅ Downloaded in {download_time/60:.1f} minutes")
+        
+        print("🔍 Verifying size and CRCs...")
+        try:
+            verify_download(part_path, expected_size)
+        except DownloadError as e:
+            os.remove(part_path)
+            print(f"❌ Download is corrupt: {e}")
+            print("Deleted it - run again to download afresh")
+            return None
+        os.replace(part_path, zip_path)
     
     # Extract file
     csv_path = extract_with_progress(zip_path, DATA_DIR)
@@ -129,6 +371,31 @@ def main():
         return None
 
 if __name__ == "__main__":
-    csv_path = main()
-    if csv_path:
-        print(f"\n🎯 Next step: Run import_companies.py to import this data")
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Download Companies House bulk data')
+    parser.add_argument('--url', help='Download from this URL instead of the latest Companies House file')
+    parser.add_argument('--segments', type=int, default=1,
+                        help='Download N byte ranges in parallel (not with --pipeline, which reads the zip in order)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Import while downloading, reading the CSV straight out of the zip (no extraction)')
+    parser.add_argument('--workers', type=int, default=1, help='Pipeline mode: parse the CSV in N processes')
+    parser.add_argument('--bulk', action='store_true', help='Pipeline mode: bulk-load (see import_companies_final.py)')
+    parser.add_argument('--diff', action='store_true', help='Pipeline mode: only write changed companies')
+    parser.add_argument('--resume', action='store_true', help='Pipeline mode: continue an interrupted import')
+    args = parser.parse_args()
+    
+    if args.pipeline:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        if args.url:
+            url, date_str = args.url, datetime.now().strftime("%Y-%m-01")
+        else:
+            url, date_str = get_latest_data_url()
+        print(f"\n📥 Downloading and importing Companies House data from {date_str}")
+        print(f"URL: {url}")
+        zip_path = os.path.join(DATA_DIR, f"BasicCompanyData-{date_str}.zip")
+        download_and_import(url, zip_path, args.workers, args.bulk, args.diff, args.resume)
+    else:
+        csv_path = main(args.url, args.segments)
+        if csv_path:
+            print(f"\n🎯 Next step: Run import_companies.py to import this data")
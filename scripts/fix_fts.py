@@ -2,6 +2,8 @@
 import sqlite3
 import os
 
+from create_schema import create_fts
+
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
 
 conn = sqlite3.connect(DATABASE_PATH)
@@ -9,38 +11,19 @@ cursor = conn.cursor()
 
 print("Checking FTS5 setup...")
 
-# Check if FTS table exists
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='companies_fts'")
-if not cursor.fetchone():
-    print("Creating FTS5 table...")
-    cursor.execute("""
-    CREATE VIRTUAL TABLE companies_fts USING fts5(
-        company_number UNINDEXED,
-        company_name,
-        previous_names,
-        registered_office_address,
-        tokenize='porter unicode61'
-    )
-    """)
+# Older databases declared companies_fts with content=companies, which FTS5
+# cannot read back (no address/SIC columns) - create_fts recreates it on the
+# view and reindexes
+reindexed = create_fts(cursor)
 
 # Populate FTS table from existing data
 cursor.execute("SELECT COUNT(*) FROM companies")
 company_count = cursor.fetchone()[0]
 print(f"Found {company_count:,} companies to index...")
 
-if company_count > 0:
+if company_count > 0 and not reindexed:
     print("Populating FTS index...")
-    cursor.execute("""
-    INSERT INTO companies_fts (company_number, company_name, previous_names, registered_office_address)
-    SELECT 
-        company_number,
-        company_name,
-        COALESCE(previous_names, ''),
-        COALESCE(registered_office_address_line_1, '') || ' ' || 
-        COALESCE(registered_office_locality, '') || ' ' || 
-        COALESCE(registered_office_postal_code, '')
-    FROM companies
-    """)
+    cursor.execute("INSERT INTO companies_fts(companies_fts) VALUES('rebuild')")
     
     conn.commit()
     print("✅ FTS index populated!")
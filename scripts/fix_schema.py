@@ -2,19 +2,17 @@
 import sqlite3
 import os
 
-DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
-
-conn = sqlite3.connect(DATABASE_PATH)
-cursor = conn.cursor()
+from create_schema import create_company_sic_table, create_fts
+from backend.fts import fts_reindex_needed, fts_schema, stale_fts_schema
 
-print("Fixing company_status constraint...")
+DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
 
 # First, we need to drop the constraint
 # SQLite doesn't support ALTER TABLE DROP CONSTRAINT directly
 # So we need to recreate the table
 
 # Create a new table without the constraint
-cursor.execute("""
+COMPANIES_NEW_DDL = """
 CREATE TABLE IF NOT EXISTS companies_new (
     company_number TEXT PRIMARY KEY,
     company_name TEXT NOT NULL,
@@ -64,27 +62,52 @@ CREATE TABLE IF NOT EXISTS companies_new (
     search_popularity INTEGER DEFAULT 0,
     risk_score INTEGER DEFAULT 50
 )
-""")
+"""
 
-# Copy any existing data
-cursor.execute("SELECT COUNT(*) FROM companies")
-count = cursor.fetchone()[0]
-if count > 0:
-    print(f"Copying {count} existing records...")
-    cursor.execute("INSERT INTO companies_new SELECT * FROM companies")
-
-# Drop old table and rename new one
-cursor.execute("DROP TABLE companies")
-cursor.execute("ALTER TABLE companies_new RENAME TO companies")
-
-# Recreate all indexes
-print("Recreating indexes...")
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_name ON companies(company_name)")
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_status ON companies(company_status)")
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_postcode ON companies(registered_office_postal_code)")
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_created ON companies(date_of_creation)")
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_popularity ON companies(search_popularity DESC)")
+def fix_status_constraint(conn):
+    """Recreate companies without the company_status CHECK, keeping every rowid"""
+    cursor = conn.cursor()
+    cursor.execute(COMPANIES_NEW_DDL)
+    
+    # Copy any existing data. The rowid goes across explicitly: companies_fts,
+    # the facets, bitmaps, company_json and stats are all keyed by it
+    cursor.execute("SELECT COUNT(*) FROM companies")
+    count = cursor.fetchone()[0]
+    if count > 0:
+        print(f"Copying {count} existing records...")
+        columns = ', '.join(row[1] for row in cursor.execute("PRAGMA table_info(companies_new)").fetchall())
+        cursor.execute(f"INSERT INTO companies_new (rowid, {columns}) SELECT rowid, {columns} FROM companies")
+    
+    # Drop old table and rename new one (the FTS view depends on companies)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'companies_fts'")
+    keep_index = cursor.fetchone() is not None and not fts_reindex_needed(stale_fts_schema(cursor))
+    cursor.execute("DROP VIEW IF EXISTS companies_fts_source")
+    cursor.execute("DROP TABLE companies")
+    cursor.execute("ALTER TABLE companies_new RENAME TO companies")
+    
+    # Recreate all indexes
+    print("Recreating indexes...")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_name ON companies(company_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_status ON companies(company_status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_postcode ON companies(registered_office_postal_code)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_created ON companies(date_of_creation)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_popularity ON companies(search_popularity DESC)")
+    
+    # Dropping the table also dropped the FTS and company_sic triggers. The
+    # same view over the same rowids leaves a current index valid; create_fts
+    # (re)builds it when it was missing, out of date or declared over companies
+    if keep_index:
+        cursor.execute(fts_schema()[('view', 'companies_fts_source')])
+    create_fts(cursor)
+    create_company_sic_table(cursor)
+    
+    conn.commit()
 
-conn.commit()
-print("✅ Schema fixed!")
-conn.close()
+if __name__ == "__main__":
+    conn = sqlite3.connect(DATABASE_PATH)
+    
+    print("Fixing company_status constraint...")
+    fix_status_constraint(conn)
+    
+    print("✅ Schema fixed!")
+    conn.close()
@@ -5,18 +5,91 @@ Final import script with all fixes applied
 
 import os
 import sys
+import io
 import csv
 import sqlite3
 import json
 import time
+import hashlib
+import multiprocessing
+from contextlib import contextmanager
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from backend.autocomplete import refresh_autocomplete
+from backend.bitmaps import rebuild_bitmaps, snapshot_path
+from backend.company_json import refresh_company_json
+from backend.db import bump_data_version, get_import_metadata, set_import_metadata
+from backend.facets import rebuild_facets
+from backend.fts import fts_reindex_needed, sync_fts_schema
+from backend.sic import (
+    create_company_sic_table, load_sic_codes, parse_sic_text, rebuild_company_sic, store_sic_codes
+)
+from backend.stats import rebuild_stats
+from backend.zipstream import open_source
+
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
-BATCH_SIZE = 10000
-PROGRESS_INTERVAL = 10000
+CHUNK_BYTES = 4 * 1024 * 1024  # ~10k rows: one parse job, one committed batch, one checkpoint
+BULK_CACHE_SIZE = -262144  # 256MB page cache while bulk loading
+
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS import_checkpoints (
+        csv_fingerprint TEXT PRIMARY KEY,
+        csv_path TEXT,
+        byte_offset INTEGER NOT NULL,
+        row_number INTEGER NOT NULL,
+        updated_at TEXT
+    )
+"""
+
+DIFF_DDL = (
+    # Company numbers present in the CSV of the current --diff run; anything
+    # absent at the end has left the register. A real table, not TEMP, so a
+    # resumed run still knows what was seen before the interruption.
+    """
+    CREATE TABLE IF NOT EXISTS import_seen_companies (
+        company_number TEXT PRIMARY KEY
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS company_tombstones (
+        company_number TEXT PRIMARY KEY,
+        company_name TEXT,
+        company_status TEXT,
+        removed_at TEXT
+    )
+    """,
+)
+
+# A file missing more companies than this is more likely truncated than real
+MAX_REMOVED_FRACTION = 0.05
+
+COMPANY_COLUMNS = (
+    'company_number', 'company_name', 'company_status', 'company_status_detail',
+    'date_of_creation', 'date_of_cessation', 'company_type', 'jurisdiction',
+    'registered_office_address_line_1', 'registered_office_address_line_2',
+    'registered_office_locality', 'registered_office_region',
+    'registered_office_country', 'registered_office_postal_code',
+    'registered_office_po_box', 'registered_office_care_of',
+    'sic_codes', 'previous_names',
+    'accounting_reference_date_day', 'accounting_reference_date_month',
+    'last_accounts_made_up_to', 'accounts_category',
+    'confirmation_statement_last_made_up_to',
+    'has_charges', 'has_been_liquidated', 'has_insolvency_history',
+)
+
+# Update in place rather than REPLACE: keeps the rowid the FTS index points
+# at (REPLACE deletes without firing the FTS delete trigger) and leaves
+# columns the CSV does not carry (search_popularity...) alone
+UPSERT_SQL = f"""
+    INSERT INTO companies ({', '.join(COMPANY_COLUMNS)})
+    VALUES ({', '.join('?' * len(COMPANY_COLUMNS))})
+    ON CONFLICT(company_number) DO UPDATE SET
+        {', '.join(f'{col} = excluded.{col}' for col in COMPANY_COLUMNS[1:])},
+        last_updated = CURRENT_TIMESTAMP
+"""
 
 # Column names in the CSV (with spaces!)
 COLUMN_MAPPING = {
@@ -52,15 +125,18 @@ def clean_value(value):
         return None
     return value
 
+def parse_sic_entries(row):
+    """(code, description) pairs from the SicText columns"""
+    entries = []
+    for i in range(1, 5):
+        entry = parse_sic_text(row.get(f'SICCode.SicText_{i}', ''))
+        if entry:
+            entries.append(entry)
+    return entries
+
 def parse_sic_codes(row):
     """Parse SIC codes from multiple columns"""
-    codes = []
-    for i in range(1, 5):
-        sic_text = row.get(f'SICCode.SicText_{i}', '')
-        if sic_text and sic_text.strip():
-            parts = sic_text.strip().split(' - ')
-            if parts[0].strip():
-                codes.append(parts[0].strip())
+    codes = [code for code, _ in parse_sic_entries(row)]
     return json.dumps(codes) if codes else None
 
 def parse_previous_names(row):
@@ -107,8 +183,397 @@ def normalize_status(status):
     # Return mapped value or original if not in map
     return status_map.get(status, status.lower())
 
-def import_companies(csv_path, resume_from=0):
-    """Import companies from CSV to database"""
+def parse_company(row):
+    """
+    Turn one CSV row into the companies insert tuple.
+    Returns (company_data, raw_status), or None if the row has no company number.
+    Both the serial and parallel paths go through here, so they write identical rows.
+    """
+    # Get company number using our mapping
+    company_number = clean_value(row.get(COLUMN_MAPPING['company_number'], ''))
+    if not company_number:
+        return None
+    
+    # Get and normalize status
+    raw_status = clean_value(row.get(COLUMN_MAPPING['company_status'], ''))
+    company_status = normalize_status(raw_status)
+    
+    # Convert account dates
+    acc_ref_day = clean_value(row.get(COLUMN_MAPPING['acc_ref_day'], ''))
+    acc_ref_month = clean_value(row.get(COLUMN_MAPPING['acc_ref_month'], ''))
+    
+    try:
+        acc_ref_day = int(acc_ref_day) if acc_ref_day else None
+        acc_ref_month = int(acc_ref_month) if acc_ref_month else None
+    except:
+        acc_ref_day = None
+        acc_ref_month = None
+    
+    company_data = (
+        company_number,
+        clean_value(row.get(COLUMN_MAPPING['company_name'], '')),
+        company_status,  # Now normalized
+        None,  # company_status_detail
+        parse_date(row.get(COLUMN_MAPPING['incorporation_date'], '')),
+        parse_date(row.get(COLUMN_MAPPING['dissolution_date'], '')),
+        clean_value(row.get(COLUMN_MAPPING['company_category'], '')),
+        clean_value(row.get(COLUMN_MAPPING['country_of_origin'], '')),
+        # Address
+        clean_value(row.get(COLUMN_MAPPING['address_line_1'], '')),
+        clean_value(row.get(COLUMN_MAPPING['address_line_2'], '')),
+        clean_value(row.get(COLUMN_MAPPING['post_town'], '')),
+        clean_value(row.get(COLUMN_MAPPING['county'], '')),
+        clean_value(row.get(COLUMN_MAPPING['country'], '')),
+        clean_value(row.get(COLUMN_MAPPING['postcode'], '')),
+        clean_value(row.get(COLUMN_MAPPING['po_box'], '')),
+        clean_value(row.get(COLUMN_MAPPING['care_of'], '')),
+        # SIC and names
+        parse_sic_codes(row),
+        parse_previous_names(row),
+        # Accounts
+        acc_ref_day,
+        acc_ref_month,
+        parse_date(row.get(COLUMN_MAPPING['acc_last_made_up'], '')),
+        clean_value(row.get(COLUMN_MAPPING['acc_category'], '')),
+        # Confirmation
+        parse_date(row.get(COLUMN_MAPPING['conf_stmt_last_made_up'], '')),
+        # Flags
+        1 if row.get(COLUMN_MAPPING['mort_charges'], '0') not in ['0', ''] else 0,
+        0,  # has_been_liquidated
+        0   # has_insolvency_history
+    )
+    
+    return company_data, raw_status
+
+def row_hash(company_data):
+    """Fingerprint of a parsed row, compared with company_changes.change_hash"""
+    return hashlib.sha1(repr(company_data).encode('utf-8')).hexdigest()
+
+def find_record_end(data):
+    """
+    Offset just past the last complete CSV record in data, or None.
+    A newline only ends a record outside quotes. The bulk file quotes every
+    field and doubles embedded quotes, so an even number of quotes before a
+    newline means it is a real record separator.
+    """
+    end = data.rfind(b'\n')
+    quotes = data.count(b'"', 0, end) if end >= 0 else 0
+    while end >= 0:
+        if quotes % 2 == 0:
+            return end + 1
+        previous = data.rfind(b'\n', 0, end)
+        quotes -= data.count(b'"', previous + 1, end)
+        end = previous
+    return None
+
+def read_chunks(csvfile, chunk_bytes=CHUNK_BYTES):
+    """Split the rest of a binary CSV file into (offset, bytes) chunks of whole records"""
+    offset = csvfile.tell()
+    pending = b''
+    
+    while True:
+        block = csvfile.read(chunk_bytes)
+        if not block:
+            break
+        data = pending + block
+        end = find_record_end(data)
+        if end is None:
+            pending = data
+            continue
+        yield offset, data[:end]
+        offset += end
+        pending = data[end:]
+    
+    if pending:
+        yield offset, pending
+
+def parse_chunk(fieldnames, chunk, with_hashes=False):
+    """Parse one chunk of records into insert tuples (runs in a worker process)"""
+    rows = []
+    hashes = [] if with_hashes else None
+    processed = 0
+    skipped = 0
+    errors = defaultdict(int)
+    status_counts = defaultdict(int)
+    sic_codes = {}
+    
+    # Same newline handling as open() in the serial path
+    text = io.TextIOWrapper(io.BytesIO(chunk), encoding='utf-8')
+    for row in csv.DictReader(text, fieldnames=fieldnames):
+        processed += 1
+        try:
+            parsed = parse_company(row)
+        except Exception as e:
+            errors[str(type(e).__name__)] += 1
+            skipped += 1
+            continue
+        
+        if parsed is None:
+            errors['missing_company_number'] += 1
+            skipped += 1
+            continue
+        
+        company_data, raw_status = parsed
+        if raw_status:
+            status_counts[raw_status] += 1
+        for code, description in parse_sic_entries(row):
+            if description:
+                sic_codes[code] = description
+        rows.append(company_data)
+        if with_hashes:
+            hashes.append(row_hash(company_data))
+    
+    return rows, hashes, processed, skipped, dict(errors), dict(status_counts), sic_codes
+
+def skip_to(stream, offset):
+    """Move a source stream to offset; a zip member can only be read forward to it"""
+    if stream.seekable():
+        stream.seek(offset)
+        return
+    while stream.tell() < offset:
+        if not stream.read(min(CHUNK_BYTES, offset - stream.tell())):
+            break
+
+def parse_records(csv_path, workers=1, start_offset=None, with_hashes=False, follow=None):
+    """
+    Parse the CSV chunk by chunk and yield (end_offset, parse_chunk result)
+    in file order, starting at start_offset (a checkpoint) or after the header.
+    csv_path may also be the bulk data zip, read as a stream (still growing
+    if follow is given); offsets are then positions in the uncompressed CSV.
+    With workers > 1 chunks are parsed in a process pool, at most two per
+    worker in flight to bound memory; results still come back in order so a
+    single writer inserts rows exactly as a serial run would.
+    """
+    stream, _ = open_source(csv_path, follow)
+    with stream as csvfile:
+        header = csvfile.readline()
+        if not header:
+            return
+        fieldnames = next(csv.reader([header.decode('utf-8-sig')]))
+        if start_offset:
+            skip_to(csvfile, start_offset)
+        
+        if workers <= 1:
+            for offset, chunk in read_chunks(csvfile):
+                yield offset + len(chunk), parse_chunk(fieldnames, chunk, with_hashes)
+            return
+        
+        with multiprocessing.Pool(workers) as pool:
+            in_flight = deque()
+            for offset, chunk in read_chunks(csvfile):
+                job = pool.apply_async(parse_chunk, (fieldnames, chunk, with_hashes))
+                in_flight.append((offset + len(chunk), job))
+                if len(in_flight) >= workers * 2:
+                    end_offset, job = in_flight.popleft()
+                    yield end_offset, job.get()
+            while in_flight:
+                end_offset, job = in_flight.popleft()
+                yield end_offset, job.get()
+
+def file_fingerprint(csv_path):
+    """Identify a CSV by its size and the hashes of its first and last 64KB"""
+    size = os.path.getsize(csv_path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(csv_path, 'rb') as f:
+        digest.update(f.read(65536))
+        f.seek(max(0, size - 65536))
+        digest.update(f.read(65536))
+    return digest.hexdigest()
+
+def source_fingerprint(csv_path, follow=None):
+    """
+    file_fingerprint() for a CSV. A zip (maybe still downloading) is known by
+    its first entry's local header and name, which carry the month's date.
+    """
+    stream, member = open_source(csv_path, follow)
+    with stream:
+        if member is None:
+            return file_fingerprint(csv_path)
+        return hashlib.sha1(member.header + member.name.encode('utf-8')).hexdigest()
+
+def load_checkpoint(conn, fingerprint):
+    """(byte_offset, row_number) to resume this CSV from, or None"""
+    return conn.execute(
+        "SELECT byte_offset, row_number FROM import_checkpoints WHERE csv_fingerprint = ?",
+        (fingerprint,)
+    ).fetchone()
+
+def save_checkpoint(cursor, fingerprint, csv_path, byte_offset, row_number):
+    """Record progress; runs inside the batch's transaction so both commit together"""
+    cursor.execute("""
+        INSERT OR REPLACE INTO import_checkpoints
+            (csv_fingerprint, csv_path, byte_offset, row_number, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, (fingerprint, csv_path, byte_offset, row_number, datetime.now().isoformat()))
+
+def clear_checkpoint(conn, fingerprint):
+    """Forget a finished import"""
+    conn.execute("DELETE FROM import_checkpoints WHERE csv_fingerprint = ?", (fingerprint,))
+    conn.commit()
+
+def load_pending_rebuilds(conn):
+    """
+    Derived data an unfinished run still owes ('fts', 'company_sic',
+    'derived'): it is only rebuilt, and the data version bumped, once an
+    import has read its whole file.
+    """
+    value = get_import_metadata(conn, 'pending_rebuilds')
+    return set(value.split(',')) if value else set()
+
+def add_pending_rebuilds(conn, pending, *names):
+    """Record more owed rebuilds in import_metadata; the caller commits"""
+    if not pending.issuperset(names):
+        pending.update(names)
+        set_import_metadata(conn, 'pending_rebuilds', ','.join(sorted(pending)))
+
+def _select_in(cursor, sql, values, batch=500):
+    """Run sql (with an IN ({}) placeholder) over values in batches and collect the rows"""
+    found = []
+    for i in range(0, len(values), batch):
+        part = values[i:i + batch]
+        cursor.execute(sql.format(','.join('?' * len(part))), part)
+        found.extend(cursor.fetchall())
+    return found
+
+def record_hashes(cursor, hashed_rows):
+    """Store (row, hash) pairs in company_changes for the next --diff run"""
+    cursor.executemany("""
+        INSERT INTO company_changes (company_number, last_modified, change_hash)
+        VALUES (?, ?, ?)
+        ON CONFLICT(company_number) DO UPDATE SET
+            last_modified = excluded.last_modified,
+            change_hash = excluded.change_hash
+    """, [(row[0], int(time.time()), digest) for row, digest in hashed_rows])
+
+def apply_diff(cursor, rows, hashes):
+    """
+    Write only the rows whose hash differs from company_changes.change_hash.
+    Returns (inserted, updated, unchanged, baselined) for this batch.
+    """
+    numbers = [row[0] for row in rows]
+    stored = dict(_select_in(
+        cursor, "SELECT company_number, change_hash FROM company_changes WHERE company_number IN ({})", numbers
+    ))
+    changed = [(row, digest) for row, digest in zip(rows, hashes) if stored.get(row[0]) != digest]
+    
+    # No hash yet: new, or loaded before hashes were kept. Those already in
+    # companies are compared with the stored row, and only get a hash if equal
+    unhashed = [row[0] for row, _ in changed if row[0] not in stored]
+    current = {found[0]: row_hash(found) for found in _select_in(
+        cursor, f"SELECT {', '.join(COMPANY_COLUMNS)} FROM companies WHERE company_number IN ({{}})", unhashed
+    )}
+    new_numbers = [number for number in unhashed if number not in current]
+    writes = [(row, digest) for row, digest in changed if current.get(row[0]) != digest]
+    
+    cursor.executemany(UPSERT_SQL, [row for row, _ in writes])
+    record_hashes(cursor, changed)
+    if new_numbers:
+        # Back on the register
+        cursor.executemany("DELETE FROM company_tombstones WHERE company_number = ?",
+                           [(number,) for number in new_numbers])
+    cursor.executemany("INSERT OR IGNORE INTO import_seen_companies (company_number) VALUES (?)",
+                       [(number,) for number in numbers])
+    
+    inserted = len(new_numbers)
+    return inserted, len(writes) - inserted, len(rows) - len(changed), len(changed) - len(writes)
+
+def tombstone_missing(conn):
+    """
+    Move companies the finished --diff run never saw into company_tombstones
+    and delete them. Refuses (returns None) if that would remove more than
+    MAX_REMOVED_FRACTION of the register.
+    """
+    cursor = conn.cursor()
+    missing = "SELECT company_number FROM companies WHERE company_number NOT IN (SELECT company_number FROM import_seen_companies)"
+    cursor.execute(f"SELECT COUNT(*) FROM ({missing})")
+    removed = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM companies")
+    total = cursor.fetchone()[0]
+    
+    if removed > total * MAX_REMOVED_FRACTION:
+        return None
+    
+    if removed:
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO company_tombstones (company_number, company_name, company_status, removed_at)
+            SELECT company_number, company_name, company_status, ? FROM companies
+            WHERE company_number IN ({missing})
+        """, (datetime.now().isoformat(),))
+        cursor.execute(f"DELETE FROM company_changes WHERE company_number IN ({missing})")
+        cursor.execute(f"DELETE FROM companies WHERE company_number IN ({missing})")
+    cursor.execute("DELETE FROM import_seen_companies")
+    conn.commit()
+    return removed
+
+def show_progress(rows_done, rows_inserted, rows_skipped, start_time, resume_from=0):
+    """Print one progress line"""
+    elapsed = time.time() - start_time
+    rows_this_run = rows_done - resume_from
+    rate = rows_this_run / elapsed if elapsed > 0 else 0
+    eta = (5600000 - rows_done) / rate / 60 if rate > 0 else 0
+    
+    print(f"Progress: {rows_done:,} rows | "
+          f"Rate: {rate:.0f}/sec | "
+          f"Inserted: {rows_inserted:,} | "
+          f"Skipped: {rows_skipped:,} | "
+          f"ETA: {eta:.0f} min")
+
+@contextmanager
+def timed(phases, name):
+    """Add the time spent in the with-block to phases[name]"""
+    start = time.time()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0) + time.time() - start
+
+def defer_companies_schema(conn):
+    """
+    Drop the secondary indexes and FTS triggers on companies before a bulk load.
+    Their DDL is saved in import_metadata first, so restore_companies_schema()
+    can put them back even if this run crashes.
+    """
+    saved = json.loads(get_import_metadata(conn, 'deferred_schema', '[]'))
+    known = {name for _, name, _ in saved}
+    
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name = 'companies' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    """)
+    objects = cursor.fetchall()
+    saved += [list(obj) for obj in objects if obj[1] not in known]
+    set_import_metadata(conn, 'deferred_schema', json.dumps(saved))
+    conn.commit()
+    
+    for object_type, name, _ in objects:
+        cursor.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+    conn.commit()
+    return len(objects)
+
+def restore_companies_schema(conn):
+    """Recreate whatever defer_companies_schema() dropped"""
+    saved = json.loads(get_import_metadata(conn, 'deferred_schema', '[]'))
+    cursor = conn.cursor()
+    for object_type, name, sql in saved:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (object_type, name))
+        if not cursor.fetchone():
+            cursor.execute(sql)
+    set_import_metadata(conn, 'deferred_schema', None)
+    conn.commit()
+    return len(saved)
+
+def import_companies(csv_path, resume=False, workers=1, bulk=False, diff=False, follow=None):
+    """
+    Import companies from CSV to database.
+    csv_path can be the downloaded zip instead; pass follow (a threading.Event
+    set when the download completes) to import it while it is being written.
+    Returns row counts and seconds per phase.
+    """
+    
+    # Identify the source before touching the database: a download that
+    # failed before its zip header arrived stops the import here
+    fingerprint = source_fingerprint(csv_path, follow)
     
     print(f"📂 Opening database: {DATABASE_PATH}")
     conn = sqlite3.connect(DATABASE_PATH)
@@ -118,215 +583,310 @@ def import_companies(csv_path, resume_from=0):
     conn.execute("PRAGMA temp_store=MEMORY")
     
     cursor = conn.cursor()
+    phases = {}
+    
+    # Rebuilds owed by an earlier run that did not finish, plus any this one adds
+    pending = load_pending_rebuilds(conn)
+    
+    # Before a bulk load defers its triggers along with the FTS ones
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'company_sic'")
+    company_sic_created = cursor.fetchone() is None
+    create_company_sic_table(cursor)
+    conn.commit()
+    
+    if bulk:
+        # No fsync and a big cache; indexes and FTS are rebuilt once at the end
+        if fts_reindex_needed(sync_fts_schema(cursor)):
+            add_pending_rebuilds(conn, pending, 'fts')
+        conn.commit()
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(f"PRAGMA cache_size={BULK_CACHE_SIZE}")
+        dropped = defer_companies_schema(conn)
+        print(f"📦 Bulk mode: deferred {dropped} indexes/triggers until the load finishes")
+    elif get_import_metadata(conn, 'deferred_schema'):
+        print("⚠️  Restoring indexes/triggers left deferred by an interrupted bulk import...")
+        with timed(phases, 'indexes'):
+            restore_companies_schema(conn)
+    
+    if not bulk:
+        # The triggers keep companies_fts in step row by row; older databases
+        # still have ones that scan the whole index per update, or an index
+        # declared over companies that is recreated before any row is loaded
+        updated = sync_fts_schema(cursor)
+        if updated:
+            conn.commit()
+            print("🔧 Updated the FTS sync triggers")
+            if fts_reindex_needed(updated):
+                # companies_fts holds text the triggers no longer produce, or nothing
+                add_pending_rebuilds(conn, pending, 'fts')
+                conn.commit()
     
     # Count existing records
     cursor.execute("SELECT COUNT(*) FROM companies")
     existing_count = cursor.fetchone()[0]
     print(f"📊 Existing companies: {existing_count:,}")
+    # Just created on a loaded database: fill it from companies.sic_codes
+    if company_sic_created and existing_count > 0:
+        add_pending_rebuilds(conn, pending, 'company_sic')
+        conn.commit()
+    
+    if diff:
+        for ddl in DIFF_DDL:
+            cursor.execute(ddl)
+        if not resume:
+            cursor.execute("DELETE FROM import_seen_companies")
+        conn.commit()
+        print("🔍 Diff mode: only changed companies will be written")
     
-    # Clear if starting fresh
-    if existing_count > 0 and resume_from == 0:
+    # Clear if starting fresh (a diff run updates what is there instead)
+    if existing_count > 0 and not resume and not diff:
         response = input("Clear existing data? (y/n): ")
         if response.lower() == 'y':
+            # Empty the index and company_sic in one step instead of per row
+            cursor.execute("DROP TRIGGER IF EXISTS companies_ad")
+            cursor.execute("DROP TRIGGER IF EXISTS company_sic_ad")
             cursor.execute("DELETE FROM companies")
+            cursor.execute("INSERT INTO companies_fts(companies_fts) VALUES('delete-all')")
+            cursor.execute("DELETE FROM company_sic")
+            cursor.execute("DELETE FROM company_changes")
+            if not bulk:
+                sync_fts_schema(cursor)
+                create_company_sic_table(cursor)
+            pending.discard('fts')
+            pending.discard('company_sic')
+            add_pending_rebuilds(conn, pending, 'derived')
             conn.commit()
             print("Cleared existing data.")
     
-    # Prepare insert statement
-    insert_sql = """
-    INSERT OR REPLACE INTO companies (
-        company_number, company_name, company_status, company_status_detail,
-        date_of_creation, date_of_cessation, company_type, jurisdiction,
-        registered_office_address_line_1, registered_office_address_line_2,
-        registered_office_locality, registered_office_region,
-        registered_office_country, registered_office_postal_code,
-        registered_office_po_box, registered_office_care_of,
-        sic_codes, previous_names,
-        accounting_reference_date_day, accounting_reference_date_month,
-        last_accounts_made_up_to, accounts_category,
-        confirmation_statement_last_made_up_to,
-        has_charges, has_been_liquidated, has_insolvency_history
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
+    # Pick up where an interrupted run of this same file stopped
+    conn.execute(CHECKPOINT_DDL)
+    checkpoint = load_checkpoint(conn, fingerprint) if resume else None
+    start_offset, resume_from = checkpoint or (None, 0)
+    if resume and not checkpoint:
+        print("⚠️  No checkpoint for this file - starting from the beginning")
     
     # Statistics
     start_time = time.time()
     rows_processed = 0
     rows_inserted = 0
+    completed = False
     rows_skipped = 0
     errors = defaultdict(int)
     status_counts = defaultdict(int)
+    diff_counts = defaultdict(int)
+    known_sic_codes = load_sic_codes(cursor)
     
     print(f"\n🚀 Starting import from row {resume_from:,}...")
     print("Press Ctrl+C to pause and resume later\n")
     
-    batch_data = []
-    
     try:
-        with open(csv_path, 'r', encoding='utf-8-sig') as csvfile:
-            reader = csv.DictReader(csvfile)
+        if workers > 1:
+            print(f"⚙️  Parsing with {workers} worker processes\n")
+        
+        for end_offset, (rows, hashes, processed, skipped, chunk_errors, chunk_statuses, chunk_sic_codes) in parse_records(
+                csv_path, workers, start_offset, with_hashes=True, follow=follow):
+            # Dictionary first: the FTS triggers look descriptions up in it
+            if store_sic_codes(cursor, chunk_sic_codes, known_sic_codes):
+                add_pending_rebuilds(conn, pending, 'fts')
+            # Rows and checkpoint commit together: a crash redoes at most this batch
+            if diff:
+                inserted, updated, unchanged, baselined = apply_diff(cursor, rows, hashes)
+                diff_counts['inserted'] += inserted
+                diff_counts['updated'] += updated
+                diff_counts['unchanged'] += unchanged
+                diff_counts['baselined'] += baselined
+                written = inserted + updated
+            else:
+                # Hashes too, so a later --diff run compares against what this wrote
+                cursor.executemany(UPSERT_SQL, rows)
+                record_hashes(cursor, zip(rows, hashes))
+                written = len(rows)
+            if written:
+                # Loaded without triggers in bulk mode: index and company_sic need a full pass
+                add_pending_rebuilds(conn, pending, 'derived', *(('fts', 'company_sic') if bulk else ()))
+            save_checkpoint(cursor, fingerprint, csv_path, end_offset, resume_from + rows_processed + processed)
+            conn.commit()
             
-            # Skip to resume point
-            for _ in range(resume_from):
-                next(reader)
+            rows_inserted += written
+            rows_processed += processed
+            rows_skipped += skipped
+            for error_type, count in chunk_errors.items():
+                errors[error_type] += count
+            for status, count in chunk_statuses.items():
+                status_counts[status] += count
             
-            for row in reader:
-                rows_processed += 1
-                
-                try:
-                    # Get company number using our mapping
-                    company_number = clean_value(row.get(COLUMN_MAPPING['company_number'], ''))
-                    
-                    if not company_number:
-                        rows_skipped += 1
-                        errors['missing_company_number'] += 1
-                        continue
-                    
-                    # Get and normalize status
-                    raw_status = clean_value(row.get(COLUMN_MAPPING['company_status'], ''))
-                    company_status = normalize_status(raw_status)
-                    if raw_status:
-                        status_counts[raw_status] += 1
-                    
-                    # Convert account dates
-                    acc_ref_day = clean_value(row.get(COLUMN_MAPPING['acc_ref_day'], ''))
-                    acc_ref_month = clean_value(row.get(COLUMN_MAPPING['acc_ref_month'], ''))
-                    
-                    try:
-                        acc_ref_day = int(acc_ref_day) if acc_ref_day else None
-                        acc_ref_month = int(acc_ref_month) if acc_ref_month else None
-                    except:
-                        acc_ref_day = None
-                        acc_ref_month = None
-                    
-                    company_data = (
-                        company_number,
-                        clean_value(row.get(COLUMN_MAPPING['company_name'], '')),
-                        company_status,  # Now normalized
-                        None,  # company_status_detail
-                        parse_date(row.get(COLUMN_MAPPING['incorporation_date'], '')),
-                        parse_date(row.get(COLUMN_MAPPING['dissolution_date'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['company_category'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['country_of_origin'], '')),
-                        # Address
-                        clean_value(row.get(COLUMN_MAPPING['address_line_1'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['address_line_2'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['post_town'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['county'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['country'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['postcode'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['po_box'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['care_of'], '')),
-                        # SIC and names
-                        parse_sic_codes(row),
-                        parse_previous_names(row),
-                        # Accounts
-                        acc_ref_day,
-                        acc_ref_month,
-                        parse_date(row.get(COLUMN_MAPPING['acc_last_made_up'], '')),
-                        clean_value(row.get(COLUMN_MAPPING['acc_category'], '')),
-                        # Confirmation
-                        parse_date(row.get(COLUMN_MAPPING['conf_stmt_last_made_up'], '')),
-                        # Flags
-                        1 if row.get(COLUMN_MAPPING['mort_charges'], '0') not in ['0', ''] else 0,
-                        0,  # has_been_liquidated
-                        0   # has_insolvency_history
-                    )
-                    
-                    batch_data.append(company_data)
-                    
-                    # Insert batch when full
-                    if len(batch_data) >= BATCH_SIZE:
-                        cursor.executemany(insert_sql, batch_data)
-                        conn.commit()
-                        rows_inserted += len(batch_data)
-                        batch_data = []
-                    
-                except Exception as e:
-                    errors[str(type(e).__name__)] += 1
-                    rows_skipped += 1
-                    if rows_processed < 5:
-                        print(f"Error on row {rows_processed}: {e}")
-                        print(f"Company number: {row.get(COLUMN_MAPPING['company_number'], 'NOT FOUND')}")
-                
-                # Show progress
-                if rows_processed % PROGRESS_INTERVAL == 0:
-                    elapsed = time.time() - start_time
-                    rate = rows_processed / elapsed if elapsed > 0 else 0
-                    eta = (5600000 - resume_from - rows_processed) / rate / 60 if rate > 0 else 0
-                    
-                    print(f"Progress: {resume_from + rows_processed:,} rows | "
-                          f"Rate: {rate:.0f}/sec | "
-                          f"Inserted: {rows_inserted:,} | "
-                          f"Skipped: {rows_skipped:,} | "
-                          f"ETA: {eta:.0f} min")
+            show_progress(resume_from + rows_processed, rows_inserted, rows_skipped, start_time, resume_from)
+        
+        # Parse and write only: tombstones and the bulk index rebuild are timed apart
+        phases['load'] = time.time() - start_time
+        
+        if diff:
+            # Only a complete pass over the file says who has gone
+            with timed(phases, 'tombstones'):
+                removed = tombstone_missing(conn)
+            if removed is None:
+                print(f"\n⚠️  Over {MAX_REMOVED_FRACTION:.0%} of companies missing from this file - "
+                      "not removing any (truncated download?)")
+            else:
+                diff_counts['removed'] = removed
+                rows_inserted += removed
+                if removed:
+                    add_pending_rebuilds(conn, pending, 'derived')
+                    conn.commit()
+        
+        clear_checkpoint(conn, fingerprint)
+        completed = True
     
     except KeyboardInterrupt:
         print(f"\n\n⏸️  Import paused at row {resume_from + rows_processed:,}")
-        print(f"To resume, run: python scripts/import_companies_final.py --resume {resume_from + rows_processed}")
+        print(f"To resume, run: python scripts/import_companies_final.py --resume")
     
     except Exception as e:
         print(f"\n❌ Error: {e}")
-        print(f"Failed at row {resume_from + rows_processed:,}")
+        print(f"Failed after row {resume_from + rows_processed:,} (progress up to there is checkpointed)")
         import traceback
         traceback.print_exc()
     
     finally:
-        # Insert remaining batch
-        if batch_data:
-            try:
-                cursor.executemany(insert_sql, batch_data)
+        # Stopped part way: load ran until now
+        phases.setdefault('load', time.time() - start_time)
+        # Put back what bulk mode dropped (always, even after Ctrl+C)
+        if bulk:
+            print("\n🔄 Rebuilding indexes and triggers...")
+            with timed(phases, 'indexes'):
+                restore_companies_schema(conn)
+                sync_fts_schema(cursor)
+                conn.commit()
+    
+    # Final statistics
+    elapsed = time.time() - start_time
+    print(f"\n📊 Import Statistics:")
+    print(f"Duration: {elapsed/60:.1f} minutes")
+    print(f"Rows processed: {rows_processed:,}")
+    print(f"Rows inserted: {rows_inserted:,}")
+    print(f"Rows skipped: {rows_skipped:,}")
+    if elapsed > 0:
+        print(f"Average rate: {rows_processed/elapsed:.0f} rows/second")
+    
+    if diff:
+        print(f"\n🔍 Changes:")
+        for change in ('inserted', 'updated', 'unchanged', 'baselined', 'removed'):
+            print(f"  {change}: {diff_counts[change]:,}")
+    
+    if errors:
+        print(f"\n⚠️  Errors encountered:")
+        for error_type, count in errors.items():
+            print(f"  {error_type}: {count:,}")
+    
+    if status_counts:
+        print(f"\n📊 Status values found:")
+        for status, count in list(status_counts.items())[:10]:
+            print(f"  {status}: {count:,}")
+    
+    # Publish only a complete load: derived tables and the data version are
+    # left alone after Ctrl+C or an error, and the next run catches up
+    if completed:
+        # Loaded without triggers, or indexed with SIC descriptions (or an
+        # FTS view) that have since changed: index everything in one pass
+        if 'fts' in pending:
+            print("\n🔄 Rebuilding search index...")
+            with timed(phases, 'fts'):
+                cursor.execute("INSERT INTO companies_fts(companies_fts) VALUES('rebuild')")
                 conn.commit()
-                rows_inserted += len(batch_data)
-            except Exception as e:
-                print(f"Error inserting final batch: {e}")
-        
-        # Final statistics
-        elapsed = time.time() - start_time
-        print(f"\n📊 Import Statistics:")
-        print(f"Duration: {elapsed/60:.1f} minutes")
-        print(f"Rows processed: {rows_processed:,}")
-        print(f"Rows inserted: {rows_inserted:,}")
-        print(f"Rows skipped: {rows_skipped:,}")
-        if elapsed > 0:
-            print(f"Average rate: {rows_processed/elapsed:.0f} rows/second")
-        
-        if errors:
-            print(f"\n⚠️  Errors encountered:")
-            for error_type, count in errors.items():
-                print(f"  {error_type}: {count:,}")
-        
-        if status_counts:
-            print(f"\n📊 Status values found:")
-            for status, count in list(status_counts.items())[:10]:
-                print(f"  {status}: {count:,}")
         
-        # Update search index only if we inserted data
-        if rows_inserted > 0:
-            print("\n🔄 Updating search index...")
-            cursor.execute("INSERT INTO companies_fts(companies_fts) VALUES('rebuild')")
-            conn.commit()
+        # Loaded without triggers (or the table is new): fill it in one pass
+        if 'company_sic' in pending:
+            print("🔄 Rebuilding company SIC codes...")
+            with timed(phases, 'company_sic'):
+                result = rebuild_company_sic(conn)
+            print(f"   {result['rows']:,} rows in {result['seconds']}s")
         
-        # Final count
-        cursor.execute("SELECT COUNT(*) FROM companies")
-        final_count = cursor.fetchone()[0]
-        print(f"\n✅ Total companies in database: {final_count:,}")
+        # Update derived tables only if we (or an unfinished run) wrote or removed data
+        if 'derived' in pending:
+            print("🔄 Updating autocomplete index...")
+            with timed(phases, 'autocomplete'):
+                result = refresh_autocomplete(conn)
+            print(f"   {result['mode']} refresh in {result['seconds']}s")
+            
+            print("🔄 Updating statistics...")
+            with timed(phases, 'stats'):
+                result = rebuild_stats(conn)
+            print(f"   {result['rows']:,} rows in {result['seconds']}s")
+            
+            print("🔄 Serializing changed companies for the API...")
+            with timed(phases, 'json'):
+                result = refresh_company_json(conn)
+            print(f"   {result['built']:,} built, {result['removed']:,} removed in {result['seconds']}s")
+            
+            print("🔄 Updating search facets...")
+            with timed(phases, 'facets'):
+                result = rebuild_facets(conn)
+            print(f"   {result['rows']:,} companies in {result['seconds']}s")
+            
+            print("🔄 Updating filter bitmaps...")
+            with timed(phases, 'bitmaps'):
+                result = rebuild_bitmaps(conn, snapshot_path(DATABASE_PATH))
+            print(f"   {result['values']:,} values over {result['rows']:,} companies, "
+                  f"{result['bytes'] / 1024 / 1024:.1f}MB in {result['seconds']}s")
+            
+            if bulk:
+                print("🔄 Updating query planner statistics...")
+                with timed(phases, 'analyze'):
+                    cursor.execute("ANALYZE")
+                    conn.commit()
         
-        conn.close()
+        if pending:
+            # Tell the API its cached search counts are stale
+            set_import_metadata(conn, 'pending_rebuilds', None)
+            bump_data_version(conn)
+    elif pending:
+        print(f"\n⏭️  Derived tables not updated: {', '.join(sorted(pending))} left for the next run")
+    
+    print(f"\n⏱️  Time per phase:")
+    for phase, seconds in phases.items():
+        print(f"  {phase}: {seconds/60:.1f} min ({seconds:.0f}s)")
+    
+    # Final count
+    cursor.execute("SELECT COUNT(*) FROM companies")
+    final_count = cursor.fetchone()[0]
+    print(f"\n✅ Total companies in database: {final_count:,}")
+    
+    conn.close()
+    
+    return {
+        'completed': completed,
+        'rows_processed': rows_processed,
+        'rows_inserted': rows_inserted,
+        'rows_skipped': rows_skipped,
+        'errors': dict(errors),
+        'changes': dict(diff_counts),
+        'phases': phases,
+        'total_companies': final_count
+    }
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Import Companies House data')
-    parser.add_argument('--resume', type=int, default=0, help='Resume from row number')
+    parser.add_argument('--resume', action='store_true', help='Resume from the last checkpoint of this CSV')
+    parser.add_argument('--workers', type=int, default=1, help='Parse the CSV in N processes (1 = serial)')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Drop indexes/triggers and load with synchronous=OFF, rebuilding everything once at the end')
+    parser.add_argument('--diff', action='store_true',
+                        help='Monthly refresh: write only companies whose data changed and tombstone the ones that disappeared')
+    parser.add_argument('--zip', action='store_true',
+                        help='Stream the CSV out of the newest downloaded zip even if an extracted CSV exists')
     
     args = parser.parse_args()
     
-    # Find CSV file
+    # Find CSV file, or read it straight out of the downloaded zip
     data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'bulk_data')
     csv_files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
+    zip_files = sorted(f for f in os.listdir(data_dir) if f.endswith('.zip'))
+    if args.zip or not csv_files:
+        csv_files = zip_files[-1:]
     if csv_files:
         csv_path = os.path.join(data_dir, csv_files[0])
-        import_companies(csv_path, args.resume)
+        import_companies(csv_path, args.resume, args.workers, args.bulk, args.diff)
     else:
-        print("❌ No CSV file found!")
+        print("❌ No CSV or zip file found!")
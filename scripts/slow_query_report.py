@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Summarize the API's slow-query log: the statements that cost the most time, full scans first"""
+
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.slow_queries import read_entries
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database')
+
+def summarize(entries):
+    """One row per distinct statement, worst total time first"""
+    by_query = {}
+    for entry in entries:
+        summary = by_query.get(entry['query'])
+        if summary is None:
+            summary = by_query[entry['query']] = {
+                'query': entry['query'],
+                'sql': entry['sql'],
+                'plan': entry['plan'],
+                'full_scan': entry['full_scan'],
+                'scans': entry['scans'],
+                'times': [],
+                'first_seen': entry['at'],
+                'slowest_parameters': entry['parameters'],
+            }
+        if entry['ms'] > max(summary['times'], default=0):
+            summary['slowest_parameters'] = entry['parameters']
+        summary['times'].append(entry['ms'])
+        summary['last_seen'] = entry['at']
+
+    report = []
+    for summary in by_query.values():
+        times = sorted(summary.pop('times'))
+        summary.update({
+            'count': len(times),
+            'total_ms': round(sum(times), 1),
+            'median_ms': times[len(times) // 2],
+            'max_ms': times[-1],
+        })
+        report.append(summary)
+    report.sort(key=lambda row: (not row['full_scan'], -row['total_ms']))
+    return report
+
+def print_report(report, top):
+    scans = sum(1 for row in report if row['full_scan'])
+    print(f"🐢 {len(report)} distinct slow statements, {scans} scanning companies\n")
+    for i, row in enumerate(report[:top], 1):
+        flag = f"⚠️  SCAN {', '.join(row['scans'])}" if row['full_scan'] else ''
+        print(f"{i}. {row['query']}  {flag}")
+        print(f"   {row['count']:,}× total {row['total_ms']:,.0f}ms, median {row['median_ms']:,.0f}ms, "
+              f"max {row['max_ms']:,.0f}ms (last {row['last_seen']})")
+        print(f"   SQL: {row['sql'][:300]}")
+        print(f"   Slowest parameters: {json.dumps(row['slowest_parameters'], ensure_ascii=False)[:200]}")
+        for line in row['plan'] or ['(no plan)']:
+            print(f"      {line}")
+        print()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Summarize the slow-query log')
+    parser.add_argument('log', nargs='?', default=os.path.join(DATABASE_DIR, 'slow_queries.log'),
+                        help='Slow-query log (rotated .1, .2, ... files are read too)')
+    parser.add_argument('--top', type=int, default=20, help='Statements to show')
+    parser.add_argument('--scans-only', action='store_true', help='Only statements that scan companies')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"❌ No slow-query log at {args.log} (set SLOW_QUERY_MS for the API to write one)")
+        sys.exit(1)
+
+    report = summarize(read_entries(args.log))
+    if args.scans_only:
+        report = [row for row in report if row['full_scan']]
+
+    if args.json:
+        print(json.dumps(report[:args.top], indent=2, ensure_ascii=False))
+    else:
+        print_report(report, args.top)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Check that companies_fts agrees with companies without rebuilding it:
+sync triggers up to date, every company indexed exactly once, and a
+random sample of companies findable by their current values.
+"""
+
+import os
+import re
+import sys
+import random
+import sqlite3
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.fts import FTS_COLUMNS, legacy_fts_table, stale_fts_schema, sync_fts_schema
+
+DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'companies.db')
+
+# Columns the sample check searches (company_number is UNINDEXED)
+SAMPLED_COLUMNS = [name for name, _ in FTS_COLUMNS if name != 'company_number']
+
+# Rowids listed per problem
+MAX_LISTED = 10
+
+def missing_rowids(cursor):
+    """Companies with no document in the index"""
+    cursor.execute("""
+        SELECT rowid FROM companies
+        WHERE NOT EXISTS (SELECT 1 FROM companies_fts_docsize WHERE id = companies.rowid)
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+def orphan_rowids(cursor):
+    """Index documents whose company row is gone (or moved to another rowid)"""
+    cursor.execute("""
+        SELECT id FROM companies_fts_docsize
+        WHERE NOT EXISTS (SELECT 1 FROM companies WHERE rowid = companies_fts_docsize.id)
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+def phrase(value):
+    """FTS5 phrase for a column value: its tokens, quoted, in order"""
+    tokens = re.findall(r'[^\W_]+', value or '')
+    return '"' + ' '.join(tokens) + '"' if tokens else None
+
+def sample_mismatches(cursor, sample_size, seed=None):
+    """
+    Rowids from a random sample whose indexed text does not match the
+    company's current values (the symptom of a 'delete' with wrong values
+    or a missed update). Each check is one indexed MATCH on one document.
+    """
+    cursor.execute("SELECT MIN(rowid), MAX(rowid) FROM companies")
+    low, high = cursor.fetchone()
+    if low is None:
+        return 0, []
+    rng = random.Random(seed)
+    columns = ', '.join(SAMPLED_COLUMNS)
+    checked, mismatched = 0, []
+    for _ in range(sample_size):
+        cursor.execute(f"""
+            SELECT company_rowid, {columns} FROM companies_fts_source
+            WHERE company_rowid >= ? ORDER BY company_rowid LIMIT 1
+        """, (rng.randint(low, high),))
+        row = cursor.fetchone()
+        if row is None:
+            continue
+        rowid, values = row[0], row[1:]
+        checked += 1
+        for column, value in zip(SAMPLED_COLUMNS, values):
+            query = phrase(value)
+            if query is None:
+                continue
+            cursor.execute("SELECT 1 FROM companies_fts WHERE companies_fts MATCH ? AND rowid = ?",
+                           (f'{column} : {query}', rowid))
+            if cursor.fetchone() is None:
+                mismatched.append((rowid, column))
+                break
+    return checked, mismatched
+
+def verify(conn, sample_size=1000, full=False, repair=False, rebuild=False, seed=None):
+    """Print what is wrong with the index; returns True if nothing is"""
+    cursor = conn.cursor()
+    ok = True
+
+    if legacy_fts_table(cursor):
+        print("❌ companies_fts is not declared over companies_fts_source"
+              " ('rebuild' and the sync triggers fail on it)")
+        if not repair:
+            print("   Run with --repair or scripts/fix_fts.py to recreate it")
+            return False
+        # Recreated empty below, then filled from the view
+        rebuild = True
+
+    stale = stale_fts_schema(cursor)
+    if stale:
+        print(f"⚠️  Out of date: {', '.join(f'{t} {n}' for t, n in stale)}")
+        if repair:
+            sync_fts_schema(cursor)
+            conn.commit()
+            print("🔧 Recreated the content view and sync triggers")
+        else:
+            ok = False
+    else:
+        print("✅ Content view and sync triggers are current")
+
+    if rebuild:
+        print("🔄 Rebuilding companies_fts...")
+        cursor.execute("INSERT INTO companies_fts(companies_fts) VALUES('rebuild')")
+        conn.commit()
+
+    missing = missing_rowids(cursor)
+    orphans = orphan_rowids(cursor)
+    if missing:
+        print(f"❌ {len(missing):,} companies not indexed (rowids {missing[:MAX_LISTED]})")
+        if repair:
+            columns = ', '.join(name for name, _ in FTS_COLUMNS)
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                cursor.execute(f"""
+                    INSERT INTO companies_fts(rowid, {columns})
+                    SELECT company_rowid, {columns} FROM companies_fts_source
+                    WHERE company_rowid IN ({', '.join('?' * len(chunk))})
+                """, chunk)
+            conn.commit()
+            print(f"🔧 Indexed {len(missing):,} companies")
+        else:
+            ok = False
+    if orphans:
+        # Removing these needs the text they were indexed with, which is gone
+        print(f"❌ {len(orphans):,} index entries without a company (rowids {orphans[:MAX_LISTED]})"
+              " - run with --rebuild")
+        ok = False
+    if not missing and not orphans:
+        print("✅ Every company is indexed exactly once")
+
+    checked, mismatched = sample_mismatches(cursor, sample_size, seed)
+    if mismatched:
+        listed = ', '.join(f'{rowid} ({column})' for rowid, column in mismatched[:MAX_LISTED])
+        print(f"❌ {len(mismatched)} of {checked:,} sampled companies don't match their index entry: {listed}"
+              " - run with --rebuild")
+        ok = False
+    else:
+        print(f"✅ {checked:,} sampled companies match their index entries")
+
+    if full:
+        print("🔍 Running FTS5 integrity-check against the content...")
+        try:
+            cursor.execute("INSERT INTO companies_fts(companies_fts, rank) VALUES('integrity-check', 1)")
+            print("✅ integrity-check passed")
+        except sqlite3.DatabaseError as e:
+            print(f"❌ integrity-check failed: {e} - run with --rebuild")
+            ok = False
+
+    return ok
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check companies_fts against companies')
+    parser.add_argument('--db', default=DATABASE_PATH, help='Database to check')
+    parser.add_argument('--sample', type=int, default=1000, help='Companies to look up in the index')
+    parser.add_argument('--seed', type=int, help='Seed for the sample')
+    parser.add_argument('--full', action='store_true',
+                        help="Also run FTS5's integrity-check (reads every document)")
+    parser.add_argument('--repair', action='store_true',
+                        help='Update stale triggers, recreate a legacy index and index missing companies')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the whole index first')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ No database at {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        healthy = verify(conn, args.sample, args.full, args.repair, args.rebuild, args.seed)
+    finally:
+        conn.close()
+    sys.exit(0 if healthy else 1)
@@ -0,0 +1,45 @@
+"""Shared fixtures: a small database built with scripts/create_schema.py and the Flask API on it"""
+
+import os
+import sys
+import sqlite3
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+COMPANIES = [
+    # company_number, company_name, company_status, has_charges, sic_codes
+    (f'{n:08d}', f'{name} {n} LTD', status, n % 2, '["10710"]')
+    for n, (name, status) in enumerate(
+        [('TESCO STORES', 'active'), ('LEEDS BAKERY', 'active'), ('ACME SERVICES', 'liquidation')] * 10,
+        start=1
+    )
+]
+
+def build_database(path, companies=COMPANIES):
+    """Create the schema at path and load companies through the sync triggers"""
+    import create_schema
+    create_schema.DATABASE_PATH = path
+    create_schema.create_schema()
+    conn = sqlite3.connect(path)
+    conn.executemany("""
+        INSERT INTO companies (company_number, company_name, company_status, has_charges, sic_codes)
+        VALUES (?, ?, ?, ?, ?)
+    """, companies)
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture(scope='session')
+def db_path(tmp_path_factory):
+    return build_database(str(tmp_path_factory.mktemp('db') / 'companies.db'))
+
+@pytest.fixture(scope='session')
+def client(db_path):
+    os.environ['DATABASE_PATH'] = db_path
+    os.environ['RESPONSE_CACHE_ENTRIES'] = '0'
+    import app_main
+    return app_main.app.test_client()
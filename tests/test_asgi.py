@@ -0,0 +1,74 @@
+"""asgi_main serves what app_main serves: same status, bytes and validators"""
+
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip('httpx', reason="fastapi's TestClient needs httpx")
+
+URLS = [
+    '/api/search?q=tesco',
+    '/api/search?q=ltd&limit=5&offset=3',
+    '/api/search?q=ltd&count=exact&facets=1',
+    '/api/search?q=ltd&filter=status:active AND NOT charges:true',
+    '/api/search?q=bakery&sic_prefix=C',
+    '/api/company/00000001',
+    '/api/stats',
+    '/api/sic?prefix=C',
+]
+
+# Built by jsonify in the Flask app, which ends the body with a newline
+JSONIFY_URLS = [
+    '/',
+    '/api/company/NOPE',
+    '/api/search?q=ltd&limit=x',
+    '/api/search?q=ltd&filter=foo:bar',
+    '/api/search/autocomplete?q=te',
+    '/api/search/autocomplete?q=t',
+]
+
+@pytest.fixture(scope='module')
+def asgi_client(client):
+    from fastapi.testclient import TestClient
+    import asgi_main
+    return TestClient(asgi_main.app)
+
+@pytest.mark.parametrize('url', URLS)
+def test_same_bytes_and_validators(client, asgi_client, url):
+    flask, asgi = client.get(url), asgi_client.get(url)
+    assert asgi.status_code == flask.status_code == 200
+    assert asgi.content == flask.data
+    for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Content-Type'):
+        assert asgi.headers.get(header) == flask.headers.get(header)
+
+    current = asgi_client.get(url, headers={'If-None-Match': flask.headers['ETag']})
+    assert current.status_code == 304
+
+@pytest.mark.parametrize('url', JSONIFY_URLS)
+def test_same_payloads(client, asgi_client, url):
+    flask, asgi = client.get(url), asgi_client.get(url)
+    assert asgi.status_code == flask.status_code
+    assert asgi.content == flask.data.rstrip(b'\n')
+
+def test_identical_requests_share_one_query():
+    import asgi_main
+    calls = []
+    release = threading.Event()
+
+    def query():
+        calls.append(1)
+        release.wait(5)
+        return b'{}'
+
+    async def requests():
+        waiting = [asyncio.ensure_future(asgi_main.coalesce('test', query)) for _ in range(10)]
+        await asyncio.sleep(0.1)
+        release.set()
+        return await asyncio.gather(*waiting)
+
+    coalesced = asgi_main.coalesced
+    assert asyncio.run(requests()) == [b'{}'] * 10
+    assert len(calls) == 1
+    assert asgi_main.coalesced - coalesced == 9
+    assert 'test' not in asgi_main.in_flight
@@ -0,0 +1,40 @@
+"""backend.autocomplete.suggest on built and unbuilt prefix tables"""
+
+import sqlite3
+
+from backend.autocomplete import HEAVY_PREFIX_ROWS, rebuild_autocomplete, refresh_autocomplete, suggest
+
+from conftest import build_database
+
+def names(rows):
+    return [row[1] for row in rows]
+
+def test_suggest_from_prefix_tables(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db')))
+    refresh_autocomplete(conn)
+    assert names(suggest(conn, 'leeds bak', limit=3)) == ['LEEDS BAKERY 11 LTD', 'LEEDS BAKERY 14 LTD', 'LEEDS BAKERY 17 LTD']
+
+def test_suggest_falls_back_to_fts_without_tables(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db')))
+    conn.execute("DROP TABLE autocomplete_top")
+    conn.execute("DROP TABLE autocomplete_names")
+    # Active companies first, names starting with the query only
+    assert names(suggest(conn, 'leeds bak', limit=3)) == ['LEEDS BAKERY 11 LTD', 'LEEDS BAKERY 14 LTD', 'LEEDS BAKERY 17 LTD']
+    assert suggest(conn, 'bakery') == []
+    assert names(suggest(conn, 'acme', limit=1)) == ['ACME SERVICES 12 LTD']
+
+def test_incremental_refresh_drops_prefixes_that_became_light(tmp_path):
+    companies = [(f'{n:08d}', f'ABBEY {n} LTD', 'active', 0, '[]') for n in range(HEAVY_PREFIX_ROWS + 10)]
+    companies += [(f'T{n:07d}', f'TESCO STORES {n} LTD', 'active', 0, '[]') for n in range(1800)]
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db'), companies))
+    refresh_autocomplete(conn)
+    assert conn.execute("SELECT COUNT(*) FROM autocomplete_top WHERE prefix = 'ABBEY'").fetchone()[0] > 0
+
+    conn.execute("DELETE FROM companies WHERE company_number < ?", ('00000020',))
+    assert refresh_autocomplete(conn)['mode'] == 'incremental'
+    top = "SELECT * FROM autocomplete_top ORDER BY prefix, position"
+    refreshed = conn.execute(top).fetchall()
+    assert not [row for row in refreshed if row[0].startswith('AB')]
+
+    rebuild_autocomplete(conn)
+    assert conn.execute(top).fetchall() == refreshed
@@ -0,0 +1,79 @@
+"""Bitmap filters: masks from the importer's snapshot, the companies row until it exists"""
+
+import os
+import sqlite3
+
+import pytest
+
+from backend.bitmaps import (
+    BITMAP_CONDITION, BitmapIndex, parse_filter, rebuild_bitmaps, snapshot_path, sql_condition
+)
+from conftest import build_database
+
+COMPANIES = [
+    # company_number, company_name, company_status, has_charges, sic_codes
+    (f'{n:08d}', f'COMPANY {n} LTD', status, charges, '[]')
+    for n, (status, charges) in enumerate(
+        [('active', 1), ('active', 0), ('liquidation', 1), ('dissolved', None), (None, 0)] * 4,
+        start=1
+    )
+]
+
+FILTERS = [
+    'status:active',
+    'status:ACTIVE charges:true',
+    'NOT charges:yes',
+    'NOT status:active',
+    'status:liquidation OR (status:dissolved AND NOT charges:false)',
+    'region:nowhere',
+]
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db'), COMPANIES))
+    conn.execute("UPDATE companies SET registered_office_region = '  Greater London ' WHERE rowid % 3 = 0")
+    conn.commit()
+    yield conn
+    conn.close()
+
+def matches(conn, condition, params):
+    return [number for number, in conn.execute(f"""
+        SELECT c.company_number FROM companies_fts JOIN companies c ON c.rowid = companies_fts.rowid
+        WHERE companies_fts MATCH ?{condition} ORDER BY c.company_number
+    """, ('ltd', *params))]
+
+@pytest.mark.parametrize('text', FILTERS + ['region:"greater london" NOT status:active'])
+def test_sql_condition_agrees_with_the_bitmaps(conn, tmp_path, text):
+    expression = parse_filter(text)
+    index = BitmapIndex(str(tmp_path / 'companies.bitmaps'))
+    assert index.mask(conn, expression) is None
+
+    rebuild_bitmaps(conn, index.path)
+    mask = index.mask(conn, expression)
+    assert mask is not None
+    assert matches(conn, *sql_condition(expression)) == matches(conn, BITMAP_CONDITION, (mask,))
+
+def test_index_never_builds_or_writes_a_snapshot(conn, tmp_path):
+    path = str(tmp_path / 'companies.bitmaps')
+    index = BitmapIndex(path)
+    conn.execute("INSERT INTO import_metadata (key, value) VALUES ('bitmaps_built_at', 'x')")
+    assert index.mask(conn, parse_filter('status:active')) is None
+    assert not os.path.exists(path)
+
+def test_snapshot_from_another_build_is_not_used(conn, tmp_path):
+    index = BitmapIndex(str(tmp_path / 'companies.bitmaps'))
+    rebuild_bitmaps(conn, index.path)
+    assert index.mask(conn, parse_filter('status:active')) is not None
+    conn.execute("UPDATE import_metadata SET value = 'later' WHERE key = 'bitmaps_built_at'")
+    assert index.mask(conn, parse_filter('status:active')) is None
+
+@pytest.mark.parametrize('text, expected', [
+    ('status:liquidation', 10),
+    ('NOT status:liquidation', 20),
+    ('status:active charges:true', 10),
+])
+def test_search_filters_without_a_snapshot(client, db_path, text, expected):
+    response = client.get('/api/search', query_string={'q': 'ltd', 'filter': text, 'limit': 100})
+    assert response.status_code == 200
+    assert response.get_json()['count'] == expected
+    assert not os.path.exists(snapshot_path(db_path))
@@ -0,0 +1,59 @@
+"""company_json: built once, refreshed for changed and removed companies, served as is"""
+
+import json
+import sqlite3
+
+import pytest
+
+from backend.company_json import (
+    company_blob, dumps, load_company_blob, load_search_blobs, refresh_company_json, results_body
+)
+from conftest import build_database
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db')))
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+def test_refresh_builds_changed_rows_and_drops_removed_ones(conn):
+    assert load_company_blob(conn, '00000001') is None
+    assert refresh_company_json(conn)['built'] == 30
+    assert refresh_company_json(conn)['built'] == 0
+
+    # Every importer write moves last_updated on
+    conn.execute("""
+        UPDATE companies SET company_name = 'TESCO PLC', last_updated = '2099-01-01 00:00:00'
+        WHERE company_number = '00000001'
+    """)
+    conn.execute("DELETE FROM companies WHERE company_number = '00000002'")
+    result = refresh_company_json(conn)
+    assert (result['built'], result['removed']) == (1, 1)
+    assert json.loads(load_company_blob(conn, '00000001'))['company_name'] == 'TESCO PLC'
+    assert load_company_blob(conn, '00000002') is None
+    assert set(load_search_blobs(conn, ['00000001', '00000002', '00000003'])) == {'00000001', '00000003'}
+
+def test_blobs_are_what_the_api_serializes(client, db_path, conn):
+    refresh_company_json(conn)
+    row = conn.execute("SELECT * FROM companies WHERE company_number = '00000003'").fetchone()
+    assert load_company_blob(conn, '00000003') == company_blob(row)
+    assert json.loads(company_blob(row))['sic_codes'] == ['10710']
+
+    # The session database has no company_json: the API serializes the row itself
+    session = sqlite3.connect(db_path)
+    session.row_factory = sqlite3.Row
+    row = session.execute("SELECT * FROM companies WHERE company_number = '00000003'").fetchone()
+    session.close()
+    assert client.get('/api/company/00000003').data == company_blob(row)
+
+def test_results_are_spliced_into_the_envelope():
+    blobs = [dumps({'company_number': '1'}), dumps({'company_number': '2'})]
+    assert results_body({'query': 'x', 'count': 2}, blobs) == dumps({
+        'query': 'x', 'count': 2, 'results': [{'company_number': '1'}, {'company_number': '2'}]
+    })
+    assert results_body({'count': 0}, []) == dumps({'count': 0, 'results': []})
+
+def test_database_without_company_json(conn):
+    assert load_company_blob(conn, '00000001') is None
+    assert load_search_blobs(conn, ['00000001']) == {}
@@ -0,0 +1,66 @@
+"""backend.counts: exact, capped and estimated totals, and the per-version CountCache"""
+
+import sqlite3
+
+import pytest
+
+from backend.counts import CountCache, count_matches, format_total
+from backend.db import bump_data_version
+from conftest import build_database
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db')))
+    yield conn
+    conn.close()
+
+@pytest.mark.parametrize('mode, cap, match, expected', [
+    ('exact', 5, 'ltd', (30, 'exact')),
+    ('capped', 5, 'ltd', (5, 'capped')),
+    ('capped', 50, 'ltd', (30, 'exact')),
+    # The 5th TESCO is rowid 13 of 30: 5 * 30 / 13
+    ('estimate', 5, 'tesco', (11, 'estimate')),
+    ('estimate', 50, 'tesco', (10, 'exact')),
+])
+def test_count_modes(conn, mode, cap, match, expected):
+    assert count_matches(conn, match, mode, cap=cap) == expected
+
+def test_filters_narrow_every_mode(conn):
+    filters, params = " AND c.company_status = ?", ('liquidation',)
+    for mode in ('exact', 'capped', 'estimate'):
+        assert count_matches(conn, 'ltd', mode, filters=filters, filter_params=params) == (10, 'exact')
+
+def test_unknown_mode(conn):
+    with pytest.raises(ValueError):
+        count_matches(conn, 'ltd', 'roughly')
+
+def test_cache_is_emptied_by_a_new_data_version(conn):
+    cache = CountCache()
+    assert count_matches(conn, 'tesco', 'exact', cache=cache) == (10, 'exact')
+    conn.execute("""
+        INSERT INTO companies (company_number, company_name, company_status, sic_codes)
+        VALUES ('SC000001', 'TESCO EXPRESS LTD', 'active', '[]')
+    """)
+    # Same version: served from the cache
+    assert count_matches(conn, 'tesco', 'exact', cache=cache) == (10, 'exact')
+    bump_data_version(conn)
+    assert count_matches(conn, 'tesco', 'exact', cache=cache) == (11, 'exact')
+
+def test_cache_evicts_the_least_recently_used():
+    cache = CountCache(max_entries=2)
+    cache.get(1, 'a')
+    cache.put(1, 'a', (1, 'exact'))
+    cache.put(1, 'b', (2, 'exact'))
+    assert cache.get(1, 'a') == (1, 'exact')
+    cache.put(1, 'c', (3, 'exact'))
+    assert cache.get(1, 'b') is None
+    assert cache.get(1, 'a') == (1, 'exact')
+    # Written for an older version: dropped
+    cache.put(0, 'd', (4, 'exact'))
+    assert cache.get(1, 'd') is None
+
+@pytest.mark.parametrize('total, kind, expected', [
+    (1234, 'exact', '1,234'), (10000, 'capped', '10,000+'), (48000, 'estimate', '~48,000'),
+])
+def test_format_total(total, kind, expected):
+    assert format_total(total, kind) == expected
@@ -0,0 +1,173 @@
+"""scripts/download_bulk_data.py against a local HTTP server: resuming ranges and pipeline failures"""
+
+import json
+import os
+import sqlite3
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import download_bulk_data
+from download_bulk_data import DownloadError, download_segments, download_with_progress, fetch_range
+
+from conftest import build_database
+
+DATA = bytes(range(256)) * 4096   # 1 MiB
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves DATA with Range support; the server's settings change how it misbehaves"""
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self, status, length, start=0):
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        if self.server.accept_ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{start + length - 1}/{len(self.server.data)}')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.send_head(200, len(self.server.data))
+
+    def do_GET(self):
+        data = self.server.data
+        ranged = self.headers.get('Range')
+        self.server.requests.append(ranged)
+        if ranged and not self.server.ignore_range:
+            start, end = ranged.split('=')[1].split('-')
+            start, end = int(start), int(end) + 1
+            self.send_head(206, end - start, start)
+        else:
+            start, end = 0, len(data)
+            self.send_head(200, end - start)
+        # Drop the first response partway through, like a flaky connection
+        if self.server.drop_after and len(self.server.requests) == 1:
+            end = min(end, start + self.server.drop_after)
+            self.close_connection = True
+        self.wfile.write(data[start:end])
+
+class Progress:
+    """Stands in for the tqdm bar"""
+    n = 0
+
+    def update(self, nbytes):
+        self.n += nbytes
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.data = DATA
+    httpd.requests = []
+    httpd.accept_ranges = True
+    httpd.ignore_range = False
+    httpd.drop_after = 0
+    httpd.url = f'http://127.0.0.1:{httpd.server_port}/BasicCompanyDataAsOneFile-2026-10-01.zip'
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(download_bulk_data.time, 'sleep', lambda seconds: None)
+
+def test_fetch_range_resumes_a_dropped_connection(server, tmp_path):
+    server.drop_after = 300 * 1024
+    path = tmp_path / 'download.zip'
+    with open(path, 'w+b') as f:
+        f.truncate(len(DATA))
+        position = fetch_range(requests.Session(), server.url, f.fileno(), 0, len(DATA), lambda p, n: None)
+    assert position == len(DATA)
+    assert path.read_bytes() == DATA
+    assert len(server.requests) == 2
+    assert server.requests[1] != 'bytes=0-1048575'
+
+def test_fetch_range_fails_when_the_server_ignores_range(server, tmp_path):
+    server.ignore_range = True
+    with open(tmp_path / 'download.zip', 'w+b') as f:
+        with pytest.raises(DownloadError, match='ignored the Range'):
+            fetch_range(requests.Session(), server.url, f.fileno(), 1000, len(DATA), lambda p, n: None)
+
+def test_download_segments_resumes_only_the_missing_ranges(server, tmp_path):
+    path = str(tmp_path / 'download.zip')
+    half = len(DATA) // 2
+    # An interrupted run: the first quarter of each half already fetched
+    done = [DATA[:half // 4], DATA[half:half + half // 4]]
+    with open(path, 'wb') as f:
+        f.truncate(len(DATA))
+        f.write(done[0])
+        f.seek(half)
+        f.write(done[1])
+    ranges = [[half // 4, half], [half + half // 4, len(DATA)]]
+    with open(path + '.ranges', 'w') as f:
+        json.dump({'url': server.url, 'size': len(DATA), 'ranges': ranges}, f)
+
+    pbar = Progress()
+    download_segments(requests.Session(), server.url, path, len(DATA), 2, pbar)
+    assert pbar.n == len(DATA)
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert not os.path.exists(path + '.ranges')
+    assert sorted(server.requests) == [f'bytes={start}-{end - 1}' for start, end in ranges]
+
+def test_download_resumes_a_partial_file(server, tmp_path):
+    path = tmp_path / 'download.zip'
+    path.write_bytes(DATA[:1000])
+    assert download_with_progress(server.url, str(path), progress=False) == len(DATA)
+    assert path.read_bytes() == DATA
+    assert server.requests == [f'bytes=1000-{len(DATA) - 1}']
+
+def test_download_restarts_when_ranges_are_not_supported(server, tmp_path):
+    server.accept_ranges = False
+    server.ignore_range = True
+    path = tmp_path / 'download.zip'
+    path.write_bytes(b'stale partial download')
+    download_with_progress(server.url, str(path), progress=False)
+    assert path.read_bytes() == DATA
+    assert server.requests == [None]
+
+def test_pipeline_reports_a_failed_download_without_publishing(server, tmp_path, monkeypatch, capsys):
+    # Advertises ranges and then ignores them, so the download fails at once
+    server.ignore_range = True
+    db_path = build_database(str(tmp_path / 'companies.db'), companies=[])
+    import import_companies_final
+    monkeypatch.setattr(import_companies_final, 'DATABASE_PATH', db_path)
+    zip_path = str(tmp_path / 'BasicCompanyDataAsOneFile-2026-10-01.zip')
+
+    assert download_bulk_data.download_and_import(server.url, zip_path) is None
+    out = capsys.readouterr().out
+    assert 'Download failed: server ignored the Range request' in out
+    assert 'Opening database' not in out   # stopped before touching the database
+    assert not os.path.exists(zip_path)
+    assert data_version(db_path) is None
+
+def test_pipeline_does_not_publish_a_truncated_download(server, tmp_path, monkeypatch, capsys):
+    rows = ''.join(f'COMPANY {n} LTD,{n:08d},Active\r\n' for n in range(20000))
+    target = tmp_path / 'bulk.zip'
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr('BasicCompanyData.csv', 'CompanyName, CompanyNumber,CompanyStatus\r\n' + rows)
+    server.data = target.read_bytes()
+    server.drop_after = len(server.data) // 2
+    monkeypatch.setattr(download_bulk_data, 'MAX_RETRIES', 0)
+    db_path = build_database(str(tmp_path / 'companies.db'), companies=[])
+    import import_companies_final
+    monkeypatch.setattr(import_companies_final, 'DATABASE_PATH', db_path)
+    zip_path = str(tmp_path / 'BasicCompanyDataAsOneFile-2026-10-01.zip')
+
+    assert download_bulk_data.download_and_import(server.url, zip_path) is None
+    assert 'Download failed: giving up' in capsys.readouterr().out
+    assert os.path.exists(zip_path + '.part')   # kept for --resume
+    assert data_version(db_path) is None
+
+def data_version(db_path):
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT value FROM import_metadata WHERE key = 'data_version'").fetchone()
+    conn.close()
+    return row
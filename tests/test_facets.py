@@ -0,0 +1,54 @@
+"""Facet counts from the company_facets columns"""
+
+import sqlite3
+
+import pytest
+
+from backend.facets import FacetIndex, rebuild_facets
+from backend.sic import sic_filter
+from conftest import build_database
+
+COMPANIES = [
+    ('00000001', 'TESCO STORES LTD', 'active', 0, '["47110", "10710"]'),
+    ('00000002', 'LEEDS BAKERY LTD', 'active', 0, '["10710", "10720", "47240"]'),
+    ('00000003', 'ACME SOFTWARE LTD', 'active', 0, '["62012"]'),
+    ('00000004', 'CORNER SHOP LTD', 'dissolved', 0, '["47110"]'),
+    ('00000005', 'NO CODES LTD', 'active', 0, '[]'),
+    ('00000006', 'ODD CODES LTD', 'active', 0, '["None Supplied", 47110]'),
+]
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db'), COMPANIES))
+    rebuild_facets(conn)
+    yield conn
+    conn.close()
+
+def test_sic_section_counts_every_section_once(conn):
+    facets, exact = FacetIndex().count(conn, 'ltd')
+    assert exact
+    # TESCO and LEEDS BAKERY count under both C and G; LEEDS BAKERY's two C codes count once
+    assert facets['sic_section'] == [{'value': 'G', 'count': 3}, {'value': 'C', 'count': 2},
+                                     {'value': 'J', 'count': 1}]
+    assert facets['company_status'] == [{'value': 'active', 'count': 5}, {'value': 'dissolved', 'count': 1}]
+
+@pytest.mark.parametrize('section', ['C', 'G', 'J', 'A'])
+def test_sic_section_agrees_with_the_sic_prefix_filter(conn, section):
+    filters, params = sic_filter(sic_prefix=section)
+    matches = conn.execute(f"""
+        SELECT COUNT(*) FROM companies_fts JOIN companies c ON c.rowid = companies_fts.rowid
+        WHERE companies_fts MATCH ?{filters}
+    """, ('ltd', *params)).fetchone()[0]
+    facets, _ = FacetIndex().count(conn, 'ltd')
+    counted = {value['value']: value['count'] for value in facets['sic_section']}
+    assert counted.get(section, 0) == matches
+
+def test_counts_before_the_columns_are_built(tmp_path, conn):
+    unbuilt = sqlite3.connect(build_database(str(tmp_path / 'unbuilt.db'), COMPANIES))
+    assert FacetIndex().count(unbuilt, 'ltd') == FacetIndex().count(conn, 'ltd')
+    unbuilt.close()
+
+def test_search_always_returns_facets(client):
+    body = client.get('/api/search', query_string={'q': 'ltd', 'facets': 1}).get_json()
+    assert body['facets']['company_status'] == [{'value': 'active', 'count': 20}, {'value': 'liquidation', 'count': 10}]
+    assert body['facets_exact'] is True
@@ -0,0 +1,32 @@
+"""scripts/fix_schema.py: dropping the company_status CHECK without moving any rowid"""
+
+import sqlite3
+
+from conftest import build_database
+from fix_schema import fix_status_constraint
+
+def test_rowids_and_search_index_survive(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db')))
+    # Gaps, so a plain INSERT ... SELECT * would renumber the rows after them
+    conn.execute("DELETE FROM companies WHERE company_number IN ('00000002', '00000005')")
+    conn.commit()
+    before = conn.execute("SELECT rowid, company_number FROM companies ORDER BY rowid").fetchall()
+
+    fix_status_constraint(conn)
+
+    assert conn.execute("SELECT rowid, company_number FROM companies ORDER BY rowid").fetchall() == before
+    matches = conn.execute("""
+        SELECT c.company_number FROM companies_fts JOIN companies c ON c.rowid = companies_fts.rowid
+        WHERE companies_fts MATCH 'company_name : acme' ORDER BY c.company_number
+    """).fetchall()
+    assert [number for number, in matches] == [f'{n:08d}' for n in range(3, 31, 3)]
+    assert conn.execute("INSERT INTO companies_fts(companies_fts, rank) VALUES('integrity-check', 1)")
+
+    # Statuses outside the old CHECK now load, and the triggers are back
+    conn.execute("""
+        INSERT INTO companies (company_number, company_name, company_status, sic_codes)
+        VALUES ('SC000001', 'HIGHLAND CROFT LTD', 'open', '["01110"]')
+    """)
+    assert conn.execute("SELECT COUNT(*) FROM companies_fts WHERE companies_fts MATCH 'highland'").fetchone() == (1,)
+    assert conn.execute("SELECT sic_code FROM company_sic WHERE company_number = 'SC000001'").fetchall() == [('01110',)]
+    conn.close()
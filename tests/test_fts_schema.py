@@ -0,0 +1,85 @@
+"""Databases whose companies_fts predates the companies_fts_source view"""
+
+import sqlite3
+
+import pytest
+
+import create_schema
+import import_companies_final
+from backend.fts import legacy_fts_table
+from conftest import build_database
+from verify_fts import verify
+
+LEGACY_TABLES = {
+    'content=companies': """
+        CREATE VIRTUAL TABLE companies_fts USING fts5(
+            company_number UNINDEXED, company_name, previous_names, registered_office_address,
+            content=companies, tokenize='porter unicode61'
+        )""",
+    'own content': """
+        CREATE VIRTUAL TABLE companies_fts USING fts5(
+            company_number UNINDEXED, company_name, previous_names, registered_office_address,
+            tokenize='porter unicode61'
+        )""",
+}
+
+def make_legacy(path, declaration, companies=()):
+    """A database like build_database's, with an index from an older version"""
+    kwargs = {} if companies == () else {'companies': companies}
+    conn = sqlite3.connect(build_database(path, **kwargs))
+    for trigger in ('companies_ai', 'companies_au', 'companies_ad'):
+        conn.execute(f"DROP TRIGGER {trigger}")
+    conn.execute("DROP VIEW companies_fts_source")
+    conn.execute("DROP TABLE companies_fts")
+    conn.execute(LEGACY_TABLES[declaration])
+    conn.commit()
+    return conn
+
+def tesco_numbers(conn):
+    return [number for number, in conn.execute("""
+        SELECT c.company_number FROM companies_fts JOIN companies c ON c.rowid = companies_fts.rowid
+        WHERE companies_fts MATCH 'company_name : tesco' ORDER BY c.company_number
+    """)]
+
+def test_current_declaration_is_not_legacy(db_path):
+    conn = sqlite3.connect(db_path)
+    assert not legacy_fts_table(conn.cursor())
+    conn.close()
+
+@pytest.mark.parametrize('declaration', LEGACY_TABLES)
+def test_verify_reports_a_legacy_index(tmp_path, capsys, declaration):
+    conn = make_legacy(str(tmp_path / 'companies.db'), declaration)
+    assert legacy_fts_table(conn.cursor())
+    assert verify(conn, sample_size=10) is False
+    assert 'not declared over companies_fts_source' in capsys.readouterr().out
+
+    assert verify(conn, sample_size=10, repair=True) is True
+    assert verify(conn, sample_size=10, full=True) is True
+    conn.close()
+
+@pytest.mark.parametrize('declaration', LEGACY_TABLES)
+def test_create_fts_recreates_a_legacy_index(tmp_path, declaration):
+    conn = make_legacy(str(tmp_path / 'companies.db'), declaration)
+    assert create_schema.create_fts(conn.cursor()) is True
+    conn.commit()
+    assert tesco_numbers(conn) == [f'{n:08d}' for n in range(1, 31, 3)]
+    assert verify(conn, sample_size=10, full=True) is True
+    conn.close()
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_import_recreates_a_legacy_index_before_loading(tmp_path, monkeypatch, bulk):
+    db_path = str(tmp_path / 'companies.db')
+    make_legacy(db_path, 'content=companies', companies=[]).close()
+    csv_path = tmp_path / 'companies.csv'
+    csv_path.write_text('CompanyName, CompanyNumber,CompanyStatus\r\n'
+                        + ''.join(f'TESCO STORES {n} LTD,{n:08d},Active\r\n' for n in range(1, 51)))
+    monkeypatch.setattr(import_companies_final, 'DATABASE_PATH', db_path)
+
+    result = import_companies_final.import_companies(str(csv_path), bulk=bulk)
+
+    assert result['completed']
+    conn = sqlite3.connect(db_path)
+    assert not legacy_fts_table(conn.cursor())
+    assert len(tesco_numbers(conn)) == 50
+    assert verify(conn, sample_size=10, full=True) is True
+    conn.close()
@@ -0,0 +1,66 @@
+"""ETag / Last-Modified validators and 304 responses on the cached API routes"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+IMPORTED_AT = datetime(2026, 10, 1, 6, 30, 15, 123456, tzinfo=timezone.utc)
+
+ROUTES = ['/api/company/00000001', '/api/search?q=tesco', '/api/stats', '/api/sic?prefix=C']
+
+@pytest.fixture
+def app_main(client):
+    # Imported by the client fixture, once DATABASE_PATH points at the test database
+    import app_main
+    return app_main
+
+@pytest.fixture
+def imported(app_main, monkeypatch):
+    monkeypatch.setattr(app_main, 'get_last_import_at', lambda conn: IMPORTED_AT)
+
+@pytest.mark.parametrize('url', ROUTES)
+def test_matching_etag_gets_304(client, app_main, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == f'public, max-age={app_main.HTTP_MAX_AGE}'
+
+    current = client.get(url, headers={'If-None-Match': etag})
+    assert current.status_code == 304
+    assert current.data == b''
+    assert current.headers['ETag'] == etag
+    assert client.get(url, headers={'If-None-Match': '"something-else"'}).status_code == 200
+
+def test_etag_follows_parameters_and_data_version(client, app_main, monkeypatch):
+    tesco = client.get('/api/search?q=tesco').headers['ETag']
+    assert client.get('/api/search?q=tesco').headers['ETag'] == tesco
+    assert client.get('/api/search?q=tesco&limit=5').headers['ETag'] != tesco
+
+    version = app_main.get_data_version
+    monkeypatch.setattr(app_main, 'get_data_version', lambda conn: version(conn) + 1)
+    response = client.get('/api/search?q=tesco', headers={'If-None-Match': tesco})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != tesco
+
+def test_if_modified_since(client, imported):
+    url = '/api/company/00000001'
+    response = client.get(url)
+    assert response.headers['Last-Modified'] == 'Thu, 01 Oct 2026 06:30:15 GMT'
+
+    assert client.get(url, headers={'If-Modified-Since': 'Thu, 01 Oct 2026 06:30:15 GMT'}).status_code == 304
+    assert client.get(url, headers={'If-Modified-Since': 'Thu, 01 Oct 2026 06:30:14 GMT'}).status_code == 200
+    # If-None-Match wins when both are sent
+    assert client.get(url, headers={
+        'If-Modified-Since': 'Thu, 01 Oct 2026 06:30:15 GMT', 'If-None-Match': '"something-else"'
+    }).status_code == 200
+
+def test_no_last_modified_before_the_first_stamped_import(client):
+    response = client.get('/api/company/00000001', headers={'If-Modified-Since': 'Thu, 01 Oct 2026 06:30:15 GMT'})
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
+
+@pytest.mark.parametrize('url', ROUTES)
+def test_body_is_stable_for_its_etag(client, url):
+    first, second = client.get(url), client.get(url)
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.data == first.data
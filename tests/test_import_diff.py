@@ -0,0 +1,84 @@
+"""--diff imports: change hashes kept by every import path, tombstones and the removal guard"""
+
+import sqlite3
+
+import pytest
+
+import import_companies_final
+from conftest import build_database
+
+def write_csv(path, numbers, renamed=()):
+    path.write_text('CompanyName, CompanyNumber,CompanyStatus\r\n' + ''.join(
+        f"{'RENAMED' if n in renamed else 'TESCO STORES'} {n} LTD,{n:08d},Active\r\n" for n in numbers
+    ))
+    return str(path)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = build_database(str(tmp_path / 'companies.db'), companies=[])
+    monkeypatch.setattr(import_companies_final, 'DATABASE_PATH', path)
+    # A full import over existing rows keeps them and upserts
+    monkeypatch.setattr('builtins.input', lambda prompt: 'n')
+    return path
+
+def names(db_path):
+    conn = sqlite3.connect(db_path)
+    found = dict(conn.execute("SELECT company_number, company_name FROM companies"))
+    conn.close()
+    return found
+
+def test_full_import_keeps_hashes_for_the_next_diff(tmp_path, db_path):
+    original = write_csv(tmp_path / 'original.csv', range(1, 41))
+    changed = write_csv(tmp_path / 'changed.csv', range(1, 41), renamed={5})
+
+    assert import_companies_final.import_companies(original)['completed']
+    result = import_companies_final.import_companies(original, diff=True)
+    assert result['changes'] == {'inserted': 0, 'updated': 0, 'unchanged': 40, 'baselined': 0, 'removed': 0}
+
+    # A full import rewrites the hash with the row, so the next diff sees the change
+    assert import_companies_final.import_companies(changed)['completed']
+    assert names(db_path)['00000005'] == 'RENAMED 5 LTD'
+    result = import_companies_final.import_companies(original, diff=True)
+    assert result['changes']['updated'] == 1
+    assert result['changes']['unchanged'] == 39
+    assert names(db_path)['00000005'] == 'TESCO STORES 5 LTD'
+
+def test_rows_without_a_hash_are_compared_not_rewritten(tmp_path, db_path):
+    assert import_companies_final.import_companies(write_csv(tmp_path / 'original.csv', range(1, 41)))['completed']
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM company_changes")
+    conn.commit()
+
+    result = import_companies_final.import_companies(
+        write_csv(tmp_path / 'changed.csv', range(1, 41), renamed={7}), diff=True)
+    assert result['changes'] == {'inserted': 0, 'updated': 1, 'unchanged': 0, 'baselined': 39, 'removed': 0}
+    assert result['rows_inserted'] == 1
+    assert conn.execute("SELECT COUNT(*) FROM company_changes").fetchone() == (40,)
+    conn.close()
+
+def test_inserts_and_tombstones(tmp_path, db_path):
+    assert import_companies_final.import_companies(write_csv(tmp_path / 'original.csv', range(1, 41)))['completed']
+
+    result = import_companies_final.import_companies(write_csv(tmp_path / 'next.csv', range(2, 42)), diff=True)
+    assert result['changes'] == {'inserted': 1, 'updated': 0, 'unchanged': 39, 'baselined': 0, 'removed': 1}
+    found = names(db_path)
+    assert '00000001' not in found and found['00000041'] == 'TESCO STORES 41 LTD'
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT company_number, company_name FROM company_tombstones").fetchall() == [
+        ('00000001', 'TESCO STORES 1 LTD')]
+    assert conn.execute("SELECT COUNT(*) FROM company_changes WHERE company_number = '00000001'").fetchone() == (0,)
+
+    # Back on the register: the tombstone goes
+    result = import_companies_final.import_companies(write_csv(tmp_path / 'back.csv', range(1, 42)), diff=True)
+    assert result['changes']['inserted'] == 1
+    assert conn.execute("SELECT COUNT(*) FROM company_tombstones").fetchone() == (0,)
+    conn.close()
+
+def test_guard_refuses_to_remove_a_large_fraction(tmp_path, db_path):
+    assert import_companies_final.import_companies(write_csv(tmp_path / 'original.csv', range(1, 41)))['completed']
+
+    # 10 of 40 missing is over MAX_REMOVED_FRACTION: a truncated file, not closures
+    result = import_companies_final.import_companies(write_csv(tmp_path / 'short.csv', range(1, 31)), diff=True)
+    assert result['completed']
+    assert result['changes'].get('removed', 0) == 0
+    assert len(names(db_path)) == 40
@@ -0,0 +1,47 @@
+"""--workers: chunks parsed in a process pool give the rows a serial run gives"""
+
+import functools
+import sqlite3
+
+import pytest
+
+import import_companies_final
+from conftest import build_database
+
+HEADER = 'CompanyName, CompanyNumber,RegAddress.AddressLine1,CompanyStatus,SICCode.SicText_1\r\n'
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    # Quoted fields with newlines and commas land across chunk boundaries
+    path = tmp_path / 'companies.csv'
+    path.write_text(HEADER + ''.join(
+        f'"BAKERS, {n} LTD",{n:08d},"{n} HIGH STREET\r\nSECOND LINE",'
+        f'{"Active" if n % 3 else "Liquidation"},10710 - Manufacture of bread\r\n'
+        for n in range(1, 301)
+    ))
+    monkeypatch.setattr(import_companies_final, 'read_chunks',
+                        functools.partial(import_companies_final.read_chunks, chunk_bytes=2000))
+    return str(path)
+
+def test_parse_records_matches_serial(csv_path):
+    serial = list(import_companies_final.parse_records(csv_path, workers=1, with_hashes=True))
+    parallel = list(import_companies_final.parse_records(csv_path, workers=2, with_hashes=True))
+    assert len(serial) > 4
+    assert parallel == serial
+    rows = [row for _, (chunk_rows, *_) in serial for row in chunk_rows]
+    assert [row[0] for row in rows] == [f'{n:08d}' for n in range(1, 301)]
+    assert rows[0][8] == '1 HIGH STREET\nSECOND LINE'
+
+def test_import_with_workers_matches_serial(tmp_path, csv_path, monkeypatch):
+    tables = []
+    for workers in (1, 2):
+        db_path = build_database(str(tmp_path / f'companies_{workers}.db'), companies=[])
+        monkeypatch.setattr(import_companies_final, 'DATABASE_PATH', db_path)
+        result = import_companies_final.import_companies(csv_path, workers=workers)
+        assert result['completed'] and result['rows_inserted'] == 300
+        conn = sqlite3.connect(db_path)
+        tables.append(conn.execute(
+            f"SELECT rowid, {', '.join(import_companies_final.COMPANY_COLUMNS)} FROM companies ORDER BY rowid"
+        ).fetchall())
+        conn.close()
+    assert tables[0] == tables[1]
@@ -0,0 +1,71 @@
+"""--resume: an interrupted import continues from its last committed checkpoint"""
+
+import functools
+import sqlite3
+
+import pytest
+
+import import_companies_final
+from conftest import build_database
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = build_database(str(tmp_path / 'companies.db'), companies=[])
+    monkeypatch.setattr(import_companies_final, 'DATABASE_PATH', path)
+    monkeypatch.setattr(import_companies_final, 'read_chunks',
+                        functools.partial(import_companies_final.read_chunks, chunk_bytes=1000))
+    return path
+
+def write_csv(path, name='TESCO STORES'):
+    path.write_text('CompanyName, CompanyNumber,CompanyStatus\r\n'
+                    + ''.join(f'{name} {n} LTD,{n:08d},Active\r\n' for n in range(1, 201)))
+    return str(path)
+
+def interrupt_after(monkeypatch, chunks):
+    parse_records = import_companies_final.parse_records
+
+    def interrupted(*args, **kwargs):
+        for i, chunk in enumerate(parse_records(*args, **kwargs)):
+            if i == chunks:
+                raise KeyboardInterrupt
+            yield chunk
+
+    monkeypatch.setattr(import_companies_final, 'parse_records', interrupted)
+    return parse_records
+
+def stored(db_path):
+    conn = sqlite3.connect(db_path)
+    numbers = [number for number, in conn.execute("SELECT company_number FROM companies ORDER BY company_number")]
+    checkpoints = conn.execute("SELECT row_number FROM import_checkpoints").fetchall()
+    conn.close()
+    return numbers, checkpoints
+
+def test_resume_continues_from_the_checkpoint(tmp_path, db_path, monkeypatch):
+    csv_path = write_csv(tmp_path / 'companies.csv')
+    parse_records = interrupt_after(monkeypatch, 2)
+    first = import_companies_final.import_companies(csv_path)
+    assert not first['completed']
+    numbers, checkpoints = stored(db_path)
+    assert checkpoints == [(first['rows_processed'],)]
+    assert numbers == [f'{n:08d}' for n in range(1, first['rows_processed'] + 1)]
+
+    monkeypatch.setattr(import_companies_final, 'parse_records', parse_records)
+    second = import_companies_final.import_companies(csv_path, resume=True)
+    assert second['completed']
+    assert second['rows_processed'] == 200 - first['rows_processed']
+    numbers, checkpoints = stored(db_path)
+    assert numbers == [f'{n:08d}' for n in range(1, 201)]
+    assert checkpoints == []
+
+def test_checkpoint_of_another_file_is_ignored(tmp_path, db_path, monkeypatch):
+    csv_path = tmp_path / 'companies.csv'
+    parse_records = interrupt_after(monkeypatch, 2)
+    assert not import_companies_final.import_companies(write_csv(csv_path))['completed']
+
+    # Next month's file under the same name starts from the top
+    monkeypatch.setattr(import_companies_final, 'parse_records', parse_records)
+    result = import_companies_final.import_companies(write_csv(csv_path, 'ASDA STORES'), resume=True)
+    assert result['completed'] and result['rows_processed'] == 200
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM companies WHERE company_name LIKE 'ASDA%'").fetchone() == (200,)
+    conn.close()
@@ -0,0 +1,70 @@
+"""backend.response_cache.ResponseCache: TTL, LRU, data versions, the shared file and X-Cache"""
+
+import types
+
+import pytest
+
+from backend import response_cache
+from backend.response_cache import ResponseCache, cache_key, make_etag
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.get(1, 'a')
+    cache.put(1, 'a', b'{}')
+    clock[0] += 59
+    assert cache.get(1, 'a') == b'{}'
+    clock[0] += 2
+    assert cache.get(1, 'a') is None
+    assert cache.stats()['entries'] == 0
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.get(1, 'a')
+    cache.put(1, 'a', b'a')
+    cache.put(1, 'b', b'b')
+    assert cache.get(1, 'a') == b'a'
+    cache.put(1, 'c', b'c')
+    assert cache.get(1, 'b') is None
+    assert [cache.get(1, key) for key in 'ac'] == [b'a', b'c']
+
+def test_new_data_version_empties_the_cache():
+    cache = ResponseCache()
+    cache.get(1, 'a')
+    cache.put(1, 'a', b'a')
+    assert cache.get(2, 'a') is None
+    # A build that started under the old version is not kept
+    cache.put(1, 'a', b'a')
+    assert cache.get(2, 'a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['data_version']) == (0, 3, 2)
+
+def test_shared_file_warms_other_processes(tmp_path):
+    path = str(tmp_path / 'response_cache.db')
+    first, second = ResponseCache(shared_path=path), ResponseCache(shared_path=path)
+    first.get(1, 'a')
+    first.put(1, 'a', b'{"a": 1}')
+    assert second.get(1, 'a') == b'{"a": 1}'
+    assert second.get(1, 'a') == b'{"a": 1}'
+    assert (second.stats()['shared_hits'], second.stats()['hits']) == (1, 1)
+    assert second.get(2, 'a') is None
+
+def test_keys_and_etags():
+    assert cache_key('search', 'tesco', None, 20) == 'search\x1ftesco\x1f\x1f20'
+    assert make_etag(1, 'a') == make_etag(1, 'a')
+    assert make_etag(1, 'a') != make_etag(2, 'a')
+
+def test_x_cache_marks_responses_served_from_the_cache(client, monkeypatch):
+    import app_main
+    monkeypatch.setattr(app_main, 'response_cache', ResponseCache())
+    first = client.get('/api/company/00000001')
+    second = client.get('/api/company/00000001')
+    assert first.status_code == second.status_code == 200
+    assert 'X-Cache' not in first.headers
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.data == first.data
@@ -0,0 +1,22 @@
+"""/api/search parameter validation"""
+
+import pytest
+
+def test_search_returns_results(client):
+    response = client.get('/api/search?q=tesco')
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 10
+
+@pytest.mark.parametrize('limit, clamped, count', [('0', 1, 1), ('-2', 1, 1), ('3', 3, 3), ('1000', 100, 10)])
+def test_limit_is_clamped(client, limit, clamped, count):
+    response = client.get(f'/api/search?q=tesco&limit={limit}')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['limit'] == clamped
+    assert body['count'] == count
+
+@pytest.mark.parametrize('params', ['limit=abc', 'limit=1.5', 'limit=', 'offset=x', 'offset=-1'])
+def test_invalid_limit_or_offset_is_rejected(client, params):
+    response = client.get(f'/api/search?q=tesco&{params}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
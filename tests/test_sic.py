@@ -0,0 +1,56 @@
+"""/api/sic counts: from company_stats once built, from company_sic before that"""
+
+import sqlite3
+
+import pytest
+
+from backend.sic import sic_counts
+from backend.stats import rebuild_stats
+from conftest import build_database
+
+COMPANIES = [
+    ('00000001', 'TESCO STORES LTD', 'active', 0, '["47110", "10710"]'),
+    ('00000002', 'LEEDS BAKERY LTD', 'active', 0, '["10710"]'),
+    ('00000003', 'ACME SOFTWARE LTD', 'active', 0, '["62012"]'),
+    ('00000004', 'HALF FILLED LTD', 'active', 0, '{"code": "62012"}'),
+]
+
+EXPECTED = {
+    '': [('10710', 2), ('47110', 1), ('62012', 1)],
+    'C': [('10710', 2)],
+    '47': [('47110', 1)],
+    'J': [('62012', 1)],
+    'A': [],
+}
+
+def counts(conn, prefix=''):
+    return [(code, companies) for code, _, companies in sic_counts(conn, prefix)]
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db'), COMPANIES))
+    yield conn
+    conn.close()
+
+@pytest.mark.parametrize('prefix', EXPECTED)
+def test_counts_before_stats_are_built(conn, prefix):
+    assert counts(conn, prefix) == EXPECTED[prefix]
+
+@pytest.mark.parametrize('prefix', EXPECTED)
+def test_counts_from_company_stats(conn, prefix):
+    rebuild_stats(conn)
+    assert counts(conn, prefix) == EXPECTED[prefix]
+    descriptions = dict(conn.execute("SELECT code, description FROM sic_codes"))
+    assert [(code, description) for code, description, _ in sic_counts(conn, prefix)] == [
+        (code, descriptions.get(code)) for code, _ in EXPECTED[prefix]]
+
+def test_company_stats_is_read_once_built(conn):
+    rebuild_stats(conn)
+    conn.execute("UPDATE company_stats SET count = 7 WHERE dimension = 'sic' AND value = '62012'")
+    assert counts(conn, 'J') == [('62012', 7)]
+    assert counts(conn)[0] == ('62012', 7)
+
+def test_database_without_company_stats(conn):
+    rebuild_stats(conn)
+    conn.execute("DROP TABLE company_stats")
+    assert counts(conn, 'C') == EXPECTED['C']
@@ -0,0 +1,86 @@
+"""SIC code descriptions in companies_fts: searchable as industry= and kept in step by the importer"""
+
+import sqlite3
+
+import pytest
+
+import import_companies_final
+from backend.fts import build_search_match
+from conftest import build_database
+from verify_fts import verify
+
+COMPANIES = [
+    ('00000001', 'TESCO STORES LTD', 'active', 0, '["47110"]'),
+    ('00000002', 'LEEDS BAKERY LTD', 'active', 0, '["10710", "47110"]'),
+    ('00000003', 'ACME SOFTWARE LTD', 'active', 0, '["62012"]'),
+]
+
+def industry(conn, text, location=None):
+    return [number for number, in conn.execute("""
+        SELECT c.company_number FROM companies_fts JOIN companies c ON c.rowid = companies_fts.rowid
+        WHERE companies_fts MATCH ? ORDER BY c.company_number
+    """, (build_search_match('', text, location),))]
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = build_database(str(tmp_path / 'companies.db'), COMPANIES)
+    monkeypatch.setattr(import_companies_final, 'DATABASE_PATH', path)
+    return path
+
+def import_csv(tmp_path, rows):
+    csv_path = tmp_path / 'companies.csv'
+    csv_path.write_text('CompanyName, CompanyNumber,CompanyStatus,SICCode.SicText_1,SICCode.SicText_2\r\n'
+                        + ''.join(f'{name},{number},Active,{",".join(sic)}\r\n' for name, number, *sic in rows))
+    return import_companies_final.import_companies(str(csv_path), diff=True)
+
+def test_descriptions_are_searchable(db_path):
+    conn = sqlite3.connect(db_path)
+    assert industry(conn, 'retail') == ['00000001', '00000002']
+    assert industry(conn, 'non-specialised stores') == ['00000001', '00000002']
+    # Stemmed like the rest of the index
+    assert industry(conn, 'predominates') == ['00000001', '00000002']
+    assert industry(conn, 'software') == []
+
+    conn.execute("UPDATE companies SET sic_codes = '[\"62012\"]' WHERE company_number = '00000001'")
+    assert industry(conn, 'retail') == ['00000002']
+    assert verify(conn, sample_size=10, full=True) is True
+    conn.close()
+
+def test_import_adds_descriptions_from_the_csv(tmp_path, db_path):
+    result = import_csv(tmp_path, [
+        ('TESCO STORES LTD', '00000001', '47110 - Retail sale in non-specialised stores', ''),
+        ('LEEDS BAKERY LTD', '00000002', '10710 - Manufacture of bread', ''),
+        ('ACME SOFTWARE LTD', '00000003', '62012 - Business and domestic software development', ''),
+        ('YORK BREAD LTD', '00000004', '10710 - Manufacture of bread', ''),
+    ])
+    assert result['completed']
+    conn = sqlite3.connect(db_path)
+    assert industry(conn, 'bread') == ['00000002', '00000004']
+    assert industry(conn, 'software') == ['00000003']
+    assert verify(conn, sample_size=10, full=True) is True
+    conn.close()
+
+def test_reworded_description_reaches_companies_not_in_the_file(tmp_path, db_path):
+    # Only TESCO's row carries the new wording; LEEDS BAKERY, unchanged, shares the code
+    assert import_csv(tmp_path, [
+        ('TESCO STORES LTD', '00000001', '47110 - Grocery supermarkets', ''),
+        ('LEEDS BAKERY LTD', '00000002', '10710 - Manufacture of bread', '47110'),
+        ('ACME SOFTWARE LTD', '00000003', '62012 - Business and domestic software development', ''),
+    ])['completed']
+    conn = sqlite3.connect(db_path)
+    assert industry(conn, 'grocery') == ['00000001', '00000002']
+    assert industry(conn, 'retail') == []
+    assert verify(conn, sample_size=10, full=True) is True
+    conn.close()
+
+def test_first_description_reaches_companies_already_holding_the_code(tmp_path, db_path, monkeypatch):
+    # Imported before 62012 had a description; this file brings one for another company
+    monkeypatch.setattr('builtins.input', lambda prompt: 'n')
+    csv_path = tmp_path / 'companies.csv'
+    csv_path.write_text('CompanyName, CompanyNumber,CompanyStatus,SICCode.SicText_1\r\n'
+                        'BETA SYSTEMS LTD,00000009,Active,62012 - Business and domestic software development\r\n')
+    assert import_companies_final.import_companies(str(csv_path))['completed']
+    conn = sqlite3.connect(db_path)
+    assert industry(conn, 'software') == ['00000003', '00000009']
+    assert verify(conn, sample_size=10, full=True) is True
+    conn.close()
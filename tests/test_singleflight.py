@@ -0,0 +1,64 @@
+"""backend.singleflight.SingleFlight: a burst of identical calls runs once"""
+
+import threading
+
+import pytest
+
+from backend.singleflight import SingleFlight
+
+def burst(flight, key, function, callers=8):
+    """Call flight.do from callers threads at once; [(result, shared) or exception]"""
+    results = [None] * callers
+    started = threading.Barrier(callers)
+
+    def call(i):
+        started.wait()
+        try:
+            results[i] = flight.do(key, function)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+def slow(result, calls, release):
+    def function():
+        calls.append(1)
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return function
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls, release = [], threading.Event()
+    threading.Timer(0.2, release.set).start()
+    results = burst(flight, 'tesco', slow(b'{"count":10}', calls, release))
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [b'{"count":10}'] * 8
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flight.stats() == {'in_flight': 0, 'executions': 1, 'shared': 7}
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight()
+    calls, release = [], threading.Event()
+    threading.Timer(0.2, release.set).start()
+    results = burst(flight, 'tesco', slow(ValueError('locked'), calls, release))
+
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_nothing_is_remembered_after_the_call():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('a', lambda: 2) == (2, False)
+    with pytest.raises(KeyError):
+        flight.do('b', lambda: {}['missing'])
+    assert flight.do('b', lambda: 3) == (3, False)
+    assert flight.stats()['in_flight'] == 0
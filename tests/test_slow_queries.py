@@ -0,0 +1,70 @@
+"""backend.slow_queries: statements over the threshold are logged with their query plan"""
+
+import sqlite3
+
+import pytest
+
+from backend.slow_queries import SlowQueryLog, full_scans, read_entries
+from conftest import build_database
+
+@pytest.fixture
+def database(tmp_path):
+    return build_database(str(tmp_path / 'companies.db'))
+
+def connect(database, log):
+    return sqlite3.connect(database, factory=log.connection_factory())
+
+def test_slow_statements_are_logged_with_their_plan(tmp_path, database):
+    log = SlowQueryLog(str(tmp_path / 'logs' / 'slow.log'), threshold_ms=0)
+    conn = connect(database, log)
+    conn.execute("SELECT COUNT(*) FROM companies WHERE UPPER(company_name) LIKE ?", ('%TESCO%',)).fetchone()
+    conn.execute("""
+        SELECT c.company_number FROM companies_fts JOIN companies c ON c.rowid = companies_fts.rowid
+        WHERE companies_fts MATCH ?
+    """, ('tesco',)).fetchall()
+    conn.close()
+
+    scan, search = list(read_entries(log.path))
+    assert scan['sql'] == "SELECT COUNT(*) FROM companies WHERE UPPER(company_name) LIKE ?"
+    assert scan['parameters'] == ['%TESCO%']
+    assert scan['full_scan'] and scan['scans'] == ['companies']
+    assert any(line.strip().startswith('SCAN companies') for line in scan['plan'])
+    # Logged once, as soon as it crossed the threshold (here: before any row was fetched)
+    assert not scan['complete']
+
+    assert not search['full_scan'] and search['scans'] == []
+    assert log.logged == 2
+
+def test_fast_statements_are_not_logged(tmp_path, database):
+    log = SlowQueryLog(str(tmp_path / 'slow.log'), threshold_ms=60000)
+    conn = connect(database, log)
+    conn.execute("SELECT COUNT(*) FROM companies").fetchone()
+    conn.close()
+    assert log.logged == 0
+    assert list(read_entries(log.path)) == []
+
+def test_large_parameters_are_shortened(tmp_path, database):
+    log = SlowQueryLog(str(tmp_path / 'slow.log'), threshold_ms=0)
+    conn = connect(database, log)
+    conn.execute("SELECT ?, ?", ('x' * 500, b'\x00' * 64)).fetchone()
+    conn.close()
+    entry, = read_entries(log.path)
+    assert entry['parameters'] == ['x' * 200 + '…', '<64 bytes>']
+
+def test_rotated_files_are_read_oldest_first(tmp_path, database):
+    log = SlowQueryLog(str(tmp_path / 'slow.log'), threshold_ms=0, max_bytes=2000, backups=10)
+    conn = connect(database, log)
+    for n in range(20):
+        conn.execute(f"SELECT {n}").fetchone()
+    conn.close()
+    assert (tmp_path / 'slow.log.1').exists()
+    assert [entry['sql'] for entry in read_entries(log.path)] == [f"SELECT {n}" for n in range(20)]
+
+@pytest.mark.parametrize('sql, plan, expected', [
+    ("SELECT * FROM companies c WHERE c.company_type = ?", ['SCAN c'], ['companies']),
+    ("SELECT * FROM companies WHERE company_number = ?",
+     ['SEARCH companies USING INDEX sqlite_autoindex_companies_1 (company_number=?)'], []),
+    ("SELECT * FROM company_sic", ['SCAN company_sic'], []),
+])
+def test_full_scans(sql, plan, expected):
+    assert full_scans(sql, plan) == expected
@@ -0,0 +1,57 @@
+"""company_stats: what rebuild_stats stores is what a live aggregate gives"""
+
+import sqlite3
+
+import pytest
+
+from backend.stats import compute_stats, load_stats, rebuild_stats, stats_built_at
+from conftest import build_database
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(build_database(str(tmp_path / 'companies.db')))
+    conn.execute("UPDATE companies SET registered_office_country = 'ENGLAND', company_type = 'ltd' WHERE rowid % 2 = 0")
+    conn.execute("UPDATE companies SET date_of_creation = '2019-0' || (rowid % 9 + 1) || '-01' WHERE rowid % 3 = 0")
+    conn.execute("UPDATE companies SET sic_codes = '[\"47110\", \"10710\"]' WHERE rowid % 5 = 0")
+    conn.commit()
+    yield conn
+    conn.close()
+
+def test_stored_stats_match_a_live_aggregate(conn):
+    assert load_stats(conn) is None
+    assert stats_built_at(conn) is None
+    rebuild_stats(conn)
+    assert load_stats(conn) == compute_stats(conn)
+    assert stats_built_at(conn) is not None
+
+def test_stats_match_live_counts(conn):
+    rebuild_stats(conn)
+    stats = load_stats(conn)
+    assert stats['total'] == [('', 30)]
+    assert stats['status'] == conn.execute("""
+        SELECT company_status, COUNT(*) FROM companies GROUP BY 1 ORDER BY 2 DESC, 1
+    """).fetchall()
+    assert dict(stats['country']) == {'ENGLAND': 15, '': 15}
+    assert dict(stats['incorporation_year']) == {'2019': 10, '': 20}
+    assert dict(stats['sic']) == dict(conn.execute("SELECT sic_code, COUNT(*) FROM company_sic GROUP BY 1"))
+
+def test_rebuild_follows_the_data(conn):
+    rebuild_stats(conn)
+    conn.execute("DELETE FROM companies WHERE company_status = 'liquidation'")
+    assert load_stats(conn) != compute_stats(conn)
+    rebuild_stats(conn)
+    assert load_stats(conn) == compute_stats(conn)
+    assert dict(load_stats(conn)['status']) == {'active': 20}
+
+def test_database_without_company_stats(conn):
+    conn.execute("DROP TABLE IF EXISTS company_stats")
+    assert load_stats(conn) is None
+
+def test_api_aggregates_live_until_built(client):
+    body = client.get('/api/stats').get_json()
+    assert body['stats_source'] == 'live'
+    assert (body['total_companies'], body['active_companies']) == (30, 20)
+    assert body['status_breakdown'][0] == {'status': 'active', 'count': 20, 'percentage': 66.67}
+
+def test_refresh_needs_the_admin_token(client):
+    assert client.get('/api/stats?refresh=1').status_code == 403
@@ -0,0 +1,133 @@
+"""backend.zipstream: streaming the CSV out of a zip, including one still being downloaded"""
+
+import io
+import threading
+import time
+import zipfile
+
+import pytest
+
+from backend.zipstream import GrowingFile, ZipMemberStream, open_source
+
+CSV = b''.join(b'%08d,COMPANY %d LTD,Active\r\n' % (n, n) for n in range(20000))
+
+class Unseekable(io.RawIOBase):
+    """A write-only file without seek/tell, so zipfile writes data descriptors"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+def make_zip(method=zipfile.ZIP_DEFLATED, descriptor=False):
+    if descriptor:
+        target = Unseekable()
+        with zipfile.ZipFile(target, 'w', method) as archive:
+            with archive.open('BasicCompanyData.csv', 'w') as member:
+                member.write(CSV)
+        return target.buffer.getvalue()
+    target = io.BytesIO()
+    with zipfile.ZipFile(target, 'w', method) as archive:
+        archive.writestr('BasicCompanyData.csv', CSV)
+    return target.getvalue()
+
+def read_member(data):
+    member = ZipMemberStream(io.BytesIO(data))
+    with io.BufferedReader(member) as stream:
+        return member.name, stream.read()
+
+@pytest.mark.parametrize('method, descriptor', [
+    (zipfile.ZIP_DEFLATED, False),
+    (zipfile.ZIP_DEFLATED, True),
+    (zipfile.ZIP_STORED, False),
+])
+def test_reads_the_first_member(method, descriptor):
+    data = make_zip(method, descriptor)
+    flags = int.from_bytes(data[6:8], 'little')
+    assert bool(flags & 0x08) == descriptor
+    assert read_member(data) == ('BasicCompanyData.csv', CSV)
+
+def test_stored_member_with_data_descriptor_is_rejected():
+    data = make_zip(zipfile.ZIP_STORED, descriptor=True)
+    with pytest.raises(zipfile.BadZipFile, match='cannot be streamed'):
+        ZipMemberStream(io.BytesIO(data))
+
+@pytest.mark.parametrize('method, descriptor', [
+    (zipfile.ZIP_DEFLATED, False),
+    (zipfile.ZIP_DEFLATED, True),
+    (zipfile.ZIP_STORED, False),
+])
+def test_truncated_zip_is_an_error(method, descriptor):
+    data = make_zip(method, descriptor)
+    with pytest.raises(zipfile.BadZipFile, match='truncated'):
+        read_member(data[:len(data) // 2])
+
+def test_truncated_header_is_an_error():
+    with pytest.raises(zipfile.BadZipFile, match='inside a header'):
+        ZipMemberStream(io.BytesIO(make_zip()[:20]))
+
+def test_crc_mismatch_is_an_error():
+    data = bytearray(make_zip(zipfile.ZIP_STORED))
+    data[100] ^= 0xFF   # a byte of the stored CSV
+    with pytest.raises(zipfile.BadZipFile, match='CRC mismatch'):
+        read_member(bytes(data))
+
+def test_descriptor_crc_mismatch_is_an_error():
+    data = make_zip(descriptor=True)
+    descriptor = data.index(b'PK\x07\x08')
+    data = data[:descriptor + 4] + bytes(4) + data[descriptor + 8:]
+    with pytest.raises(zipfile.BadZipFile, match='CRC mismatch'):
+        read_member(data)
+
+def grow(path, data, done, pieces=8, pause=0.02):
+    """Append data to path in pieces, then set done"""
+    step = -(-len(data) // pieces)
+    for start in range(0, len(data), step):
+        with open(path, 'ab') as f:
+            f.write(data[start:start + step])
+        time.sleep(pause)
+    done.set()
+
+def test_growing_file_waits_for_the_writer(tmp_path):
+    path = tmp_path / 'download.part'
+    path.write_bytes(b'')
+    done = threading.Event()
+    writer = threading.Thread(target=grow, args=(path, CSV, done))
+    writer.start()
+    with io.BufferedReader(GrowingFile(path, done, poll=0.005)) as stream:
+        data = stream.read()
+    writer.join()
+    assert data == CSV
+
+def test_open_source_follows_a_growing_zip(tmp_path):
+    path = tmp_path / 'download.part'
+    path.write_bytes(b'')
+    done = threading.Event()
+    writer = threading.Thread(target=grow, args=(path, make_zip(), done))
+    writer.start()
+    stream, member = open_source(path, done)
+    with stream:
+        data = stream.read()
+    writer.join()
+    assert member.name == 'BasicCompanyData.csv'
+    assert data == CSV
+
+def test_open_source_reads_a_plain_csv(tmp_path):
+    path = tmp_path / 'companies.csv'
+    path.write_bytes(CSV)
+    stream, member = open_source(path)
+    with stream:
+        assert member is None
+        assert stream.read() == CSV
+
+def test_open_source_rejects_a_download_that_is_not_a_zip(tmp_path):
+    path = tmp_path / 'download.part'
+    path.write_bytes(b'')
+    done = threading.Event()
+    done.set()
+    with pytest.raises(zipfile.BadZipFile, match='not a zip'):
+        open_source(path, done)